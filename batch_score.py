@@ -0,0 +1,294 @@
+"""
+Parallel, chunked batch scoring around baseline_fraud_model.joblib.
+
+The model is loaded once per worker process. Parquet input is split by row
+group: workers read only the feature columns of their row group straight
+from the memory-mapped file and send back the probabilities, while the
+parent streams each row group (all input columns + ``proba``) to
+transactions_with_scores.parquet in input order. CSV input is read in
+chunks by the parent. No full-frame copy is made, and the optional CSV
+export is written batch by batch instead of from a second in-memory frame.
+With ``--drift`` each scored batch also goes through drift.DriftMonitor in
+the same pass, and a PSI / KS signal is written to signals/drift.json.
+
+Usage:
+    python batch_score.py input.parquet --workers 8 [--csv] [--out transactions_with_scores.parquet] [--drift]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent / "data" / "external"
+MODEL_PATH = HERE / "baseline_fraud_model.joblib"
+SCORED_NAME = "transactions_with_scores.parquet"
+NON_FEATURES = ("Class", "proba")
+
+_MODEL = None  # per-worker model, set by _init_worker
+
+
+def load_model(model_path: Path = MODEL_PATH):
+    import joblib
+
+    return joblib.load(model_path)
+
+
+def feature_names(model, columns: Iterable[str]) -> list[str]:
+    """Columns the model was fitted on (falls back to every non-label column)."""
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        return list(names)
+    return [c for c in columns if c not in NON_FEATURES]
+
+
+def linear_parts(model) -> tuple[np.ndarray, float]:
+    """(coef, intercept) on raw features, for a LogisticRegression or a scaler + linear Pipeline.
+
+    A leading StandardScaler is folded in: coef / scale, intercept - sum(coef * mean / scale).
+    """
+    from fast_score import fold_scaler
+
+    steps = getattr(model, "steps", None)
+    clf = steps[-1][1] if steps else model
+    scaler = steps[0][1] if steps and len(steps) > 1 else None
+    return fold_scaler(clf.coef_[0], float(clf.intercept_[0]), getattr(scaler, "mean_", None),
+                       getattr(scaler, "scale_", None))
+
+
+# -----------------------------------------
+# Streaming writer
+# -----------------------------------------
+
+class ScoredWriter:
+    """Appends scored batches to Parquet (one row group each) and, optionally, CSV."""
+
+    def __init__(self, parquet_path: Path, csv_path: Path | None = None):
+        self.parquet_path = Path(parquet_path)
+        self.csv_path = Path(csv_path) if csv_path is not None else None
+        self.rows = 0
+        self._pq = None
+        self._csv = None
+
+    def write(self, table) -> None:
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+
+        if self._pq is None:
+            self._pq = pq.ParquetWriter(self.parquet_path, table.schema)
+            if self.csv_path is not None:
+                self._csv = pacsv.CSVWriter(self.csv_path, table.schema)
+        self._pq.write_table(table)
+        if self._csv is not None:
+            self._csv.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self) -> None:
+        for w in (self._pq, self._csv):
+            if w is not None:
+                w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def with_proba(table, proba: np.ndarray):
+    """``table`` with ``proba`` as its last column (an existing one, e.g. when re-scoring, is replaced)."""
+    import pyarrow as pa
+
+    i = table.schema.get_field_index("proba")
+    if i >= 0:
+        table = table.remove_column(i)
+    return table.append_column("proba", pa.array(proba))
+
+
+def write_scored_frame(frame, extra: dict[str, np.ndarray], parquet_path: Path, csv_path: Path | None = None,
+                       chunksize: int = 250_000) -> int:
+    """Write ``frame`` plus ``extra`` columns slice by slice, without copying the frame."""
+    import pyarrow as pa
+
+    with ScoredWriter(parquet_path, csv_path) as out:
+        for start in range(0, len(frame), chunksize):
+            table = pa.Table.from_pandas(frame.iloc[start:start + chunksize], preserve_index=False)
+            for name, values in extra.items():
+                table = table.append_column(name, pa.array(np.asarray(values)[start:start + chunksize]))
+            out.write(table)
+        return out.rows
+
+
+# -----------------------------------------
+# Workers
+# -----------------------------------------
+
+def _init_worker(model_path: str) -> None:
+    global _MODEL
+    _MODEL = load_model(Path(model_path))
+
+
+def _score_array(X: np.ndarray) -> np.ndarray:
+    return _MODEL.predict_proba(X)[:, 1]
+
+
+def _score_row_group(job) -> np.ndarray:
+    import pyarrow.parquet as pq
+
+    path, rg, features = job
+    table = pq.ParquetFile(path, memory_map=True).read_row_group(rg, columns=features)
+    X = np.column_stack([table.column(c).to_numpy() for c in features])
+    return _score_array(_as_frame(X, features))
+
+
+def _as_frame(X: np.ndarray, features: list[str]):
+    # sklearn checks feature names when the model was fitted on a DataFrame.
+    import pandas as pd
+
+    return pd.DataFrame(X, columns=features, copy=False)
+
+
+def _bounded_map(submit: Callable, fn: Callable, jobs: Iterable, window: int) -> Iterator:
+    """Ordered map that keeps at most ``window`` jobs in flight (bounded memory)."""
+    pending: deque = deque()
+    for job in jobs:
+        pending.append(submit(fn, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# -----------------------------------------
+# Drivers
+# -----------------------------------------
+
+def score_file(input_path: Path, out_path: Path, model_path: Path = MODEL_PATH, workers: int = 1,
+               csv_path: Path | None = None, chunksize: int = 250_000,
+               on_batch: Callable | None = None) -> int:
+    """Score a Parquet or CSV file into ``out_path``; returns rows written.
+
+    ``on_batch`` is called with each scored table (input columns + ``proba``) as it is
+    written, e.g. drift.DriftMonitor.update, so monitoring rides along in the same pass.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    input_path = Path(input_path)
+    model = load_model(model_path)
+    is_parquet = input_path.suffix == ".parquet"
+
+    if is_parquet:
+        pf = pq.ParquetFile(input_path, memory_map=True)
+        features = feature_names(model, pf.schema_arrow.names)
+        jobs = [(str(input_path), rg, features) for rg in range(pf.num_row_groups)]
+        score_fn = _score_row_group
+    else:
+        import pandas as pd
+
+        from ingest import DTYPES
+
+        header = pd.read_csv(input_path, nrows=0).columns
+        features = feature_names(model, header)
+        chunks = pd.read_csv(input_path, chunksize=chunksize, dtype={c: t for c, t in DTYPES.items() if c in header})
+        jobs = chunks  # parent keeps each chunk for the output side
+        score_fn = None
+
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(model_path),))
+        submit = pool.submit
+    else:
+        global _MODEL
+        _MODEL = model
+        pool = None
+
+        def submit(fn, job):
+            return _Done(fn(job))
+
+    try:
+        with ScoredWriter(out_path, csv_path) as out:
+            if is_parquet:
+                results = _bounded_map(submit, score_fn, jobs, window=2 * max(workers, 1))
+                for rg, proba in enumerate(results):
+                    table = with_proba(pf.read_row_group(rg), proba)
+                    out.write(table)
+                    if on_batch is not None:
+                        on_batch(table)
+            else:
+                held: deque = deque()
+
+                def _features(chunks_iter):
+                    for chunk in chunks_iter:
+                        held.append(chunk)
+                        yield _as_frame(chunk[features].to_numpy(), features)
+
+                for proba in _bounded_map(submit, _score_array, _features(jobs), window=2 * max(workers, 1)):
+                    chunk = held.popleft()
+                    table = with_proba(pa.Table.from_pandas(chunk, preserve_index=False), proba)
+                    out.write(table)
+                    if on_batch is not None:
+                        on_batch(table)
+            return out.rows
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+class _Done:
+    """Already-computed stand-in for a Future (single-process mode)."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Batch-score transactions with the baseline fraud model.")
+    ap.add_argument("input", type=Path, help="transactions (.parquet or .csv) with the model's feature columns")
+    ap.add_argument("--model", type=Path, default=MODEL_PATH)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--out", type=Path, default=None)
+    ap.add_argument("--csv", action="store_true", help="also stream a CSV copy (for Power BI)")
+    ap.add_argument("--chunksize", type=int, default=250_000, help="rows per chunk for CSV input")
+    ap.add_argument("--drift", type=Path, nargs="?", const=True, default=None,
+                    help="also write a drift signal (PSI / KS vs creditcard_descriptives.csv); default signals/drift.json")
+    ap.add_argument("--descriptives", type=Path, default=None,
+                    help="feature baseline for --drift (default data/external/creditcard_descriptives.csv)")
+    ap.add_argument("--reference", type=Path, default=None,
+                    help="proba baseline for --drift (default signals/drift_reference.json, written by fraud.py)")
+    args = ap.parse_args(argv)
+
+    out = args.out or args.input.with_name(SCORED_NAME)
+    csv_path = out.with_suffix(".csv") if args.csv else None
+    monitor = None
+    if args.drift is not None:
+        import drift
+
+        monitor = drift.DriftMonitor.from_files(args.descriptives or drift.DESCRIPTIVES_PATH,
+                                                args.reference or drift.REFERENCE_PATH)
+        if "proba" not in monitor.columns:
+            print(f"No proba reference at {args.reference or drift.REFERENCE_PATH}; only features will be checked")
+    t0 = time.perf_counter()
+    rows = score_file(args.input, out, args.model, args.workers, csv_path, args.chunksize,
+                      on_batch=monitor.update if monitor is not None else None)
+    elapsed = time.perf_counter() - t0
+    print(f"Saved scored transactions ({rows:,} rows, {rows / max(elapsed, 1e-9):,.0f} rows/sec) -> {out.resolve()}")
+    if csv_path is not None:
+        print(f"Saved scored transactions CSV -> {csv_path.resolve()}")
+    if monitor is not None:
+        drift_path = drift.DRIFT_PATH if args.drift is True else args.drift
+        signal = monitor.write_signal(drift_path, source=str(args.input))
+        print(f"Saved drift signal ({signal['status']}) -> {drift_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
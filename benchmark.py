@@ -0,0 +1,223 @@
+"""
+Scaling benchmark over the synthetic world (synth.py).
+
+For each scale (default 1x, 10x, 100x) the tables are generated once under
+data/synthetic/x<scale>/ (reused while spec, scale and seed match) and then
+the hot paths are timed end to end on them:
+
+- ingest:    creditcard.csv -> typed Parquet cache (ingest.ensure_cache, cold)
+- features:  tx_30m_cnt / geo_mismatch / device_low_rep (features.build_features)
+- rules:     fact_risk from txn + features (rules_engine.score_parquet)
+- model:     batch scoring of the cache (batch_score.score_file)
+- sweep:     exact threshold sweep + ui.json payload (threshold_sweep.write_ui_json)
+
+Each step is measured with perf.StageMeter (wall, CPU, peak RSS, rows/sec).
+Results go to signals/benchmark.json. ``--save-baseline`` stores them as the
+reference in signals/benchmark_baseline.json. Every run is compared against
+that reference, and a step whose wall time grew by more than
+``--tolerance`` is reported as a regression (``--check`` exits 1 on any).
+
+The creditcard CSV for the ingest step is exported from the generated
+Parquet once per scale (untimed); the model step scores with the shipped
+baseline_fraud_model.joblib.
+
+Usage:
+    python benchmark.py [--scales 1,10,100] [--workers 4] [--save-baseline] [--check]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import perf
+import synth
+
+SIGNAL_DIR = Path(__file__).resolve().parent / "signals"
+RESULT_PATH = SIGNAL_DIR / "benchmark.json"
+BASELINE_PATH = SIGNAL_DIR / "benchmark_baseline.json"
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_TOLERANCE = 0.25   # +25% wall time vs baseline counts as a regression
+STEPS = ["ingest", "features", "rules", "model", "sweep"]
+
+
+# -----------------------------------------
+# Steps
+# -----------------------------------------
+
+def _creditcard_csv(manifest: dict, work: Path) -> Path:
+    import pyarrow.csv as pcsv
+    import pyarrow.parquet as pq
+
+    csv_path = work / "creditcard.csv"
+    if not csv_path.exists():
+        tmp = csv_path.with_suffix(".csv.tmp")
+        pf = pq.ParquetFile(manifest["paths"]["creditcard"])
+        with pcsv.CSVWriter(tmp, pf.schema_arrow, write_options=pcsv.WriteOptions(quoting_style="none")) as w:
+            for batch in pf.iter_batches():
+                w.write_batch(batch)
+        os.replace(tmp, csv_path)
+    return csv_path
+
+
+def step_ingest(manifest: dict, work: Path, workers: int) -> dict:
+    import ingest
+
+    csv_path = _creditcard_csv(manifest, work)
+    shutil.rmtree(work / ingest.CACHE_DIRNAME, ignore_errors=True)  # cold: hash + parse + write
+    with perf.StageMeter("ingest") as meter:
+        ingest.ensure_cache(csv_path)
+    meter.add_rows({"rows_in": manifest["rows"]["creditcard"]})
+    return meter.record
+
+
+def step_features(manifest: dict, work: Path, workers: int) -> dict:
+    import features
+    import ingest
+
+    paths = manifest["paths"]
+    with perf.StageMeter("features") as meter:
+        txn = ingest.read_table(Path(paths["txn"]), columns=features.TXN_COLS)
+        feats = features.build_features(txn, ingest.read_table(Path(paths["login_event"]), columns=features.LOGIN_COLS),
+                                        ingest.read_table(Path(paths["device"]), columns=features.DEVICE_COLS))
+        feats.to_parquet(work / "txn_features.parquet", index=False)
+    meter.add_rows({"rows_in": len(txn), "rows_out": len(feats)})
+    return meter.record
+
+
+def step_rules(manifest: dict, work: Path, workers: int) -> dict:
+    import rules_engine
+
+    with perf.StageMeter("rules") as meter:
+        rows = rules_engine.score_parquet(Path(manifest["paths"]["txn"]), work / "fact_risk.parquet",
+                                          work / "txn_features.parquet")
+    meter.add_rows({"rows_in": manifest["rows"]["txn"], "rows_out": rows})
+    return meter.record
+
+
+def step_model(manifest: dict, work: Path, workers: int) -> dict:
+    import batch_score
+    import ingest
+
+    cache = ingest.ensure_cache(_creditcard_csv(manifest, work))
+    with perf.StageMeter("model") as meter:
+        rows = batch_score.score_file(cache, work / batch_score.SCORED_NAME, workers=workers)
+    meter.add_rows({"rows_in": rows, "rows_out": rows})
+    return meter.record
+
+
+def step_sweep(manifest: dict, work: Path, workers: int) -> dict:
+    import pyarrow.parquet as pq
+
+    import batch_score
+    import threshold_sweep
+
+    with perf.StageMeter("sweep") as meter:
+        scored = pq.read_table(work / batch_score.SCORED_NAME, columns=["Class", "proba"], memory_map=True)
+        threshold_sweep.write_ui_json(scored.column("Class").to_numpy(), scored.column("proba").to_numpy(),
+                                      work / "ui.json")
+    meter.add_rows({"rows_in": scored.num_rows})
+    return meter.record
+
+
+STEP_FNS = {"ingest": step_ingest, "features": step_features, "rules": step_rules,
+            "model": step_model, "sweep": step_sweep}
+
+
+def run_scale(spec: dict, scale: float, seed: int = synth.DEFAULT_SEED, workers: int = 1,
+              steps: list[str] = STEPS) -> dict:
+    """Generate (or reuse) the tables for ``scale`` and time each step; returns {"rows", "steps"}."""
+    manifest = synth.ensure_generated(spec, scale, seed)
+    work = synth.out_dir_for(scale) / "bench"
+    work.mkdir(parents=True, exist_ok=True)
+    records = {}
+    for name in steps:
+        print(f"[x{scale:g}] {name} ...", flush=True)
+        records[name] = STEP_FNS[name](manifest, work, workers)
+    return {"seed": seed, "workers": workers, "rows": manifest["rows"], "steps": records}
+
+
+# -----------------------------------------
+# Baselines
+# -----------------------------------------
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """Per (scale, step) wall-time ratio against the baseline; ``regression`` when above 1 + tolerance."""
+    rows = []
+    for scale, result in results.items():
+        base_steps = baseline.get(scale, {}).get("steps", {})
+        for step, record in result["steps"].items():
+            base = base_steps.get(step, {}).get("wall_s")
+            ratio = record["wall_s"] / base if base else None
+            rows.append({"scale": scale, "step": step, "wall_s": record["wall_s"], "baseline_wall_s": base,
+                         "ratio": round(ratio, 3) if ratio is not None else None,
+                         "regression": ratio is not None and ratio > 1 + tolerance})
+    return rows
+
+
+def _load(path: Path) -> dict:
+    try:
+        return json.loads(Path(path).read_text()).get("scales", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(path: Path, scales: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"timestamp": dt.datetime.now().isoformat(), "python": sys.version.split()[0], "cpu_count": os.cpu_count(),
+               "scales": scales}
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Time ingest/features/rules/model/sweep on synthetic data at several scales.")
+    ap.add_argument("--spec", type=Path, default=synth.SPEC_PATH)
+    ap.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="comma-separated multipliers")
+    ap.add_argument("--steps", default=",".join(STEPS), help=f"comma-separated subset of: {','.join(STEPS)}")
+    ap.add_argument("--seed", type=int, default=synth.DEFAULT_SEED)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="batch scoring processes")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the comparison baseline")
+    ap.add_argument("--check", action="store_true", help="exit 1 if any step regressed against the baseline")
+    args = ap.parse_args(argv)
+
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown step(s): {', '.join(sorted(unknown))}; have {', '.join(STEPS)}")
+    spec = synth.load_spec(args.spec)
+    results = {}
+    for s in args.scales.split(","):
+        scale = float(s)
+        results[f"x{scale:g}"] = run_scale(spec, scale, args.seed, args.workers, steps)
+
+    _save(RESULT_PATH, results)
+    print(f"Saved benchmark -> {RESULT_PATH.resolve()}")
+    baseline = _load(BASELINE_PATH)
+    table = compare(results, baseline, args.tolerance)
+    print(f"{'scale':<7}{'step':<10}{'rows/s':>14}{'wall_s':>10}{'baseline':>10}{'ratio':>8}")
+    for row in table:
+        rec = results[row["scale"]]["steps"][row["step"]]
+        base = f"{row['baseline_wall_s']:.3f}" if row["baseline_wall_s"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['scale']:<7}{row['step']:<10}{rec.get('rows_per_sec', 0):>14,.0f}{row['wall_s']:>10.3f}{base:>10}{ratio:>8}{flag}")
+
+    if args.save_baseline:
+        for scale, result in results.items():
+            merged = baseline.setdefault(scale, {**result, "steps": {}})
+            merged.update({k: v for k, v in result.items() if k != "steps"})
+            merged["steps"].update(result["steps"])
+        _save(BASELINE_PATH, baseline)
+        print(f"Saved benchmark baseline -> {BASELINE_PATH.resolve()}")
+    return 1 if args.check and any(r["regression"] for r in table) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
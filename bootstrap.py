@@ -0,0 +1,159 @@
+"""
+Bootstrap confidence intervals for precision / recall / F1 and the threshold sweep.
+
+The test split holds only ~95 frauds, so the point estimates in
+signals/baseline_metrics.json move a lot between splits. Here the scores
+are sorted once; a resample is just a vector of multiplicities over that
+sorted array, so TP and alert counts at every threshold fall out of two
+cumulative sums. Resample indices are drawn in blocks (one 2-D integer
+array per block) and the blocks are spread over a process pool. Workers
+read the sorted labels from one shared, read-only memory-mapped .npy file
+instead of receiving pickled copies.
+
+Usage:
+    python bootstrap.py data/external/transactions_with_scores.parquet --resamples 2000 --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_RESAMPLES = 2000
+DEFAULT_LEVEL = 0.95
+BLOCK = 32                                            # resamples drawn per vectorized block
+SWEEP_GRID = np.round(np.linspace(0.0, 1.0, 21), 2)   # 0.05 steps keep the JSON small
+METRICS = ("precision", "recall", "f1")
+
+
+def _prepare(y_true, scores, thresholds) -> tuple[np.ndarray, np.ndarray]:
+    """Labels in descending-score order and, per threshold, how many rows are flagged."""
+    s = np.asarray(scores, dtype="float64")
+    order = np.argsort(-s, kind="stable")
+    labels = np.asarray(y_true)[order].astype("int8")
+    flagged = np.searchsorted(-s[order], -np.asarray(thresholds, dtype="float64"), side="right")
+    return labels, flagged.astype("int64")
+
+
+def _resample_block(labels: np.ndarray, flagged: np.ndarray, rng: np.random.Generator, k: int) -> np.ndarray:
+    """(k, n_thresholds, 3) precision/recall/F1 for ``k`` resamples."""
+    n = labels.size
+    idx = rng.integers(0, n, size=(k, n))
+    idx += (np.arange(k) * n)[:, None]
+    weights = np.bincount(idx.ravel(), minlength=k * n).reshape(k, n)
+
+    cum_alerts = np.cumsum(weights, axis=1)
+    cum_tp = np.cumsum(weights * labels, axis=1)
+    pos = cum_tp[:, -1:]
+    col = np.maximum(flagged - 1, 0)
+    has = flagged > 0
+    tp = np.where(has, cum_tp[:, col], 0).astype("float64")
+    alerts = np.where(has, cum_alerts[:, col], 0).astype("float64")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(alerts > 0, tp / alerts, np.nan)
+        recall = np.where(pos > 0, tp / pos, np.nan)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return np.stack([precision, recall, f1], axis=-1)
+
+
+def _worker(job) -> np.ndarray:
+    labels_path, flagged, seed, n_resamples = job
+    labels = np.load(labels_path, mmap_mode="r")  # shared, read-only; no per-worker copy
+    rng = np.random.default_rng(seed)
+    blocks = []
+    done = 0
+    while done < n_resamples:
+        k = min(BLOCK, n_resamples - done, max(1, (1 << 24) // labels.size))  # cap block at ~16M cells
+        blocks.append(_resample_block(labels, flagged, rng, k))
+        done += k
+    return np.concatenate(blocks)
+
+
+def bootstrap(y_true, scores, thresholds, n_resamples: int = DEFAULT_RESAMPLES, workers: int = 1,
+              seed: int = 42) -> np.ndarray:
+    """Resampled metrics, shape (n_resamples, n_thresholds, 3)."""
+    labels, flagged = _prepare(y_true, scores, thresholds)
+    workers = max(1, min(workers, n_resamples))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [n_resamples // workers + (i < n_resamples % workers) for i in range(workers)]
+
+    tmp = Path(tempfile.mkdtemp(prefix="bootstrap_"))
+    try:
+        labels_path = tmp / "labels.npy"
+        np.save(labels_path, labels)
+        jobs = [(str(labels_path), flagged, s, n) for s, n in zip(seeds, shares) if n]
+        if len(jobs) == 1:
+            parts = [_worker(jobs[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+                parts = list(pool.map(_worker, jobs))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return np.concatenate(parts)
+
+
+def intervals(samples: np.ndarray, level: float = DEFAULT_LEVEL) -> tuple[np.ndarray, np.ndarray]:
+    """Percentile interval bounds over the resample axis."""
+    alpha = (1 - level) / 2
+    with np.errstate(invalid="ignore"):
+        lo = np.nanquantile(samples, alpha, axis=0)
+        hi = np.nanquantile(samples, 1 - alpha, axis=0)
+    return lo, hi
+
+
+def add_intervals(metrics: dict, y_true, scores, n_resamples: int = DEFAULT_RESAMPLES,
+                  workers: int | None = None, level: float = DEFAULT_LEVEL, seed: int = 42) -> dict:
+    """Attach ``ci`` (at metrics["threshold"]) and ``sweep_ci`` blocks to a metrics dict."""
+    threshold = float(metrics.get("threshold", 0.5))
+    grid = np.union1d(SWEEP_GRID, [threshold])
+    samples = bootstrap(y_true, scores, grid, n_resamples, workers or os.cpu_count() or 1, seed)
+    lo, hi = intervals(samples, level)
+    at = int(np.searchsorted(grid, threshold))
+
+    def _r(x):
+        return None if np.isnan(x) else round(float(x), 6)
+
+    metrics["ci"] = {
+        "level": level,
+        "n_resamples": n_resamples,
+        **{m: [_r(lo[at, j]), _r(hi[at, j])] for j, m in enumerate(METRICS)},
+    }
+    metrics["sweep_ci"] = {
+        "thresholds": [float(t) for t in grid],
+        **{f"{m}_{side}": [_r(v) for v in bound[:, j]] for j, m in enumerate(METRICS)
+           for side, bound in (("lo", lo), ("hi", hi))},
+    }
+    return metrics
+
+
+def main(argv=None) -> None:
+    import pandas as pd
+
+    here = Path(__file__).resolve().parent
+    ap = argparse.ArgumentParser(description="Bootstrap CIs into baseline_metrics.json.")
+    ap.add_argument("scored", type=Path, help="scored transactions (.parquet/.csv) with Class and proba")
+    ap.add_argument("--metrics", type=Path, default=here / "signals" / "baseline_metrics.json")
+    ap.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--level", type=float, default=DEFAULT_LEVEL)
+    args = ap.parse_args(argv)
+
+    cols = ["Class", "proba"]
+    df = pd.read_parquet(args.scored, columns=cols) if args.scored.suffix == ".parquet" else pd.read_csv(args.scored, usecols=cols)
+    metrics = json.loads(args.metrics.read_text()) if args.metrics.exists() else {"threshold": 0.5}
+    add_intervals(metrics, df["Class"].to_numpy(), df["proba"].to_numpy(), args.resamples, args.workers, args.level)
+    with open(args.metrics, "w") as f:
+        json.dump(metrics, f, indent=2)
+    print(f"Saved bootstrap intervals ({args.resamples} resamples) -> {args.metrics.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Streaming, mergeable covariance / correlation (full matrix + per class).
+
+Section 7 of fraud.py used to call ``df[subset].corr()`` on ten columns of
+the in-memory frame. CovarianceAccumulator keeps, per column set, the row
+count, the running mean vector and the co-moment matrix
+sum((x - mean)(x - mean)^T). Each chunk is centered on its own mean before
+the cross-product, and chunks are combined with the pairwise (Chan et al.)
+update, so it stays numerically stable on shifted data such as ``Time``.
+Accumulators from separate chunks or worker processes merge into one. Rows
+can also be subtracted, which is how fraud.py removes exact duplicates
+after the fact.
+
+ClassCovariance tracks the full matrix (Time, V1..V28, Amount, Class:
+31x31) plus one feature matrix (30x30) per Class value. It is fed by
+ingest.ensure_cache's ``on_chunk`` hook, so it is built in the same chunk
+pass that writes the Parquet cache. Its state is stored next to the cache
+(``<cache>.cov.npz``) so reruns skip the data entirely.
+
+Rows with a missing value in any tracked column are skipped (listwise,
+where pandas' ``corr`` is pairwise; creditcard.csv has no nulls).
+
+Usage:
+    python correlation.py data/external/creditcard.csv [--workers 4] [--out-dir data/external]
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+LABEL = "Class"
+FEATURES = [c for c in ingest.EXPECTED_COLS if c != LABEL]
+SUBSET = [f"V{i}" for i in range(1, 9)] + ["Amount", "Class"]  # the original correlation_subset.csv
+CLASS_NAMES = {0: "nonfraud", 1: "fraud"}
+
+
+# -----------------------------------------
+# Accumulators
+# -----------------------------------------
+
+class CovarianceAccumulator:
+    """Count, mean vector and co-moment matrix over a fixed list of columns."""
+
+    def __init__(self, columns: list[str]):
+        self.columns = list(columns)
+        d = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(d)
+        self.comoment = np.zeros((d, d))
+
+    @classmethod
+    def from_array(cls, columns: list[str], X: np.ndarray) -> "CovarianceAccumulator":
+        acc = cls(columns)
+        X = X[~np.isnan(X).any(axis=1)]
+        if X.shape[0]:
+            acc.n = X.shape[0]
+            acc.mean = X.mean(axis=0)
+            Xc = X - acc.mean
+            acc.comoment = Xc.T @ Xc
+        return acc
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        X = chunk[self.columns].to_numpy(dtype="float64")
+        self.merge(CovarianceAccumulator.from_array(self.columns, X))
+
+    def merge(self, other: "CovarianceAccumulator") -> "CovarianceAccumulator":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.comoment = other.n, other.mean.copy(), other.comoment.copy()
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean = self.mean + delta * (other.n / n)
+        self.n = n
+        return self
+
+    def remove(self, other: "CovarianceAccumulator") -> "CovarianceAccumulator":
+        """Inverse of merge: drop rows that were previously merged in."""
+        if other.n == 0:
+            return self
+        if other.n > self.n:
+            raise ValueError(f"Cannot remove {other.n} rows from an accumulator of {self.n}")
+        n = self.n - other.n
+        if n == 0:
+            self.n, self.mean, self.comoment = 0, np.zeros_like(self.mean), np.zeros_like(self.comoment)
+            return self
+        mean = (self.mean * self.n - other.mean * other.n) / n
+        delta = other.mean - mean
+        self.comoment = self.comoment - other.comoment - np.outer(delta, delta) * (n * other.n / self.n)
+        self.mean, self.n = mean, n
+        return self
+
+    def covariance(self, ddof: int = 1) -> pd.DataFrame:
+        denom = self.n - ddof
+        cov = self.comoment / denom if denom > 0 else np.full_like(self.comoment, np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def correlation(self) -> pd.DataFrame:
+        diag = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment / np.outer(diag, diag)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(diag > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class ClassCovariance:
+    """The full-column accumulator plus one feature accumulator per label value."""
+
+    def __init__(self, features: list[str] = FEATURES, label: str = LABEL):
+        self.features = list(features)
+        self.label = label
+        self.all = CovarianceAccumulator(self.features + [label])
+        self.by_class: dict[int, CovarianceAccumulator] = {}
+
+    def _split(self, chunk: pd.DataFrame) -> tuple[CovarianceAccumulator, dict[int, CovarianceAccumulator]]:
+        X = chunk[self.features + [self.label]].to_numpy(dtype="float64")
+        whole = CovarianceAccumulator.from_array(self.all.columns, X)
+        labels = X[:, -1]
+        parts = {}
+        for value in np.unique(labels[~np.isnan(labels)]):
+            parts[int(value)] = CovarianceAccumulator.from_array(self.features, X[labels == value, :-1])
+        return whole, parts
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        whole, parts = self._split(chunk)
+        self.all.merge(whole)
+        for value, acc in parts.items():
+            self.by_class.setdefault(value, CovarianceAccumulator(self.features)).merge(acc)
+
+    def remove(self, chunk: pd.DataFrame) -> None:
+        whole, parts = self._split(chunk)
+        self.all.remove(whole)
+        for value, acc in parts.items():
+            self.by_class[value].remove(acc)
+
+    def merge(self, other: "ClassCovariance") -> "ClassCovariance":
+        self.all.merge(other.all)
+        for value, acc in other.by_class.items():
+            self.by_class.setdefault(value, CovarianceAccumulator(self.features)).merge(acc)
+        return self
+
+    def correlations(self) -> dict[str, pd.DataFrame]:
+        """{"all": 31x31, "nonfraud": 30x30, "fraud": 30x30} (class names from CLASS_NAMES)."""
+        out = {"all": self.all.correlation()}
+        for value in sorted(self.by_class):
+            out[CLASS_NAMES.get(value, f"class_{value}")] = self.by_class[value].correlation()
+        return out
+
+    # ---- persistence ----
+    def save(self, path: Path) -> None:
+        arrays = {"n": np.array(self.all.n), "mean": self.all.mean, "comoment": self.all.comoment,
+                  "classes": np.array(sorted(self.by_class), dtype="int64")}
+        for value, acc in self.by_class.items():
+            arrays[f"n_{value}"] = np.array(acc.n)
+            arrays[f"mean_{value}"] = acc.mean
+            arrays[f"comoment_{value}"] = acc.comoment
+        tmp = Path(path).with_suffix(".tmp.npz")
+        np.savez(tmp, columns=np.array(self.all.columns), **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ClassCovariance":
+        with np.load(path) as z:
+            columns = [str(c) for c in z["columns"]]
+            obj = cls(columns[:-1], columns[-1])
+            obj.all.n, obj.all.mean, obj.all.comoment = int(z["n"]), z["mean"], z["comoment"]
+            for value in z["classes"].tolist():
+                acc = CovarianceAccumulator(obj.features)
+                acc.n, acc.mean, acc.comoment = int(z[f"n_{value}"]), z[f"mean_{value}"], z[f"comoment_{value}"]
+                obj.by_class[value] = acc
+        return obj
+
+
+def covariance_chunks(chunks: Iterable[pd.DataFrame], features: list[str] = FEATURES,
+                      label: str = LABEL) -> ClassCovariance:
+    acc = ClassCovariance(features, label)
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc
+
+
+# -----------------------------------------
+# Ingestion hook / cache sidecar
+# -----------------------------------------
+
+def stats_path_for(cache_path: Path) -> Path:
+    return Path(cache_path).with_suffix(".cov.npz")
+
+
+def ingest_stats(csv_path: Path, cache_dir: Path | None = None,
+                 chunksize: int = ingest.DEFAULT_CHUNKSIZE) -> ClassCovariance:
+    """Covariance state for ``csv_path``, built while its Parquet cache is written.
+
+    Reuses the ``.cov.npz`` sidecar when the cache already has one.
+    """
+    cache = ingest.cache_path_for(csv_path, cache_dir)
+    sidecar = stats_path_for(cache)
+    if sidecar.exists():
+        return ClassCovariance.load(sidecar)
+    acc = ClassCovariance()
+    if cache.exists():
+        for chunk in ingest.iter_cache_chunks(cache, columns=acc.all.columns):
+            acc.update(chunk)
+    else:
+        ingest.ensure_cache(csv_path, cache_dir, chunksize, on_chunk=acc.update)
+    acc.save(sidecar)
+    return acc
+
+
+def _row_group_stats(job) -> ClassCovariance:
+    import pyarrow.parquet as pq
+
+    path, rg = job
+    acc = ClassCovariance()
+    acc.update(pq.ParquetFile(path, memory_map=True).read_row_group(rg, columns=acc.all.columns).to_pandas())
+    return acc
+
+
+def covariance_parquet(path: Path, workers: int = 1) -> ClassCovariance:
+    """Row groups of a Parquet file spread over ``workers`` processes, then merged."""
+    import pyarrow.parquet as pq
+
+    jobs = [(str(path), rg) for rg in range(pq.ParquetFile(path).num_row_groups)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_row_group_stats, jobs))
+    else:
+        parts = [_row_group_stats(job) for job in jobs]
+    acc = ClassCovariance()
+    for part in parts:
+        acc.merge(part)
+    return acc
+
+
+# -----------------------------------------
+# Outputs
+# -----------------------------------------
+
+def write_correlations(acc: ClassCovariance, out_dir: Path, prefix: str = "correlation") -> list[Path]:
+    """correlation_full.csv, correlation_<class>.csv and the legacy correlation_subset.csv."""
+    out_dir = Path(out_dir)
+    written = []
+    for name, corr in acc.correlations().items():
+        path = out_dir / f"{prefix}_{'full' if name == 'all' else name}.csv"
+        corr.to_csv(path, index=True)
+        written.append(path)
+    full = acc.all.correlation()
+    subset = [c for c in SUBSET if c in full.columns]
+    path = out_dir / f"{prefix}_subset.csv"
+    full.loc[subset, subset].to_csv(path, index=True)
+    written.append(path)
+    return written
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Full and class-conditional correlation matrices in one pass.")
+    ap.add_argument("csv", type=Path, help="creditcard.csv (cached as Parquet via ingest.py)")
+    ap.add_argument("--workers", type=int, default=1, help="parallel over cache row groups when rebuilding")
+    ap.add_argument("--out-dir", type=Path, default=None, help="defaults to the CSV's folder")
+    args = ap.parse_args(argv)
+
+    if args.workers > 1:
+        cache = ingest.ensure_cache(args.csv)
+        acc = covariance_parquet(cache, args.workers)
+        acc.save(stats_path_for(cache))
+    else:
+        acc = ingest_stats(args.csv)
+    for path in write_correlations(acc, args.out_dir or args.csv.parent):
+        print(f"Saved correlation -> {path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Single-pass, mergeable descriptive statistics (replacement for df.describe).
+
+StreamingDescriber keeps, per column, running count/mean/M2/min/max
+(Chan et al. parallel update) plus a compactor-based quantile sketch, so
+the 1/25/50/75/99 percentiles come out of one streaming pass in bounded
+memory. Accumulators built on separate chunks or worker processes merge
+into one. result() returns the same layout as
+``df.describe(percentiles=[...]).T`` so creditcard_descriptives.csv (and
+model.js, which renders it) keep working.
+
+Usage:
+    python descriptives.py path/to/creditcard.csv [--workers 4] [--out creditcard_descriptives.csv]
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+PERCENTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+
+# Items kept per sketch level. Rank error is roughly log2(n / k) / k in the worst
+# case and far smaller in practice; 4096 keeps every percentile well inside 0.5%
+# of rank at tens of millions of rows while holding ~13 MB for 31 columns.
+DEFAULT_K = 4096
+
+
+# -----------------------------------------
+# Quantile sketch
+# -----------------------------------------
+
+class QuantileSketch:
+    """Mergeable quantile sketch (a hierarchy of sort-and-halve compactors).
+
+    Level ``h`` holds items of weight ``2**h``. When a level grows past ``k``
+    items it is sorted and every other item (random offset) is promoted to
+    the next level, which keeps total weight exact and memory ~k*log(n/k).
+    While nothing has been compacted the answer is exact.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: int | None = None):
+        self.k = k
+        self.n = 0
+        self.levels: list[np.ndarray] = []
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values) -> None:
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+        self.n += values.size
+        self._push(0, values)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for h, items in enumerate(other.levels):
+            self._push(h, items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype="float64")
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if len(self.levels) == 1:
+            # Never compacted -> exact, with the same linear interpolation as pandas.
+            return np.quantile(self.levels[0], qs)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lv.size, 1 << h, dtype="int64") for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cum = items[order], np.cumsum(weights[order])
+        # First item whose cumulative weight passes the target 0-based rank.
+        idx = np.searchsorted(cum, qs * (self.n - 1), side="right")
+        return items[np.minimum(idx, items.size - 1)]
+
+    def _push(self, level: int, items: np.ndarray) -> None:
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0, dtype="float64"))
+        self.levels[level] = np.concatenate([self.levels[level], items]) if self.levels[level].size else items
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            buf = self.levels[h]
+            if buf.size > self.k:
+                buf = np.sort(buf, kind="stable")  # timsort: cheap on the already-sorted runs we promote
+                odd = buf.size % 2
+                self.levels[h] = buf[buf.size - odd:].copy()
+                self._push(h + 1, buf[self._rng.integers(2):buf.size - odd:2])
+            h += 1
+
+
+# -----------------------------------------
+# Per-column accumulator
+# -----------------------------------------
+
+class StreamingDescriber:
+    """count/mean/std/min/max + percentile sketches for every numeric column."""
+
+    def __init__(self, percentiles=PERCENTILES, k: int = DEFAULT_K, seed: int = 0):
+        self.percentiles = list(percentiles)
+        self.k = k
+        self.seed = seed
+        self.columns: list[str] | None = None
+
+    def _init(self, columns) -> None:
+        self.columns = list(columns)
+        m = len(self.columns)
+        self.count = np.zeros(m, dtype="int64")
+        self.mean = np.zeros(m)
+        self.m2 = np.zeros(m)
+        self.min = np.full(m, np.inf)
+        self.max = np.full(m, -np.inf)
+        self.sketches = [QuantileSketch(self.k, seed=self.seed + i) for i in range(m)]
+
+    def update(self, chunk: pd.DataFrame) -> "StreamingDescriber":
+        if self.columns is None:
+            self._init(chunk.select_dtypes("number").columns)
+        arr = chunk[self.columns].to_numpy(dtype="float64")
+        valid = ~np.isnan(arr)
+        n_b = valid.sum(axis=0)
+        if not n_b.any():
+            return self
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(n_b > 0, np.nansum(arr, axis=0) / n_b, 0.0)
+            m2_b = np.nansum((arr - mean_b) ** 2, axis=0)
+        self._combine(n_b, mean_b, m2_b, np.nanmin(arr, axis=0, initial=np.inf, where=valid),
+                      np.nanmax(arr, axis=0, initial=-np.inf, where=valid))
+        for j, sketch in enumerate(self.sketches):
+            sketch.update(arr[valid[:, j], j])
+        return self
+
+    def merge(self, other: "StreamingDescriber") -> "StreamingDescriber":
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self._init(other.columns)
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge describers built over different columns")
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        return self
+
+    def _combine(self, n_b, mean_b, m2_b, min_b, max_b) -> None:
+        # Chan et al. pairwise update; stable for large n and for merging workers.
+        n_a = self.count
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean_b - self.mean
+            frac = np.where(n > 0, n_b / np.maximum(n, 1), 0.0)
+            self.mean = self.mean + delta * frac
+            self.m2 = self.m2 + m2_b + delta ** 2 * n_a * frac
+        self.count = n
+        self.min = np.minimum(self.min, min_b)
+        self.max = np.maximum(self.max, max_b)
+
+    def result(self) -> pd.DataFrame:
+        """Same shape/labels as ``df.describe(percentiles=...).T``."""
+        if self.columns is None:
+            raise ValueError("No data was accumulated")
+        empty = self.count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        std[self.count < 2] = np.nan
+
+        out = pd.DataFrame(index=self.columns)
+        out["count"] = self.count.astype("float64")
+        out["mean"] = np.where(empty, np.nan, self.mean)
+        out["std"] = std
+        out["min"] = np.where(empty, np.nan, self.min)
+        pct = np.vstack([s.quantiles(self.percentiles) for s in self.sketches])
+        for j, p in enumerate(self.percentiles):
+            out[_percentile_label(p)] = pct[:, j]
+        out["max"] = np.where(empty, np.nan, self.max)
+        return out
+
+
+def _percentile_label(p: float) -> str:
+    # Mirrors pandas' describe labels ("1%", "25%", "50%", ...).
+    return f"{p * 100:g}%"
+
+
+# -----------------------------------------
+# Drivers
+# -----------------------------------------
+
+def describe_chunks(chunks: Iterable[pd.DataFrame], percentiles=PERCENTILES, k: int = DEFAULT_K) -> pd.DataFrame:
+    """Describe a stream of chunks in one pass."""
+    acc = StreamingDescriber(percentiles, k)
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc.result()
+
+
+def _describe_row_groups(args) -> StreamingDescriber:
+    import pyarrow.parquet as pq
+
+    path, row_groups, percentiles, k, seed = args
+    acc = StreamingDescriber(percentiles, k, seed)
+    pf = pq.ParquetFile(path, memory_map=True)
+    for rg in row_groups:
+        acc.update(pf.read_row_group(rg).to_pandas())
+    return acc
+
+
+def describe_parquet(path: Path, workers: int = 1, percentiles=PERCENTILES, k: int = DEFAULT_K) -> pd.DataFrame:
+    """Describe a Parquet file, splitting its row groups across worker processes."""
+    import pyarrow.parquet as pq
+
+    n_groups = pq.ParquetFile(path).num_row_groups
+    workers = max(1, min(workers, n_groups))
+    jobs = [(path, list(range(w, n_groups, workers)), percentiles, k, 1000 * w) for w in range(workers)]
+    if workers == 1:
+        parts = [_describe_row_groups(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_describe_row_groups, jobs))
+
+    acc = parts[0]
+    for part in parts[1:]:
+        acc.merge(part)
+    return acc.result()
+
+
+def main(argv=None) -> None:
+    import ingest
+
+    ap = argparse.ArgumentParser(description="Streaming descriptives for a creditcard CSV drop.")
+    ap.add_argument("csv", type=Path)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--out", type=Path, default=None, help="defaults to creditcard_descriptives.csv next to the CSV")
+    args = ap.parse_args(argv)
+
+    desc = describe_parquet(ingest.ensure_cache(args.csv), workers=args.workers)
+    out = args.out or args.csv.parent / "creditcard_descriptives.csv"
+    desc.to_csv(out, index=True)
+    print(f"Descriptive statistics exported to {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
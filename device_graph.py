@@ -0,0 +1,305 @@
+"""
+Device-sharing graph features: customers linked through shared devices.
+
+Every login links its customer to the device's anchor (the first customer
+seen on that device). With ``link_ip`` the shared login IP links customers
+the same way. Connected components are kept in an array-based union-find
+indexed by customer_id. Unions are applied a whole batch of edges at a
+time: each round maps every edge to its two roots, hooks the larger root
+under the smaller (``np.minimum.at``), then compresses all paths by pointer
+jumping. A round only keeps the edges that still join two components, so
+the total work stays near-linear in the number of edges. The root of a
+component is its smallest customer_id, which is also the component id.
+
+Per customer the features are:
+- component_id / component_size
+- component_fraud_rate: share of the component's customers flagged as fraud
+- peer_fraud_rate: the same, excluding the customer itself (NaN when alone),
+  so the customer's own label does not leak into its feature
+
+Fraud flags come from any table with customer_id + label_fraud (e.g. the
+Txn table): a customer is flagged if any of its rows is.
+
+Unions are idempotent and state only grows, so new login events are simply
+added to the saved state (.npz); replaying a file already seen changes
+nothing.
+
+Usage:
+    python device_graph.py --logins data/external/login_event.csv [--labels txn.parquet] [--ip] \\
+        [--state data/external/device_graph.npz] [--out customer_graph_features.parquet] [--txn txn.parquet]
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent / "data" / "external"
+STATE_PATH = HERE / "device_graph.npz"
+LOGIN_COLS = ["customer_id", "device_id"]
+DEFAULT_CHUNKSIZE = 5_000_000
+
+
+# -----------------------------------------
+# Union-find kernels
+# -----------------------------------------
+
+def compress(parent: np.ndarray) -> np.ndarray:
+    """Point every node straight at its root (pointer jumping, in place)."""
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent[:] = grand
+
+
+def union_edges(parent: np.ndarray, a: np.ndarray, b: np.ndarray) -> int:
+    """Union every (a[i], b[i]) pair; ``parent`` must be fully compressed on entry and is on exit.
+
+    Returns the number of hooking rounds.
+    """
+    rounds = 0
+    a, b = np.asarray(a, dtype="int64"), np.asarray(b, dtype="int64")
+    while a.size:
+        ra, rb = parent[a], parent[b]
+        live = ra != rb
+        if not live.any():
+            break
+        ra, rb = ra[live], rb[live]
+        lo, hi = np.minimum(ra, rb), np.maximum(ra, rb)
+        np.minimum.at(parent, hi, lo)   # each root hooks under its smallest neighbour root
+        compress(parent)
+        a, b = lo, hi
+        rounds += 1
+    return rounds
+
+
+def _grow(arr: np.ndarray, size: int, fill) -> np.ndarray:
+    if size <= arr.size:
+        return arr
+    out = np.full(max(size, 2 * arr.size), fill, dtype=arr.dtype)
+    out[:arr.size] = arr
+    return out
+
+
+# -----------------------------------------
+# Graph state
+# -----------------------------------------
+
+class DeviceGraph:
+    """Customer components over shared devices (and optionally IPs), growable and incremental."""
+
+    def __init__(self, link_ip: bool = False):
+        self.link_ip = link_ip
+        self.parent = np.zeros(0, dtype="int64")       # by customer_id; identity for unseen ids
+        self.seen = np.zeros(0, dtype=bool)
+        self.fraud = np.zeros(0, dtype=bool)
+        self.device_anchor = np.zeros(0, dtype="int64")  # by device_id; -1 = device not seen yet
+        self.ip_index = pd.Index([], dtype=object)
+        self.ip_anchor = np.zeros(0, dtype="int64")
+        self.edges = 0
+
+    def __len__(self) -> int:
+        return int(self.seen.sum())
+
+    def _ensure_customers(self, max_id: int) -> None:
+        n = self.parent.size
+        if max_id < n:
+            return
+        self.parent = _grow(self.parent, max_id + 1, -1)
+        fresh = np.arange(n, self.parent.size)
+        self.parent[n:] = fresh
+        self.seen = _grow(self.seen, self.parent.size, False)
+        self.fraud = _grow(self.fraud, self.parent.size, False)
+
+    def _anchors_by_id(self, keys: np.ndarray, cust: np.ndarray) -> np.ndarray:
+        self.device_anchor = _grow(self.device_anchor, int(keys.max()) + 1, -1)
+        new = self.device_anchor[keys] < 0
+        if new.any():
+            first_key, first = np.unique(keys[new], return_index=True)
+            self.device_anchor[first_key] = cust[new][first]
+        return self.device_anchor[keys]
+
+    def _anchors_by_ip(self, ips: np.ndarray, cust: np.ndarray) -> np.ndarray:
+        codes, uniq = pd.factorize(ips)
+        pos = self.ip_index.get_indexer(uniq)
+        missing = pos < 0
+        if missing.any():
+            first = np.full(len(uniq), -1, dtype="int64")
+            seen_codes, first_idx = np.unique(codes, return_index=True)
+            first[seen_codes] = cust[first_idx]
+            self.ip_index = self.ip_index.append(pd.Index(uniq[missing], dtype=object))
+            self.ip_anchor = np.concatenate([self.ip_anchor, first[missing]])
+            pos = self.ip_index.get_indexer(uniq)
+        return self.ip_anchor[pos[codes]]
+
+    def add_logins(self, customer_ids, device_ids, ips=None) -> int:
+        """Link the customers of a batch of login events; returns the number of edges applied."""
+        cust = pd.to_numeric(pd.Series(customer_ids), errors="coerce").to_numpy(dtype="float64")
+        dev = pd.to_numeric(pd.Series(device_ids), errors="coerce").to_numpy(dtype="float64")
+        ok = ~np.isnan(cust) & (cust >= 0)
+        if not ok.any():
+            return 0
+        c = cust[ok].astype("int64")
+        self._ensure_customers(int(c.max()))
+        self.seen[c] = True
+
+        a_parts, b_parts = [], []
+        has_dev = ~np.isnan(dev[ok]) & (dev[ok] >= 0)
+        if has_dev.any():
+            a_parts.append(c[has_dev])
+            b_parts.append(self._anchors_by_id(dev[ok][has_dev].astype("int64"), c[has_dev]))
+        if self.link_ip and ips is not None:
+            ip = pd.Series(ips).to_numpy(dtype=object)[ok]
+            has_ip = ~pd.isna(ip)
+            if has_ip.any():
+                a_parts.append(c[has_ip])
+                b_parts.append(self._anchors_by_ip(ip[has_ip].astype(str), c[has_ip]))
+        if not a_parts:
+            return 0
+        a, b = np.concatenate(a_parts), np.concatenate(b_parts)
+        union_edges(self.parent, a, b)
+        self.edges += int(a.size)
+        return int(a.size)
+
+    def mark_fraud(self, customer_ids) -> None:
+        ids = pd.to_numeric(pd.Series(customer_ids), errors="coerce").dropna().to_numpy(dtype="int64")
+        ids = ids[ids >= 0]
+        if ids.size:
+            self._ensure_customers(int(ids.max()))
+            self.fraud[ids] = True
+
+    # ---- features ----
+
+    def components(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(root, size, fraud count) arrays by customer_id; sizes count seen customers only."""
+        root = self.parent
+        size = np.bincount(root, weights=self.seen, minlength=root.size).astype("int64")
+        frauds = np.bincount(root, weights=self.seen & self.fraud, minlength=root.size).astype("int64")
+        return root, size[root], frauds[root]
+
+    def features(self, customer_ids=None) -> pd.DataFrame:
+        """component_id / component_size / component_fraud_rate / peer_fraud_rate per customer.
+
+        Defaults to every seen customer; ids the graph has never seen get a singleton component.
+        """
+        root, size, frauds = self.components()
+        if customer_ids is None:
+            customer_ids = np.flatnonzero(self.seen)
+        ids = pd.to_numeric(pd.Series(customer_ids), errors="coerce").to_numpy(dtype="float64")
+        known = ~np.isnan(ids) & (ids >= 0) & (ids < root.size)
+        idx = np.where(known, ids, 0).astype("int64")
+        known &= self.seen[idx]
+        own = known & self.fraud[idx]
+
+        comp_size = np.where(known, size[idx], 1)
+        comp_fraud = np.where(known, frauds[idx], own)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            peer = np.where(comp_size > 1, (comp_fraud - own) / (comp_size - 1), np.nan)
+        return pd.DataFrame({
+            "customer_id": np.asarray(customer_ids),
+            "component_id": np.where(known, root[idx], np.nan_to_num(ids, nan=-1)).astype("int64"),
+            "component_size": comp_size.astype("int64"),
+            "component_fraud_rate": comp_fraud / comp_size,
+            "peer_fraud_rate": peer,
+        })
+
+    # ---- snapshots ----
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(
+            path, link_ip=np.array(self.link_ip), edges=np.array(self.edges, dtype="int64"),
+            parent=self.parent, seen=self.seen, fraud=self.fraud, device_anchor=self.device_anchor,
+            ip_values=np.asarray(self.ip_index, dtype=str), ip_anchor=self.ip_anchor,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "DeviceGraph":
+        with np.load(path, allow_pickle=False) as z:
+            graph = cls(bool(z["link_ip"]))
+            graph.edges = int(z["edges"])
+            graph.parent, graph.seen, graph.fraud = z["parent"], z["seen"], z["fraud"]
+            graph.device_anchor = z["device_anchor"]
+            graph.ip_index = pd.Index(z["ip_values"].astype(object), dtype=object)
+            graph.ip_anchor = z["ip_anchor"]
+        return graph
+
+
+# -----------------------------------------
+# Reading
+# -----------------------------------------
+
+def iter_table(path: Path, columns: list[str], chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Only ``columns`` of a CSV / Parquet table, ``chunksize`` rows at a time."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def fraud_customers(path: Path, chunksize: int = DEFAULT_CHUNKSIZE) -> np.ndarray:
+    """customer_ids with at least one ``label_fraud`` row."""
+    parts = [chunk.loc[chunk["label_fraud"].astype(bool), "customer_id"].to_numpy()
+             for chunk in iter_table(path, ["customer_id", "label_fraud"], chunksize)]
+    return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype="int64")
+
+
+def main(argv=None) -> None:
+    import time
+
+    ap = argparse.ArgumentParser(description="Link customers through shared devices / IPs and write graph features.")
+    ap.add_argument("--logins", type=Path, default=HERE / "login_event.csv", help="login events to add to the graph")
+    ap.add_argument("--labels", type=Path, default=None, help="table with customer_id + label_fraud (e.g. txn.parquet)")
+    ap.add_argument("--ip", action="store_true", help="also link customers that logged in from the same IP")
+    ap.add_argument("--state", type=Path, default=STATE_PATH, help="graph state; loaded if present, then updated")
+    ap.add_argument("--rebuild", action="store_true", help="ignore the saved state and start from scratch")
+    ap.add_argument("--txn", type=Path, default=None, help="also write row-aligned features for this Txn table")
+    ap.add_argument("--out", type=Path, default=None)
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = ap.parse_args(argv)
+
+    if args.state.exists() and not args.rebuild:
+        graph = DeviceGraph.load(args.state)
+        if args.ip and not graph.link_ip:
+            raise ValueError(f"{args.state} was built without --ip; pass --rebuild to add IP links")
+    else:
+        graph = DeviceGraph(link_ip=args.ip)
+    t0 = time.perf_counter()
+    columns = LOGIN_COLS + (["ip"] if graph.link_ip else [])
+    added = 0
+    for chunk in iter_table(args.logins, columns, args.chunksize):
+        added += graph.add_logins(chunk["customer_id"], chunk["device_id"], chunk["ip"] if graph.link_ip else None)
+    if args.labels:
+        graph.mark_fraud(fraud_customers(args.labels, args.chunksize))
+    graph.save(args.state)
+    print(f"Added {added:,} edges in {time.perf_counter() - t0:.2f}s ({graph.edges:,} total, {len(graph):,} customers)"
+          f" -> {args.state.resolve()}")
+
+    feats = graph.features()
+    out = args.out or args.logins.with_name("customer_graph_features.parquet")
+    feats.to_parquet(out, index=False)
+    multi = feats["component_size"] > 1
+    print(f"Saved graph features ({len(feats):,} customers, {feats.loc[multi, 'component_id'].nunique():,} shared-device "
+          f"components, largest {int(feats['component_size'].max()) if len(feats) else 0:,}) -> {out.resolve()}")
+
+    if args.txn:
+        import ingest
+
+        txn = ingest.read_table(args.txn, columns=["txn_id", "customer_id"])
+        rows = graph.features(txn["customer_id"].to_numpy()).drop(columns="customer_id")
+        rows.insert(0, "txn_id", txn["txn_id"].to_numpy())
+        txn_out = args.txn.with_name(args.txn.stem + "_graph_features.parquet")
+        rows.to_parquet(txn_out, index=False)
+        print(f"Saved txn graph features ({len(rows):,} rows) -> {txn_out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Array-backed dimension store for customer / account / device / merchant.
+
+The dimension drops are mostly wide strings: 64-char person_hash, UUID
+device_fingerprint, ISO timestamps, and a handful of low-cardinality enums.
+Here each table becomes a set of dense NumPy arrays indexed directly by its
+id (row ``i`` holds id ``i``; ``present`` marks the ids that exist):
+
+- hex / uuid:  raw fixed-width bytes (S32 for a sha256, S16 for a UUID)
+- enum:        int8 codes into a category list (-1 = NULL)
+- ts / date:   int64 microseconds / int32 days since the epoch (NULL = int min)
+- int:         int64 (NULL = int64 min)
+- bytes:       other strings as fixed-width UTF-8 (e.g. last_ip, name)
+
+Each column is saved as its own ``.npy`` next to a meta.json (kinds,
+categories, source digest) and opened with ``mmap_mode="r"``, so opening
+costs nothing and only the pages that are touched get read. Lookups are
+plain fancy indexing by id (``table.take("risk_reputation", device_ids)``)
+instead of a pandas merge. A table is rebuilt only when its source file's
+SHA-256 changes.
+
+Usage:
+    python dimstore.py [--tables-dir data/external] [--out data/external/.cache/dims] [--force]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+HERE = Path(__file__).resolve().parent / "data" / "external"
+STORE_DIR = HERE / ingest.CACHE_DIRNAME / "dims"
+META_NAME = "meta.json"
+
+NULL_INT = np.iinfo("int64").min
+NULL_DATE = np.iinfo("int32").min
+MAX_SPARSITY = 64  # refuse id ranges more than 64x the row count (+1M slack)
+
+DIMENSIONS = {
+    "customer": {"id": "customer_id", "columns": {
+        "person_hash": "hex", "first_seen_ts": "ts", "kyc_status": "enum", "pep_flag": "enum",
+        "sanctions_hit": "enum", "record_src": "enum", "created_at": "ts"}},
+    "account": {"id": "account_id", "columns": {
+        "customer_id": "int", "product_type": "enum", "open_dt": "date", "status": "enum", "created_at": "ts"}},
+    "device": {"id": "device_id", "columns": {
+        "device_fingerprint": "uuid", "first_seen_ts": "ts", "risk_reputation": "auto", "last_ip": "bytes",
+        "last_country": "enum", "created_at": "ts"}},
+    "merchant": {"id": "merchant_id", "columns": {
+        "mcc": "int", "name": "bytes", "country": "enum", "risk_tag": "enum", "created_at": "ts"}},
+}
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+# ASCII -> nibble value for hex decoding (non-hex characters decode as 0).
+_NIBBLE = np.zeros(256, dtype=np.uint8)
+_NIBBLE[np.frombuffer(b"0123456789", np.uint8)] = np.arange(10)
+_NIBBLE[np.frombuffer(b"abcdef", np.uint8)] = np.arange(10, 16)
+_NIBBLE[np.frombuffer(b"ABCDEF", np.uint8)] = np.arange(10, 16)
+
+
+# -----------------------------------------
+# Encoders (build time)
+# -----------------------------------------
+
+def _fixed_bytes(values: pd.Series) -> np.ndarray:
+    encoded = values.fillna("").astype(str).str.encode("utf-8")
+    width = max(1, int(encoded.str.len().max() or 1))
+    return encoded.to_numpy().astype(f"S{width}")
+
+
+def encode_hex(values: pd.Series, nbytes: int) -> np.ndarray:
+    """Hex strings (dashes ignored) -> raw bytes, ``S<nbytes>``; NULL -> all zeros."""
+    chars = values.fillna("").astype(str).str.replace("-", "", regex=False).str.encode("ascii")
+    raw = np.zeros((len(values), 2 * nbytes), dtype=np.uint8)
+    text = chars.to_numpy().astype(f"S{2 * nbytes}")
+    raw[:] = np.frombuffer(text.tobytes(), dtype=np.uint8).reshape(len(values), 2 * nbytes)
+    nib = _NIBBLE[raw]
+    return np.ascontiguousarray((nib[:, 0::2] << 4) | nib[:, 1::2]).view(f"S{nbytes}").ravel()
+
+
+def decode_hex(values: np.ndarray, dashed: bool = False) -> np.ndarray:
+    """Inverse of encode_hex; works on the raw bytes (``.tolist()`` would drop trailing NULs)."""
+    values = np.ascontiguousarray(values)
+    nbytes = values.dtype.itemsize
+    raw = values.view(np.uint8).reshape(values.size, nbytes)
+    chars = np.empty((values.size, 2 * nbytes), dtype=np.uint8)
+    chars[:, 0::2] = _HEX[raw >> 4]
+    chars[:, 1::2] = _HEX[raw & 15]
+    if dashed:  # 8-4-4-4-12
+        chars = np.insert(chars, [8, 12, 16, 20], ord("-"), axis=1)
+    return np.char.decode(np.ascontiguousarray(chars).view(f"S{chars.shape[1]}").ravel(), "ascii").astype(object)
+
+
+def encode_ts(values: pd.Series) -> np.ndarray:
+    ts = pd.to_datetime(values, utc=True, format="ISO8601", errors="coerce")
+    return ts.dt.tz_localize(None).to_numpy(dtype="datetime64[us]").view("int64")  # NaT -> int64 min
+
+
+def encode_date(values: pd.Series) -> np.ndarray:
+    days = encode_ts(values)
+    out = np.full(days.size, NULL_DATE, dtype="int32")
+    ok = days != NULL_INT
+    out[ok] = days[ok] // (86_400 * 1_000_000)
+    return out
+
+
+def encode_enum(values: pd.Series) -> tuple[np.ndarray, list]:
+    codes, cats = pd.factorize(values.astype("string"), sort=True)
+    dtype = "int8" if len(cats) < 127 else "int16" if len(cats) < 32767 else "int32"
+    return codes.astype(dtype), [str(c) for c in cats]
+
+
+def encode_int(values: pd.Series) -> np.ndarray:
+    num = pd.to_numeric(values, errors="coerce")
+    return num.astype("Int64").fillna(NULL_INT).to_numpy(dtype="int64")
+
+
+def _encode(kind: str, values: pd.Series) -> tuple[str, np.ndarray, list | None]:
+    if kind == "auto":
+        numeric = pd.to_numeric(values, errors="coerce")
+        kind = "int" if numeric.notna().sum() == values.notna().sum() else "enum"
+    if kind == "hex":
+        return kind, encode_hex(values, 32), None
+    if kind == "uuid":
+        return kind, encode_hex(values, 16), None
+    if kind == "ts":
+        return kind, encode_ts(values), None
+    if kind == "date":
+        return kind, encode_date(values), None
+    if kind == "enum":
+        codes, cats = encode_enum(values)
+        return kind, codes, cats
+    if kind == "int":
+        return kind, encode_int(values), None
+    if kind == "bytes":
+        return kind, _fixed_bytes(values), None
+    raise ValueError(f"Unknown column kind {kind!r}")
+
+
+def _null_of(kind: str, dtype: np.dtype):
+    if kind == "enum":
+        return -1
+    if kind == "date":
+        return NULL_DATE
+    if kind in ("ts", "int"):
+        return NULL_INT
+    return np.zeros((), dtype=dtype)[()]  # empty bytes
+
+
+# -----------------------------------------
+# Store
+# -----------------------------------------
+
+class DimensionTable:
+    """One dimension as id-indexed arrays (memory-mapped when opened from disk)."""
+
+    def __init__(self, name: str, id_column: str, arrays: dict[str, np.ndarray], present: np.ndarray, meta: dict):
+        self.name = name
+        self.id_column = id_column
+        self.arrays = arrays
+        self.present_mask = present
+        self.meta = meta
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.arrays)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.present_mask.nbytes + sum(a.nbytes for a in self.arrays.values()))
+
+    def kind(self, column: str) -> str:
+        return self.meta["columns"][column]["kind"]
+
+    def categories(self, column: str) -> list:
+        return self.meta["columns"][column]["categories"]
+
+    def _index(self, ids) -> tuple[np.ndarray, np.ndarray]:
+        ids = np.asarray(ids)
+        if ids.dtype.kind not in "iu":
+            ids = pd.to_numeric(pd.Series(ids), errors="coerce").to_numpy(dtype="float64")
+            ok = ~np.isnan(ids)
+            ids = np.where(ok, ids, -1).astype("int64")
+        ok = (ids >= 0) & (ids < self.present_mask.size)
+        idx = np.where(ok, ids, 0)
+        ok &= self.present_mask[idx]
+        return idx, ok
+
+    def present(self, ids) -> np.ndarray:
+        return self._index(ids)[1]
+
+    def take(self, column: str, ids) -> np.ndarray:
+        """Raw stored values for ``ids``; unknown / NULL ids get the column's NULL value."""
+        arr = self.arrays[column]
+        idx, ok = self._index(ids)
+        out = arr[idx]
+        if not ok.all():
+            out[~ok] = _null_of(self.kind(column), arr.dtype)
+        return out
+
+    def decode(self, column: str, values: np.ndarray) -> np.ndarray:
+        """Stored values back to their readable form (strings, datetime64, hex)."""
+        kind = self.kind(column)
+        if kind == "enum":
+            names = np.append(np.asarray(self.categories(column), dtype=object), None)
+            return names[values]  # code -1 -> None
+        if kind == "ts":
+            return np.asarray(values, dtype="int64").view("datetime64[us]")
+        if kind == "date":
+            v = np.asarray(values, dtype="int64")
+            return np.where(v == NULL_DATE, NULL_INT, v).view("datetime64[D]")
+        if kind in ("hex", "uuid"):
+            return decode_hex(values, dashed=kind == "uuid")
+        if kind == "bytes":
+            return np.char.decode(values, "utf-8")
+        return values
+
+    def lookup(self, column: str, ids) -> np.ndarray:
+        return self.decode(column, self.take(column, ids))
+
+    def frame(self, columns: list[str] | None = None) -> pd.DataFrame:
+        """Decoded DataFrame of the present ids (for inspection / round-trip checks)."""
+        ids = np.flatnonzero(self.present_mask)
+        out = pd.DataFrame({self.id_column: ids})
+        for c in columns or self.columns:
+            out[c] = self.decode(c, np.asarray(self.arrays[c])[ids])
+        return out
+
+    # ---- build / persistence ----
+    @classmethod
+    def from_frame(cls, name: str, df: pd.DataFrame, id_column: str, kinds: dict[str, str],
+                   source: dict | None = None) -> "DimensionTable":
+        ids = encode_int(df[id_column])
+        if (ids == NULL_INT).any() or (ids < 0).any():
+            raise ValueError(f"{name}.{id_column}: ids must be non-null and non-negative")
+        if np.unique(ids).size != ids.size:
+            raise ValueError(f"{name}.{id_column}: duplicate ids")
+        size = int(ids.max()) + 1 if ids.size else 0
+        if size > MAX_SPARSITY * ids.size + (1 << 20):
+            raise ValueError(f"{name}.{id_column}: ids too sparse for a dense store (max {size - 1:,}, {ids.size:,} rows)")
+        present = np.zeros(size, dtype=bool)
+        present[ids] = True
+        arrays, meta_cols = {}, {}
+        for col, kind in kinds.items():
+            if col not in df.columns:
+                continue
+            kind, values, cats = _encode(kind, df[col])
+            dense = np.full(size, _null_of(kind, values.dtype), dtype=values.dtype)
+            dense[ids] = values
+            arrays[col] = dense
+            meta_cols[col] = {"kind": kind, "dtype": values.dtype.str, "categories": cats}
+        meta = {"name": name, "id": id_column, "rows": int(ids.size), "size": size,
+                "columns": meta_cols, "source": source or {}}
+        return cls(name, id_column, arrays, present, meta)
+
+    def save(self, out_dir: Path) -> Path:
+        """One .npy per column + present.npy + meta.json, swapped in atomically."""
+        out_dir = Path(out_dir)
+        tmp = out_dir.with_name(out_dir.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "present.npy", self.present_mask)
+        for col, arr in self.arrays.items():
+            np.save(tmp / f"{col}.npy", arr)
+        (tmp / META_NAME).write_text(json.dumps(self.meta, indent=2))
+        shutil.rmtree(out_dir, ignore_errors=True)
+        tmp.rename(out_dir)
+        return out_dir
+
+    @classmethod
+    def open(cls, path: Path, mmap: bool = True) -> "DimensionTable":
+        path = Path(path)
+        meta = json.loads((path / META_NAME).read_text())
+        mode = "r" if mmap else None
+        arrays = {c: np.load(path / f"{c}.npy", mmap_mode=mode) for c in meta["columns"]}
+        return cls(meta["name"], meta["id"], arrays, np.load(path / "present.npy", mmap_mode=mode), meta)
+
+
+def build_store(tables_dir: Path = HERE, out_dir: Path = STORE_DIR, force: bool = False,
+                dimensions: dict = DIMENSIONS) -> dict[str, str]:
+    """(Re)build each dimension whose source changed; returns {table: "built" | "up to date" | "missing"}."""
+    from integrity import find_table
+
+    out_dir = Path(out_dir)
+    status = {}
+    for name, spec in dimensions.items():
+        src = find_table(tables_dir, name)
+        if src is None:
+            status[name] = "missing"
+            continue
+        digest = ingest.file_digest(src, out_dir)
+        target = out_dir / name
+        try:
+            current = json.loads((target / META_NAME).read_text())["source"].get("sha256")
+        except (OSError, ValueError, KeyError):
+            current = None
+        if current == digest and not force:
+            status[name] = "up to date"
+            continue
+        df = ingest.read_table(src, columns=[spec["id"]] + [c for c in spec["columns"] if c in _header(src)])
+        DimensionTable.from_frame(name, df, spec["id"], spec["columns"],
+                                  {"path": str(src), "sha256": digest}).save(target)
+        status[name] = "built"
+    return status
+
+
+def _header(path: Path) -> list[str]:
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def open_store(out_dir: Path = STORE_DIR) -> dict[str, DimensionTable]:
+    """Every built dimension under ``out_dir``, memory-mapped."""
+    out_dir = Path(out_dir)
+    return {p.name: DimensionTable.open(p) for p in sorted(out_dir.iterdir()) if (p / META_NAME).exists()}
+
+
+# -----------------------------------------
+# Feature helpers
+# -----------------------------------------
+
+def device_low_rep_lookup(device: DimensionTable) -> np.ndarray:
+    """Dense bool by device_id: risk_reputation <= features.LOW_REP_MAX (tiers mapped like features.py)."""
+    from features import LOW_REP_MAX, REPUTATION_TIER_SCORES
+
+    rep = device.arrays["risk_reputation"]
+    if device.kind("risk_reputation") == "enum":
+        cats = pd.Series(device.categories("risk_reputation"), dtype="object")
+        scores = pd.to_numeric(cats, errors="coerce").fillna(cats.str.lower().map(REPUTATION_TIER_SCORES))
+        low = np.append((scores <= LOW_REP_MAX).to_numpy(), False)  # code -1 -> False
+        out = low[np.asarray(rep)]
+    else:
+        rep = np.asarray(rep)
+        out = (rep != NULL_INT) & (rep <= LOW_REP_MAX)
+    return out & np.asarray(device.present_mask)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Build the memory-mapped dimension store from the dimension drops.")
+    ap.add_argument("--tables-dir", type=Path, default=HERE, help="folder with <table>.csv / <table>.parquet")
+    ap.add_argument("--out", type=Path, default=None, help="defaults to <tables-dir>/.cache/dims")
+    ap.add_argument("--force", action="store_true", help="rebuild even if the sources are unchanged")
+    args = ap.parse_args(argv)
+
+    out = args.out or args.tables_dir / ingest.CACHE_DIRNAME / "dims"
+    status = build_store(args.tables_dir, out, args.force)
+    store = open_store(out)
+    for name, state in status.items():
+        if name not in store:
+            print(f"{name:<10} {state}")
+            continue
+        table = store[name]
+        src = Path(table.meta["source"]["path"])
+        frame_mb = ingest.read_table(src).memory_usage(deep=True).sum() / 2**20
+        print(f"{name:<10} {state:<11} {table.meta['rows']:>10,} rows  {table.nbytes / 2**20:8.2f} MiB "
+              f"(pandas {frame_mb:.2f} MiB, {frame_mb / max(table.nbytes / 2**20, 1e-9):.1f}x)")
+    print(f"Dimension store ready -> {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Streaming drift monitor: scored batches vs the training baseline.
+
+Every feature (Time, V1..V28, Amount) and the model score ``proba`` gets a
+fixed-edge histogram that is filled chunk by chunk, so chunk results just
+add up and memory stays at a few dozen counters per column, whatever
+the number of rows.
+
+Feature baselines come from creditcard_descriptives.csv. Its quantiles
+(min, 1%, 25%, 50%, 75%, 99%, max) are the bin edges, so the baseline
+mass per bin is known exactly (1%, 24%, 25%, ...), with one more bin
+below min and one above max. PSI is computed over those bins. KS distance
+is the largest gap between the batch CDF and the baseline CDF at the
+edges, which is exact there and a lower bound on the full KS statistic.
+The ``proba`` baseline is the score histogram of the held-out split.
+fraud.py's score stage saves it to REFERENCE_PATH (signals/ next to this
+file) on fixed log-spaced bins, and PSI and KS use those same bins.
+
+Results go to signals/drift.json, next to latest.json. The file holds
+per-column PSI / KS / mean vs baseline and an overall status (PSI < 0.1
+stable, < 0.25 moderate, else significant). batch_score.py runs the
+monitor in its scoring pass (``--drift``). Run this file alone to check
+an already-scored file.
+
+Usage:
+    python batch_score.py day.parquet --drift [signals/drift.json] [--reference signals/drift_reference.json]
+    python drift.py transactions_with_scores.parquet [--descriptives data/external/creditcard_descriptives.csv] [--out signals/drift.json]
+    python drift.py transactions_with_scores.parquet --write-reference
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent / "data" / "external"
+SIGNAL_DIR = Path(__file__).resolve().parent / "signals"
+DESCRIPTIVES_PATH = HERE / "creditcard_descriptives.csv"
+DRIFT_PATH = SIGNAL_DIR / "drift.json"
+REFERENCE_PATH = SIGNAL_DIR / "drift_reference.json"
+
+QUANTILES = {"min": 0.0, "1%": 0.01, "25%": 0.25, "50%": 0.5, "75%": 0.75, "99%": 0.99, "max": 1.0}
+SKIP_COLUMNS = ("Class",)
+PROBA_EDGES = np.concatenate([[0.0], np.logspace(-6, 0, 25)])  # scores sit near 0: log-spaced bins
+PSI_EPS = 1e-4              # floor for empty bins in the PSI log ratio
+PSI_MODERATE, PSI_SIGNIFICANT = 0.1, 0.25
+
+
+# -----------------------------------------
+# Baselines
+# -----------------------------------------
+
+def baseline_from_describe(desc) -> dict[str, tuple[np.ndarray, np.ndarray, float]]:
+    """{column: (quantile values, CDF at them, mean)} from a describe()-layout frame (descriptives.py)."""
+    missing = [q for q in QUANTILES if q not in desc.columns]
+    if missing:
+        raise ValueError(f"Descriptives have no {', '.join(missing)} column(s); expected a describe() layout")
+    out = {}
+    for col in desc.index:
+        if col in SKIP_COLUMNS:
+            continue
+        knots = np.array([float(desc.loc[col, q]) for q in QUANTILES])
+        cdf = np.array(list(QUANTILES.values()))
+        # Repeated quantile values are a point mass: keep the CDF's top value there.
+        values = np.unique(knots)
+        out[col] = (values, np.array([cdf[knots == v].max() for v in values]), float(desc.loc[col, "mean"]))
+    return out
+
+
+def load_baseline(path: Path = DESCRIPTIVES_PATH) -> dict[str, tuple[np.ndarray, np.ndarray, float]]:
+    import pandas as pd
+
+    return baseline_from_describe(pd.read_csv(path, index_col=0))
+
+
+def proba_reference(proba: np.ndarray, edges: np.ndarray = PROBA_EDGES) -> dict:
+    """JSON-ready score histogram of the training split, on ``edges``."""
+    proba = np.asarray(proba, dtype="float64")
+    proba = proba[np.isfinite(proba)]
+    counts = np.bincount(_bin_index(edges, proba), minlength=len(edges) + 1)
+    return {"edges": [float(e) for e in edges], "counts": [int(c) for c in counts],
+            "n_rows": int(proba.size), "mean": float(proba.mean()) if proba.size else None}
+
+
+def write_reference(proba: np.ndarray, path: Path = REFERENCE_PATH) -> dict:
+    reference = {"timestamp": dt.datetime.now().isoformat(), "proba": proba_reference(proba)}
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(reference, f, indent=2)
+    return reference
+
+
+def load_reference(path: Path = REFERENCE_PATH) -> dict | None:
+    try:
+        return json.loads(Path(path).read_text()).get("proba")
+    except (OSError, ValueError):
+        return None
+
+
+def _bin_index(edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # Bin 0 is v <= edges[0], bin j is edges[j-1] < v <= edges[j], bin len(edges) is v > edges[-1];
+    # cumulative counts at edges[j] are then counts of v <= edges[j] (a right-continuous CDF).
+    return np.searchsorted(edges, values, side="left")
+
+
+# -----------------------------------------
+# Streaming monitor
+# -----------------------------------------
+
+class _Column:
+    """Counts for one column on fixed edges, with the baseline CDF at the same edges."""
+
+    def __init__(self, edges: np.ndarray, base_cdf: np.ndarray, base_mean: float | None):
+        self.edges = edges
+        self.base_cdf = base_cdf
+        self.base_mean = base_mean
+        self.counts = np.zeros(len(edges) + 1, dtype="int64")
+        self.nulls = 0
+        self.total = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        ok = np.isfinite(values)
+        if not ok.all():
+            self.nulls += int(values.size - ok.sum())
+            values = values[ok]
+        self.counts += np.bincount(_bin_index(self.edges, values), minlength=self.counts.size)
+        self.total += float(values.sum())
+
+    def merge(self, other: "_Column") -> None:
+        self.counts += other.counts
+        self.nulls += other.nulls
+        self.total += other.total
+
+    def result(self) -> dict:
+        n = int(self.counts.sum())
+        if not n:
+            return {"n": 0, "nulls": self.nulls, "psi": None, "ks": None, "status": "no data"}
+        obs_cdf = np.cumsum(self.counts)[:-1] / n
+        ks = float(np.max(np.abs(obs_cdf - self.base_cdf)))
+        actual = np.diff(np.concatenate([[0.0], obs_cdf, [1.0]]))
+        expected = np.diff(np.concatenate([[0.0], self.base_cdf, [1.0]]))
+        actual, expected = np.maximum(actual, PSI_EPS), np.maximum(expected, PSI_EPS)
+        psi = float(np.sum((actual - expected) * np.log(actual / expected)))
+        return {"n": n, "nulls": self.nulls, "psi": round(psi, 6), "ks": round(ks, 6), "status": psi_status(psi),
+                "mean": self.total / n, "baseline_mean": self.base_mean}
+
+
+def psi_status(psi: float) -> str:
+    return "stable" if psi < PSI_MODERATE else "moderate" if psi < PSI_SIGNIFICANT else "significant"
+
+
+def _values(chunk, name: str) -> np.ndarray | None:
+    """float64 values of ``name`` (NULL -> NaN) from a DataFrame or a pyarrow Table, or None if absent."""
+    if hasattr(chunk, "column_names"):
+        if name not in chunk.column_names:
+            return None
+        return np.asarray(chunk.column(name).to_numpy(), dtype="float64")
+    if name not in chunk.columns:
+        return None
+    return chunk[name].to_numpy(dtype="float64", na_value=np.nan)
+
+
+class DriftMonitor:
+    """Fixed-bin histograms of each feature and ``proba``, accumulated chunk by chunk."""
+
+    def __init__(self, baseline: dict[str, tuple[np.ndarray, np.ndarray, float]], reference: dict | None = None):
+        self.columns = {col: _Column(knots, cdf, mean) for col, (knots, cdf, mean) in baseline.items()}
+        if reference is not None:
+            edges = np.asarray(reference["edges"], dtype="float64")
+            counts = np.asarray(reference["counts"], dtype="float64")
+            base_cdf = np.cumsum(counts)[:-1] / max(counts.sum(), 1.0)
+            self.columns["proba"] = _Column(edges, base_cdf, reference.get("mean"))
+        self.rows = 0
+
+    @classmethod
+    def from_files(cls, descriptives: Path = DESCRIPTIVES_PATH, reference: Path = REFERENCE_PATH) -> "DriftMonitor":
+        """Feature baselines from the descriptives CSV; ``proba`` only when a reference file exists."""
+        return cls(load_baseline(descriptives), load_reference(reference))
+
+    def update(self, chunk) -> None:
+        """Add one chunk (a DataFrame, or a pyarrow Table as written by batch_score)."""
+        for name, column in self.columns.items():
+            values = _values(chunk, name)
+            if values is not None:
+                column.update(values)
+        self.rows += chunk.num_rows if hasattr(chunk, "num_rows") else len(chunk)
+
+    def merge(self, other: "DriftMonitor") -> "DriftMonitor":
+        for name, column in other.columns.items():
+            self.columns[name].merge(column)
+        self.rows += other.rows
+        return self
+
+    def result(self) -> dict:
+        """JSON-ready drift payload: per-column PSI / KS / means and the worst status."""
+        columns = {name: column.result() for name, column in self.columns.items()}
+        ranked = sorted((c for c in columns if columns[c]["psi"] is not None), key=lambda c: -columns[c]["psi"])
+        order = ["stable", "moderate", "significant"]
+        worst = max((order.index(columns[c]["status"]) for c in ranked), default=0)
+        return {"n_rows": int(self.rows), "status": order[worst],
+                "thresholds": {"psi_moderate": PSI_MODERATE, "psi_significant": PSI_SIGNIFICANT},
+                "drifted": [c for c in ranked if columns[c]["status"] != "stable"],
+                "top_psi": ranked[:5], "columns": columns}
+
+    def write_signal(self, path: Path = DRIFT_PATH, source: str | None = None) -> dict:
+        signal = {"timestamp": dt.datetime.now().isoformat(), "source": source,
+                  "proba_reference": "proba" in self.columns, **self.result()}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(signal, f, indent=2)
+        return signal
+
+
+# -----------------------------------------
+# Scored files
+# -----------------------------------------
+
+def iter_scored(path: Path, chunksize: int = 250_000) -> Iterator:
+    """Chunks of a scored file: Parquet row groups as pyarrow Tables, CSV as DataFrames."""
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    if path.suffix == ".parquet":
+        pf = pq.ParquetFile(path, memory_map=True)
+        for rg in range(pf.num_row_groups):
+            yield pf.read_row_group(rg)
+        return
+    import pandas as pd
+
+    yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def monitor_chunks(chunks: Iterable, monitor: DriftMonitor) -> DriftMonitor:
+    for chunk in chunks:
+        monitor.update(chunk)
+    return monitor
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Compare a scored file against the training baseline (PSI / KS per column).")
+    ap.add_argument("scored", type=Path, help="scored transactions (.parquet or .csv) with feature columns and proba")
+    ap.add_argument("--descriptives", type=Path, default=DESCRIPTIVES_PATH)
+    ap.add_argument("--reference", type=Path, default=REFERENCE_PATH, help="proba baseline (drift_reference.json)")
+    ap.add_argument("--out", type=Path, default=DRIFT_PATH)
+    ap.add_argument("--write-reference", action="store_true",
+                    help="save this file's proba histogram as the proba baseline instead of checking drift")
+    args = ap.parse_args(argv)
+
+    if args.write_reference:
+        import pyarrow.parquet as pq
+        import pandas as pd
+
+        if args.scored.suffix == ".parquet":
+            proba = pq.read_table(args.scored, columns=["proba"], memory_map=True).column(0).to_numpy()
+        else:
+            proba = pd.read_csv(args.scored, usecols=["proba"])["proba"].to_numpy()
+        reference = write_reference(proba, args.reference)
+        print(f"Saved proba reference ({reference['proba']['n_rows']:,} rows) -> {args.reference.resolve()}")
+        return
+
+    monitor = monitor_chunks(iter_scored(args.scored), DriftMonitor.from_files(args.descriptives, args.reference))
+    signal = monitor.write_signal(args.out, source=str(args.scored))
+    for name in signal["top_psi"]:
+        c = signal["columns"][name]
+        print(f"{name:<8} psi={c['psi']:.4f}  ks={c['ks']:.4f}  {c['status']}")
+    if not signal["proba_reference"]:
+        print(f"No proba reference at {args.reference}; only features were checked")
+    print(f"Drift status: {signal['status']} over {signal['n_rows']:,} rows")
+    print(f"Saved drift signal -> {args.out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Fast-start scoring from a compact, sklearn-free model file.
+
+Loading baseline_fraud_model.joblib means importing sklearn and joblib,
+which takes seconds. That is too slow for short-lived batch workers and
+serverless handlers. ``export`` flattens the model once into
+baseline_fraud_model.npz, next to the joblib. The file holds the
+coefficients, intercept, feature order and (for a scaler + linear
+Pipeline) the scaler's mean/scale, plus the joblib's sha256. fraud.py's
+train stage writes it after each fit.
+
+Module import only needs NumPy. pyarrow is imported when a file is
+scored, and sklearn/joblib only by ``export`` (or as a fallback when
+there is no compact file). Loading checks the stored hash against the
+joblib when one is present, so a stale export is refused instead of
+silently scoring with old weights.
+
+Usage:
+    python fast_score.py export [--model data/external/baseline_fraud_model.joblib]
+    python fast_score.py score input.parquet [--out transactions_with_scores.parquet] [--csv]
+    echo '{"Time": 0, "V1": -1.2, ..., "Amount": 9.99}' | python fast_score.py predict [--fill-missing]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent / "data" / "external"
+MODEL_PATH = HERE / "baseline_fraud_model.joblib"
+SCORED_NAME = "transactions_with_scores.parquet"
+COMPACT_VERSION = 1
+
+
+def compact_path(model_path: Path = MODEL_PATH) -> Path:
+    """The compact file written next to ``model_path`` (same name, .npz)."""
+    return Path(model_path).with_suffix(".npz")
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def fold_scaler(coef: np.ndarray, intercept: float, mean: np.ndarray | None = None,
+                scale: np.ndarray | None = None) -> tuple[np.ndarray, float]:
+    """Fold a standardizing step into the weights: coef / scale, intercept - sum(coef * mean / scale)."""
+    coef = np.asarray(coef, dtype="float64")
+    if scale is not None and np.size(scale):
+        coef = coef / scale
+    if mean is not None and np.size(mean):
+        intercept = float(intercept) - float(np.sum(coef * mean))
+    return coef, float(intercept)
+
+
+# -----------------------------------------
+# Model
+# -----------------------------------------
+
+class LinearModel:
+    """Logistic regression as raw arrays: proba = sigmoid(X @ coef + intercept)."""
+
+    def __init__(self, coef: np.ndarray, intercept: float, features: list[str]):
+        self.coef = np.ascontiguousarray(coef, dtype="float64").ravel()
+        self.intercept = float(intercept)
+        self.features = list(features)
+        self._index = {f: i for i, f in enumerate(self.features)}
+
+    @classmethod
+    def from_joblib(cls, path: Path = MODEL_PATH) -> "LinearModel":
+        from batch_score import feature_names, linear_parts, load_model
+
+        model = load_model(path)
+        return cls(*linear_parts(model), feature_names(model, []))
+
+    @classmethod
+    def from_compact(cls, path: Path = compact_path(), source: Path | None = None) -> "LinearModel":
+        """Load an exported .npz; if ``source`` (the joblib) exists, it must match the stored hash."""
+        with np.load(path, allow_pickle=False) as z:
+            if int(z["version"]) != COMPACT_VERSION:
+                raise ValueError(f"{path} has format version {int(z['version'])}; expected {COMPACT_VERSION}")
+            if source is not None and Path(source).exists() and str(z["source_sha256"]) != _sha256(source):
+                raise ValueError(f"{path} is stale for {source}; re-run: python fast_score.py export --model {source}")
+            coef, intercept = fold_scaler(z["coef"], float(z["intercept"]), z["scaler_mean"], z["scaler_scale"])
+            return cls(coef, intercept, z["features"].tolist())
+
+    @classmethod
+    def load(cls, model_path: Path = MODEL_PATH) -> "LinearModel":
+        """The compact file next to ``model_path`` when present, else the joblib itself."""
+        compact = compact_path(model_path)
+        if compact.exists():
+            return cls.from_compact(compact, source=model_path)
+        return cls.from_joblib(model_path)
+
+    def matrix(self, rows: list[dict], fill_missing: bool = False) -> np.ndarray:
+        """Dense (n, n_features) matrix from feature dicts.
+
+        A model feature that is missing or null raises ValueError naming it; with
+        ``fill_missing`` it is 0 instead (offline use only: 0 is not neutral for
+        the unscaled Time / Amount).
+        """
+        X = np.zeros((len(rows), len(self.features)))
+        for i, row in enumerate(rows):
+            if not fill_missing:
+                missing = [f for f in self.features if row.get(f) is None]
+                if missing:
+                    raise ValueError(f"missing model feature(s): {', '.join(missing)}")
+            for name, value in row.items():
+                j = self._index.get(name)
+                if j is not None and value is not None:
+                    X[i, j] = value
+        return X
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        z = X @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-z))
+
+
+def export_compact(model_path: Path = MODEL_PATH, out_path: Path | None = None) -> Path:
+    """Write the compact .npz for a LogisticRegression or scaler + linear Pipeline joblib."""
+    from batch_score import feature_names, load_model
+
+    model = load_model(model_path)
+    steps = getattr(model, "steps", None)
+    clf = steps[-1][1] if steps else model
+    scaler = steps[0][1] if steps and len(steps) > 1 else None
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    features = feature_names(model, [])
+    if not features:
+        raise ValueError(f"{model_path} has no feature_names_in_; fit it on a DataFrame before exporting")
+    out_path = Path(out_path) if out_path is not None else compact_path(model_path)
+    np.savez(
+        out_path,
+        version=np.array(COMPACT_VERSION),
+        coef=np.asarray(clf.coef_[0], dtype="float64"),
+        intercept=np.array(float(clf.intercept_[0])),
+        features=np.array(features, dtype=str),
+        scaler_mean=np.asarray(mean if mean is not None else [], dtype="float64"),
+        scaler_scale=np.asarray(scale if scale is not None else [], dtype="float64"),
+        source_sha256=np.array(_sha256(model_path)),
+    )
+    return out_path
+
+
+# -----------------------------------------
+# Scoring
+# -----------------------------------------
+
+def score_file(model: LinearModel, input_path: Path, out_path: Path, csv_path: Path | None = None) -> int:
+    """Stream a Parquet (by row group) or CSV (by block) file to ``out_path`` with ``proba``; no pandas."""
+    import pyarrow as pa
+
+    from batch_score import ScoredWriter, with_proba
+
+    input_path = Path(input_path)
+    if input_path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(input_path, memory_map=True)
+        names = pf.schema_arrow.names
+        tables = (pf.read_row_group(rg) for rg in range(pf.num_row_groups))
+    else:
+        import pyarrow.csv as pcsv
+
+        reader = pcsv.open_csv(input_path)
+        names = reader.schema.names
+        tables = (pa.Table.from_batches([batch]) for batch in reader)
+    missing = [f for f in model.features if f not in names]
+    if missing:
+        raise ValueError(f"{input_path} is missing model feature(s): {', '.join(missing)}")
+
+    with ScoredWriter(out_path, csv_path) as out:
+        for table in tables:
+            X = np.column_stack([table.column(f).to_numpy().astype("float64", copy=False) for f in model.features])
+            out.write(with_proba(table, model.predict_proba(X)))
+        return out.rows
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Score with the compact (sklearn-free) Protector model.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    export_p = sub.add_parser("export", help="write the compact .npz next to the joblib")
+    export_p.add_argument("--out", type=Path, default=None, help="defaults to <model>.npz")
+    score_p = sub.add_parser("score", help="score a .parquet or .csv file")
+    score_p.add_argument("input", type=Path)
+    score_p.add_argument("--out", type=Path, default=None)
+    score_p.add_argument("--csv", action="store_true", help="also stream a CSV copy (for Power BI)")
+    predict_p = sub.add_parser("predict", help="score JSON feature dict(s) from an argument or stdin")
+    predict_p.add_argument("json", nargs="?", default=None)
+    predict_p.add_argument("--fill-missing", action="store_true",
+                           help="score missing/null features as 0 instead of rejecting the row")
+    for p in sub.choices.values():
+        p.add_argument("--model", type=Path, default=MODEL_PATH)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "export":
+        out = export_compact(args.model, args.out)
+        print(f"Saved compact model -> {out.resolve()}")
+        return
+
+    t0 = time.perf_counter()
+    model = LinearModel.load(args.model)
+    if args.cmd == "predict":
+        rows = json.loads(args.json if args.json is not None else sys.stdin.read())
+        single = isinstance(rows, dict)
+        proba = model.predict_proba(model.matrix([rows] if single else rows, args.fill_missing)).tolist()
+        print(json.dumps({"proba": proba[0] if single else proba}))
+        return
+
+    out = args.out or args.input.with_name(SCORED_NAME)
+    csv_path = out.with_suffix(".csv") if args.csv else None
+    rows = score_file(model, args.input, out, csv_path)
+    elapsed = time.perf_counter() - t0
+    print(f"Saved scored transactions ({rows:,} rows, {rows / max(elapsed, 1e-9):,.0f} rows/sec) -> {out.resolve()}")
+    if csv_path is not None:
+        print(f"Saved scored transactions CSV -> {csv_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
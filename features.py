@@ -0,0 +1,233 @@
+"""
+Vectorized rule features — the Python twin of the v_feat_* views in
+data/external/fraud.ddl.sql.
+
+- v_feat_velocity: tx_30m_cnt, the customer's transactions in the 30 minutes
+  up to and including txn_ts (RANGE frame, so same-timestamp peers count).
+- v_feat_geo:      geo_mismatch, txn country IS DISTINCT FROM the country of
+  the customer's latest login, when txn_ts falls within 2 hours after it.
+- v_feat_device:   device_low_rep, risk_reputation <= 20 (false if unknown).
+
+Everything is computed in bulk with NumPy: per-customer sorted timestamp
+arrays are laid end to end under one composite key and probed with binary
+search, logins are attached with an as-of style lookup, and device flags
+come from a dense array indexed by device_id.
+
+Timestamps are handled as int64 microseconds since the epoch (the SQL
+timestamp resolution), so window edges compare exactly like the views.
+
+Usage:
+    python features.py txn.parquet --logins data/external/login_event.csv \\
+        --devices data/external/device.csv --out txn_features.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+VELOCITY_WINDOW_US = 30 * 60 * 1_000_000      # INTERVAL '30 minutes'
+LOGIN_WINDOW_US = 2 * 60 * 60 * 1_000_000     # INTERVAL '2 hour'
+LOW_REP_MAX = 20                              # risk_reputation <= 20
+
+# Some device drops carry reputation tiers instead of 0-100 scores; map them onto
+# the score scale so the same <= 20 cut applies.
+REPUTATION_TIER_SCORES = {"low": 10, "medium": 50, "high": 90}
+
+TXN_COLS = ["txn_id", "customer_id", "device_id", "txn_ts", "country"]
+LOGIN_COLS = ["customer_id", "login_ts", "country"]
+DEVICE_COLS = ["device_id", "risk_reputation"]
+
+
+# -----------------------------------------
+# Helpers
+# -----------------------------------------
+
+def to_epoch_us(values) -> np.ndarray:
+    """int64 microseconds since the epoch (UTC) from ISO strings, datetimes or ints."""
+    s = pd.Series(values)
+    if pd.api.types.is_integer_dtype(s):
+        return s.to_numpy(dtype="int64")
+    ts = pd.to_datetime(s, utc=True, format="ISO8601")
+    return ((ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(1, "us")).to_numpy(dtype="int64")
+
+
+def _group_keys(groups: np.ndarray, ts: np.ndarray, *extra_ts: np.ndarray):
+    """Composite (group, time-rank) keys that sort like per-group timestamp arrays.
+
+    Times are replaced by their rank among all distinct times involved, so the
+    key never overflows int64 whatever the time span or number of groups.
+    Returns (key function, rank lookup).
+    """
+    uniq = np.unique(np.concatenate([ts, *extra_ts]))
+    width = np.int64(uniq.size + 1)
+
+    def key(g, rank):
+        return (g.astype("int64") + 1) * width + rank  # +1 so NULL groups (-1) stay >= 0
+
+    def rank_of(t, side="left"):
+        return np.searchsorted(uniq, t, side=side).astype("int64")
+
+    return key, rank_of
+
+
+# -----------------------------------------
+# Array kernels
+# -----------------------------------------
+
+def velocity_counts(customer_codes: np.ndarray, ts_us: np.ndarray,
+                    window_us: int = VELOCITY_WINDOW_US) -> np.ndarray:
+    """Per-row count of same-customer rows with ts in [ts - window, ts]."""
+    key, rank_of = _group_keys(customer_codes, ts_us)
+    sorted_keys = np.sort(key(customer_codes, rank_of(ts_us)))
+    hi = np.searchsorted(sorted_keys, key(customer_codes, rank_of(ts_us)), side="right")
+    lo = np.searchsorted(sorted_keys, key(customer_codes, rank_of(ts_us - window_us)), side="left")
+    return (hi - lo).astype("int64")
+
+
+def last_login_lookup(txn_codes: np.ndarray, txn_ts: np.ndarray, login_codes: np.ndarray,
+                      login_ts: np.ndarray, asof: bool = False) -> np.ndarray:
+    """Index into the login arrays for each transaction (-1 when none).
+
+    ``asof=False`` mirrors the view: the customer's latest login overall
+    (ROW_NUMBER() ... ORDER BY login_ts DESC = 1). ``asof=True`` takes the
+    latest login at or before txn_ts, which is what a live feed can know.
+    """
+    out = np.full(txn_codes.size, -1, dtype="int64")
+    if not login_codes.size:
+        return out
+
+    key, rank_of = _group_keys(login_codes, login_ts, txn_ts)
+    login_keys = key(login_codes, rank_of(login_ts))
+    order = np.argsort(login_keys, kind="stable")
+    sorted_keys = login_keys[order]
+
+    if asof:
+        probe = key(txn_codes, rank_of(txn_ts))
+    else:
+        probe = key(txn_codes, rank_of(np.array([np.iinfo("int64").max]), side="right"))  # past every real rank
+    pos = np.searchsorted(sorted_keys, probe, side="right") - 1
+    ok = (pos >= 0) & (txn_codes >= 0)  # NULL customer_id never joins
+    ok[ok] = login_codes[order[pos[ok]]] == txn_codes[ok]
+    out[ok] = order[pos[ok]]
+    return out
+
+
+def geo_mismatch(txn_country: np.ndarray, login_country: np.ndarray) -> np.ndarray:
+    """``login_country IS DISTINCT FROM txn_country`` on factorized codes (-1 = NULL)."""
+    return txn_country != login_country
+
+
+def device_low_rep_lookup(device_ids: np.ndarray, reputation) -> np.ndarray:
+    """Dense bool array indexed by device_id: True where reputation <= LOW_REP_MAX."""
+    rep = pd.Series(reputation)
+    scores = pd.to_numeric(rep, errors="coerce")
+    tiers = rep.astype("string").str.lower().map(REPUTATION_TIER_SCORES)
+    scores = scores.fillna(tiers).to_numpy(dtype="float64")
+
+    device_ids = np.asarray(device_ids, dtype="int64")
+    lookup = np.zeros(int(device_ids.max()) + 1 if device_ids.size else 0, dtype=bool)
+    lookup[device_ids] = scores <= LOW_REP_MAX  # NaN compares False -> COALESCE(..., false)
+    return lookup
+
+
+def apply_lookup(lookup: np.ndarray, ids) -> np.ndarray:
+    """lookup[ids] with NULL / out-of-range ids mapped to False."""
+    ids = pd.to_numeric(pd.Series(ids), errors="coerce").to_numpy(dtype="float64")
+    ok = ~np.isnan(ids) & (ids >= 0) & (ids < lookup.size)
+    out = np.zeros(ids.size, dtype=bool)
+    out[ok] = lookup[ids[ok].astype("int64")]
+    return out
+
+
+# -----------------------------------------
+# View equivalents
+# -----------------------------------------
+
+def feat_velocity(txn: pd.DataFrame) -> pd.DataFrame:
+    """v_feat_velocity: txn_id, customer_id, txn_ts, tx_30m_cnt."""
+    codes, _ = pd.factorize(txn["customer_id"])
+    out = txn[["txn_id", "customer_id", "txn_ts"]].copy()
+    out["tx_30m_cnt"] = velocity_counts(codes, to_epoch_us(txn["txn_ts"]))
+    return out
+
+
+def feat_geo(txn: pd.DataFrame, logins: pd.DataFrame, asof: bool = False) -> pd.DataFrame:
+    """v_feat_geo: txn_id, customer_id, txn_country, login_country, geo_mismatch."""
+    cust_codes, _ = pd.factorize(pd.concat([txn["customer_id"], logins["customer_id"]], ignore_index=True))
+    txn_cust, login_cust = cust_codes[:len(txn)], cust_codes[len(txn):]
+    country_codes, countries = pd.factorize(pd.concat([txn["country"], logins["country"]], ignore_index=True))
+    txn_ctry, login_ctry = country_codes[:len(txn)], country_codes[len(txn):]
+
+    txn_ts = to_epoch_us(txn["txn_ts"])
+    login_ts = to_epoch_us(logins["login_ts"])
+    idx = last_login_lookup(txn_cust, txn_ts, login_cust, login_ts, asof=asof)
+
+    # LEFT JOIN ... AND txn_ts BETWEEN login_ts AND login_ts + 2h
+    hit = idx >= 0
+    hit[hit] = (txn_ts[hit] >= login_ts[idx[hit]]) & (txn_ts[hit] <= login_ts[idx[hit]] + LOGIN_WINDOW_US)
+    joined_ctry = np.full(len(txn), -1, dtype=country_codes.dtype)
+    joined_ctry[hit] = login_ctry[idx[hit]]
+
+    out = txn[["txn_id", "customer_id"]].copy()
+    out["txn_country"] = txn["country"].to_numpy()
+    names = np.append(np.asarray(countries, dtype=object), None)  # code -1 -> None
+    out["login_country"] = names[joined_ctry]
+    out["geo_mismatch"] = geo_mismatch(txn_ctry, joined_ctry)
+    return out
+
+
+def feat_device(txn: pd.DataFrame, devices: pd.DataFrame | None, lookup: np.ndarray | None = None) -> pd.DataFrame:
+    """v_feat_device: txn_id, device_low_rep.
+
+    ``lookup`` (dense bool by device_id, e.g. dimstore.device_low_rep_lookup) replaces the device frame.
+    """
+    if lookup is None:
+        lookup = device_low_rep_lookup(devices["device_id"].to_numpy(), devices["risk_reputation"])
+    out = txn[["txn_id"]].copy()
+    out["device_low_rep"] = apply_lookup(lookup, txn["device_id"])
+    return out
+
+
+def build_features(txn: pd.DataFrame, logins: pd.DataFrame, devices: pd.DataFrame | None, asof: bool = False,
+                   device_lookup: np.ndarray | None = None) -> pd.DataFrame:
+    """All three views side by side, one row per transaction (input order)."""
+    out = txn[["txn_id"]].copy()
+    out["tx_30m_cnt"] = feat_velocity(txn)["tx_30m_cnt"].to_numpy()
+    out["geo_mismatch"] = feat_geo(txn, logins, asof=asof)["geo_mismatch"].to_numpy()
+    out["device_low_rep"] = feat_device(txn, devices, device_lookup)["device_low_rep"].to_numpy()
+    return out
+
+
+def main(argv=None) -> None:
+    import ingest
+
+    here = Path(__file__).resolve().parent / "data" / "external"
+    ap = argparse.ArgumentParser(description="Compute tx_30m_cnt / geo_mismatch / device_low_rep for a Txn table.")
+    ap.add_argument("txn", type=Path, help="Txn table (.parquet or .csv)")
+    ap.add_argument("--logins", type=Path, default=here / "login_event.csv")
+    ap.add_argument("--devices", type=Path, default=here / "device.csv")
+    ap.add_argument("--dims", type=Path, default=None, help="dimension store (dimstore.py) instead of --devices")
+    ap.add_argument("--asof", action="store_true", help="use the latest login at or before each txn")
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    txn = ingest.read_table(args.txn, columns=TXN_COLS)
+    if args.dims:
+        from dimstore import DimensionTable, device_low_rep_lookup
+
+        devices, lookup = None, device_low_rep_lookup(DimensionTable.open(args.dims / "device"))
+    else:
+        devices, lookup = ingest.read_table(args.devices, columns=DEVICE_COLS), None
+    feats = build_features(txn, ingest.read_table(args.logins, columns=LOGIN_COLS), devices, asof=args.asof,
+                           device_lookup=lookup)
+    out = args.out or args.txn.with_name(args.txn.stem + "_features.parquet")
+    feats.to_parquet(out, index=False)
+    print(f"Saved features ({len(feats):,} rows) -> {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
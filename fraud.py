@@ -7,7 +7,6 @@ import os
 from pathlib import Path 
 import pandas as pd # for data handling
 import numpy as np # for numerical operations
-import matplotlib.pyplot as plt # for plotting
 
 # Make pandas prints friendlier.
 pd.set_option("display.max.columns", 100) # show up to 100 columns when printing dataframes
@@ -28,155 +27,212 @@ CSV_PATH = Path("../FourTwentyAnalytics/protector-model/data/external/creditcard
 print("CSV_PATH ->", CSV_PATH.resolve()) # print resolved path
 
 expected_cols = ["Time"] + [f"V{i}" for i in range(1, 29)] + ["Amount", "Class"]
-assert CSV_PATH.exists(), f"CSV not found at {CSV_PATH.resolve()} — fix CSV_PATH above." # fail early
+
+# Artifacts (kept consistent with the UI paths)
+ARTIFACT_DIR = CSV_PATH.parent  # e.g., .../protector-model/data/external
+SIGNAL_DIR = Path("../FourTwentyAnalytics/protector-model/signals/")
+MODEL_PATH = ARTIFACT_DIR / "baseline_fraud_model.joblib"
+COMPACT_MODEL_PATH = MODEL_PATH.with_suffix(".npz")  # sklearn-free export for fast_score.py
+SCORED_PATH = ARTIFACT_DIR / "transactions_with_scores.parquet"  # optional: for PBI
+CSV_EXPORT_PATH = SCORED_PATH.with_suffix(".csv")
+PLOT_NAMES = ["amount_distribution", "time_distribution", "class_distribution"]
+
+# Intermediates handed from stage to stage (plus the runner's cache stamps)
+WORK_DIR = ARTIFACT_DIR / ".cache" / "pipeline"
+DEDUP_PATH = WORK_DIR / "deduped.parquet"
+COV_PATH = WORK_DIR / "covariance.npz"
+SPLIT_PATH = WORK_DIR / "test_index.npy"
 
 # -----------------------------------------
-# 3) Load CSV (memory-friendly) with basic dtype (data type) hints
+# Stages
 # -----------------------------------------
+# Each section below is a named stage with declared inputs/outputs. The runner skips a
+# stage when its inputs, config and code are unchanged since the last run, and runs
+# independent stages (descriptives / plots / correlation / clean) side by side:
+#   python fraud.py [--only score,metrics] [--force] [--workers N] [--list]
+import ingest
+from pipeline import Pipeline
 
-df = pd.read_csv(CSV_PATH, low_memory=False) #, delimiter=",", encoding="utf-8")
+ingest.require_pyarrow()  # every stage reads or writes Parquet: fail here, not mid-run
+from drift import REFERENCE_PATH as DRIFT_REFERENCE_PATH  # proba baseline read by drift.py / batch_score.py --drift
+
+pipeline = Pipeline(WORK_DIR, perf_path=SIGNAL_DIR / "pipeline_perf.json")  # per-stage time/RSS/rows signal
 
-print("Initial dataframe shape:", df.shape) # print shape of dataframe - document shape
-print("Dataframe columns:", df.columns.tolist()) # print list of columns - document columns
-print("Dataframe dtypes:\n", df.dtypes) # print data types of each column - document dtypes (data types)
-print("First 3 rows of the dataframe:\n", df.head(3)) # show first 3 rows of the dataframe
 
 # -----------------------------------------
+# 3) Load CSV (memory-friendly) with basic dtype (data type) hints
 # 4) Sanity Checks (nulls, duplicates, target distribution)
 # -----------------------------------------
 
-# 4.1) Missing values
-null_counts = df.isna().sum().sort_values(ascending=False)
-print("Missing values (top 10):")
-print(null_counts.head(10)) # expected to be zero for all columns in this dataset
-
-# 4.2a) Duplicates (row-level exact dupes)
-dup_count = df.duplicated().sum()
-print(f"Exact duplicate rows: {dup_count}")
-
-# 4.2b) Remove duplicates (if any)
-if dup_count > 0:
-	df = df.drop_duplicates().reset_index(drop=True)
-	print("Dataframe shape after removing duplicates:", df.shape) # print new shape after deduplication - document new shape
-
-# 4.3) Target distribution — a classic dataset is VERY imbalanced.
-if "Class" in df.columns:
-    target_counts = df["Class"].value_counts(dropna=False).sort_index()
-    target_ratio = target_counts / len(df)
-    print("Target counts:\n", target_counts.to_string())
-    print("Target ratios:\n", (target_ratio*100).round(4).astype(str) + "%")
-else:
-    print("Column 'Class' not found — confirm your dataset's target column name.")
+@pipeline.stage("load", inputs=[CSV_PATH], outputs=[DEDUP_PATH, COV_PATH], max_digest_mb=1024)
+def load(max_digest_mb):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    import ingest
+    import correlation
+    import dedup
+
+    assert CSV_PATH.exists(), f"CSV not found at {CSV_PATH.resolve()} — fix CSV_PATH above." # fail early
+
+    # Chunked read with an explicit schema (float32 features, int8 Class); each chunk is
+    # checked against expected_cols and the result is cached as Parquet keyed by the CSV's
+    # content hash, so reruns memory-map the cache instead of re-parsing the CSV.
+    # Sums/cross-products for the full and per-class correlation matrices ride along in the
+    # same chunk pass that builds the cache (and are stored next to it for reruns).
+    cov = correlation.ingest_stats(CSV_PATH)
+    cache = ingest.ensure_cache(CSV_PATH)
+    n_rows = pq.ParquetFile(cache).metadata.num_rows
+
+    # Nothing below holds the full frame: the cache is streamed chunk by chunk and the
+    # kept rows go straight into DEDUP_PATH.
+    head = next(ingest.iter_cache_chunks(cache, batch_size=3))
+    print("Initial dataframe shape:", (n_rows, head.shape[1])) # print shape of dataframe - document shape
+    print("Dataframe columns:", head.columns.tolist()) # print list of columns - document columns
+    print("Dataframe dtypes:\n", head.dtypes) # print data types of each column - document dtypes (data types)
+    print("First 3 rows of the dataframe:\n", head) # show first 3 rows of the dataframe
+
+    # 4.2a) Duplicates (row-level exact dupes)
+    # Each row is reduced to a 64-bit digest and only digests are remembered. When even the
+    # digest set (8 bytes per row, worst case) would not fit in max_digest_mb, digests are
+    # spilled to disk partitions first and the keep mask drives a second pass.
+    if n_rows * 8 > max_digest_mb << 20:
+        keep_all, _ = dedup.first_occurrence_mask_external(lambda: ingest.iter_cache_chunks(cache),
+                                                                    workdir=WORK_DIR)
+        offset = 0
+
+        def first_mask(chunk):
+            nonlocal offset
+            offset += len(chunk)
+            return keep_all[offset - len(chunk):offset]
+    else:
+        deduper = dedup.ChunkDeduper()
+        first_mask = deduper.first_mask
+
+    # 4.1) Missing values, 4.2b) duplicate removal (keeps first occurrences, same as
+    # drop_duplicates) and 4.3) target counts, all in the same pass.
+    WORK_DIR.mkdir(parents=True, exist_ok=True)
+    null_counts = None
+    target_counts = pd.Series(dtype="int64")
+    rows_out = 0
+    writer = None
+    try:
+        for chunk in ingest.iter_cache_chunks(cache):
+            nulls = chunk.isna().sum()
+            null_counts = nulls if null_counts is None else null_counts + nulls
+            keep = first_mask(chunk)
+            if not keep.all():
+                cov.remove(chunk[~keep])  # take the dropped rows back out of the correlation sums
+                chunk = chunk[keep]
+            if "Class" in chunk.columns:
+                target_counts = target_counts.add(chunk["Class"].value_counts(dropna=False), fill_value=0)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(DEDUP_PATH, table.schema)
+            writer.write_table(table)
+            rows_out += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print("Missing values (top 10):")
+    print(null_counts.sort_values(ascending=False).head(10)) # expected to be zero for all columns in this dataset
+    print(f"Exact duplicate rows: {n_rows - rows_out}")
+    if rows_out < n_rows:
+        print("Dataframe shape after removing duplicates:", (rows_out, head.shape[1])) # document new shape
+
+    # 4.3) Target distribution — a classic dataset is VERY imbalanced.
+    if "Class" in head.columns:
+        target_counts = target_counts.astype("int64").sort_index()
+        target_ratio = target_counts / rows_out
+        print("Target counts:\n", target_counts.to_string())
+        print("Target ratios:\n", (target_ratio*100).round(4).astype(str) + "%")
+    else:
+        print("Column 'Class' not found — confirm your dataset's target column name.")
+
+    # Hand the correlation sums to the downstream stages (the deduplicated rows are already written).
+    cov.save(COV_PATH)
+    return {"rows_in": n_rows, "rows_out": rows_out}
+
 
 # -----------------------------------------
 # 5) Basic Descriptives
 # -----------------------------------------
 
-desc = df.describe(include="all", percentiles=[0.01, 0.25, 0.5, 0.75, 0.99]).T
-print("Descriptive statistics:\n", desc) # print descriptive statistics - document descriptives
+@pipeline.stage("describe", inputs=[DEDUP_PATH], outputs=[ARTIFACT_DIR / "creditcard_descriptives.csv"],
+                percentiles=[0.01, 0.25, 0.5, 0.75, 0.99])
+def describe(percentiles):
+    import ingest
+    import descriptives
+
+    # One streaming pass (running moments + mergeable quantile sketches) instead of
+    # df.describe, which sorts every column; same CSV layout for model.js.
+    desc = descriptives.describe_chunks(ingest.iter_cache_chunks(DEDUP_PATH), percentiles=percentiles)
+    print("Descriptive statistics:\n", desc) # print descriptive statistics - document descriptives
+
+    export_path = ARTIFACT_DIR / "creditcard_descriptives.csv" # define export path for descriptives
+    desc.to_csv(export_path, index=True) # export descriptives to CSV
+    print(f"Descriptive statistics exported to {export_path.resolve()}") # confirm export path
+    return {"rows_in": int(desc["count"].max()), "rows_out": len(desc)}
 
-export_path = CSV_PATH.parent / "creditcard_descriptives.csv" # define export path for descriptives
-desc.to_csv(export_path, index=True) # export descriptives to CSV
-print(f"Descriptive statistics exported to {export_path.resolve()}") # confirm export path
 
 # -----------------------------------------
 # 6) Basic Univariate Plots (UI-friendly exports)
 # -----------------------------------------
-from pathlib import Path
-import matplotlib.pyplot as plt
-
-# Where to save images (keep consistent with your UI paths)
-PLOT_DIR = CSV_PATH.parent  # e.g., .../protector-model/data/external
-PLOT_DIR.mkdir(parents=True, exist_ok=True)
-
-# Helper to export crisp PNGs (no transparency; high DPI)
-def save_figure(fig, name: str):
-    out = PLOT_DIR / f"{name}.png"  # use .png for web
-    fig.savefig(
-        out,
-        dpi=300,               # crisp text in UI
-        bbox_inches="tight",   # trims extra margins
-        facecolor="white",     # solid background (no alpha)
-        edgecolor="none"
-    )
-    plt.close(fig)             # free memory / avoid overlaps
-    print(f"Saved plot -> {out.resolve()}")
-
-# Sample for plotting if very large
-sample = df.sample(n=min(100_000, len(df)), random_state=42) if len(df) > 100_000 else df
-
-# 6.1) Amount distribution
-fig, ax = plt.subplots(figsize=(8, 5))
-ax.hist(sample["Amount"], bins=50, alpha=0.9)
-ax.set_title("Transaction Amount — Distribution")
-ax.set_xlabel("Amount")
-ax.set_ylabel("Frequency")
-ax.grid(True, alpha=0.25)
-save_figure(fig, "amount_distribution")  # writes .../amount_distribution.png
-
-# 6.2) Time distribution (if present)
-if "Time" in sample.columns:
-    fig, ax = plt.subplots(figsize=(8, 5))
-    ax.hist(sample["Time"], bins=50, alpha=0.9)
-    ax.set_title("Transaction Time — Distribution")
-    ax.set_xlabel("Time (seconds since first tx)")
-    ax.set_ylabel("Frequency")
-    ax.grid(True, alpha=0.25)
-    save_figure(fig, "time_distribution")
-
-# 6.3) Class distribution
-if "Class" in df.columns:
-    counts = sample["Class"].value_counts().sort_index()
-    # materialize counts as a concrete NumPy int array to avoid ExtensionArray typing issues
-    heights = counts.to_numpy().astype(int)
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.bar(counts.index.astype(str), heights, alpha=0.9)
-    ax.set_title("Transaction Class — Distribution")
-    ax.set_xlabel("Class")
-    ax.set_ylabel("Count")
-    for i, v in enumerate(heights):
-        ax.text(i, int(v), f"{int(v):,}", ha="center", va="bottom", fontsize=9)
-    ax.grid(True, axis="y", alpha=0.25)
-    save_figure(fig, "class_distribution")
+
+@pipeline.stage("plots", inputs=[DEDUP_PATH],
+                outputs=[ARTIFACT_DIR / "histograms.json"] + [ARTIFACT_DIR / f"{n}.png" for n in PLOT_NAMES])
+def plot():
+    import ingest
+    import plots
+
+    # Histogram counts come from one streaming pass over all rows (bins span each column's
+    # min/max from the Parquet statistics) and go to histograms.json for the UI. PNGs are
+    # re-rendered in worker processes only when a plot's bins changed, so matplotlib stays
+    # off the main path.
+    ranges = plots.ranges_from_parquet(DEDUP_PATH, ["Amount", "Time"])
+    hist = plots.histogram_chunks(ingest.iter_cache_chunks(DEDUP_PATH, columns=["Amount", "Time", "Class"]), ranges)
+    for out in plots.write_and_render(hist, ARTIFACT_DIR):
+        print(f"Saved plot -> {out.resolve()}")
+    print(f"Saved histogram bins -> {(ARTIFACT_DIR / plots.HIST_NAME).resolve()}")
+    return {"rows_in": hist["n_rows"]}
 
 
 # -----------------------------------------
 # 7) Quick Correlation Peek (subset)
 # -----------------------------------------
 
-subset_cols = [c for c in df.columns if c.startswith("V")][:8] + ["Amount", "Class"]
-subset_cols = [c for c in subset_cols if c in df.columns]
-if len(subset_cols) >= 2:
-    corr = df[subset_cols].corr(numeric_only=True)
-    print("Correlation (subset):\n", corr.round(3))
+@pipeline.stage("correlation", inputs=[COV_PATH],
+                outputs=[ARTIFACT_DIR / f"correlation_{n}.csv" for n in ("full", "nonfraud", "fraud", "subset")])
+def correlate():
+    import correlation
+
+    # Full 31x31 matrix plus fraud / non-fraud matrices from the streaming sums (no extra
+    # pass over df); correlation_subset.csv keeps its original V1..V8 + Amount + Class view.
+    cov = correlation.ClassCovariance.load(COV_PATH)
+    corr = cov.all.correlation()
+    subset_cols = [c for c in correlation.SUBSET if c in corr.columns]
+    print("Correlation (subset):\n", corr.loc[subset_cols, subset_cols].round(3))
     # Simple image-less view; for matrices, printing numeric is often more helpful than a heatmap wall.
 
-    export_path = CSV_PATH.parent / "correlation_subset.csv" # define export path for correlation
-    corr.to_csv(export_path, index=True) # export correlation to CSV
-    print(f"Correlation subset exported to {export_path.resolve()}") # confirm export path
-else:
-    print("Not enough numeric columns found for correlation subset.")
-    # No correlation file exported because not enough numeric columns were found.
+    for export_path in correlation.write_correlations(cov, ARTIFACT_DIR): # full, per-class and subset CSVs
+        print(f"Correlation exported to {export_path.resolve()}") # confirm export path
+    return {"rows_in": cov.all.n}
+
 
 # Save a compact cleaned artifact next to the raw file.
 
-clean = df.copy()
-# Drop any columns that are completely null to keep the artifact small and reset the index.
-clean = clean.dropna(axis=1, how="all").reset_index(drop=True)
+@pipeline.stage("clean", inputs=[DEDUP_PATH], outputs=[CSV_PATH.with_name(CSV_PATH.stem + "_clean.parquet")])
+def write_clean():
+    clean = pd.read_parquet(DEDUP_PATH)
+    # Drop any columns that are completely null to keep the artifact small and reset the index.
+    clean = clean.dropna(axis=1, how="all").reset_index(drop=True)
 
-out_path = CSV_PATH.with_name(CSV_PATH.stem + "_clean.parquet")
-try:
+    out_path = CSV_PATH.with_name(CSV_PATH.stem + "_clean.parquet")
     clean.to_parquet(out_path, index=False)
     print("Wrote cleaned dataset ->", out_path.resolve())
-except (ImportError, ValueError, OSError) as err:
-    # pandas.to_parquet raises ValueError when no engine is available
-    # catching ImportError/OSError covers installation/system errors too
-    print(f"Parquet write failed (maybe pyarrow/fastparquet not installed). Falling back to CSV. Error: {err}")
-    out_path = CSV_PATH.with_name(CSV_PATH.stem + "_clean.csv")
-    clean.to_csv(out_path, index=False)
-    print("Wrote cleaned dataset ->", out_path.resolve())
-
-print(clean.head(3))
+    print(clean.head(3))
+    return {"rows_in": len(clean), "rows_out": len(clean)}
 
 
 # -----------------------------------------
@@ -187,114 +243,149 @@ print(clean.head(3))
 # - Keep it simple, fast, and explainable
 # - Save a portable model artifact for the interview
 
-# ---- Imports (grouped up front) ----
-from pathlib import Path
-import joblib
+@pipeline.stage("train", inputs=[DEDUP_PATH], outputs=[MODEL_PATH, COMPACT_MODEL_PATH, SPLIT_PATH],
+                test_size=0.20, random_state=42)
+def train(test_size, random_state):
+    # ---- Imports (grouped up front) ----
+    import joblib
 
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report
+    import fast_score
 
-# ---- Config (edit paths if needed) ----
-ARTIFACT_DIR = Path("../FourTwentyAnalytics/protector-model/data/external")  # <- adjust if you want
-ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)  # make sure path exists
-MODEL_PATH = ARTIFACT_DIR / "baseline_fraud_model.joblib"
-SCORED_PATH = ARTIFACT_DIR / "transactions_with_scores.parquet"  # optional: for PBI
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report
 
-# ---- Sanity guard: do we have the target? ----
-if "Class" not in df.columns:
-    raise ValueError("Target column 'Class' not found — confirm your label field name.")
-
-# ---- Split features/target ----
-# We drop only the target; leave all other columns in for a quick baseline.
-X = df.drop(columns=["Class"], errors="ignore")
-y = df["Class"]
-
-# Stratify to preserve the extreme class imbalance in both train/test
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.20, stratify=y, random_state=42
-)
-
-# ---- Model (simple, robust defaults) ----
-# Notes:
-# - class_weight='balanced' handles the 0.17% prevalence without resampling
-# - max_iter bumped to avoid "reached limit" warnings
-# - solver='lbfgs' is fine here; 'saga' also works if you run into convergence issues
-model = LogisticRegression(
-    max_iter=5000,
-    class_weight="balanced",
-    solver="lbfgs",
-    n_jobs=-1  # harmless if ignored; speeds up some solvers
-)
-
-# ---- Fit ----
-model.fit(X_train, y_train)
-
-# ---- Evaluate at default 0.50 threshold (quick read) ----
-preds = model.predict(X_test)
-print("Baseline Logistic Regression Report (threshold=0.50):")
-print(classification_report(y_test, preds, digits=4))
-
-# ---- Save model artifact (kept close to training to avoid scope issues) ----
-joblib.dump(model, MODEL_PATH)
-print(f"Saved baseline model -> {MODEL_PATH.resolve()}")
+    df = pd.read_parquet(DEDUP_PATH)
 
-# ---- Optional: export probabilities for Power BI threshold demo ----
-from pathlib import Path
+    # ---- Sanity guard: do we have the target? ----
+    if "Class" not in df.columns:
+        raise ValueError("Target column 'Class' not found — confirm your label field name.")
 
-try:
-    proba = model.predict_proba(X_test)[:, 1]
-    scored = X_test.copy()
-    scored["Class"] = y_test.values
-    scored["proba"] = proba
+    # ---- Split features/target ----
+    # We drop only the target; leave all other columns in for a quick baseline.
+    X = df.drop(columns=["Class"], errors="ignore")
+    y = df["Class"]
 
-    # Define output paths
-    SCORED_PATH = Path(CSV_PATH.parent / "transactions_with_scores.parquet")
-    CSV_EXPORT_PATH = SCORED_PATH.with_suffix(".csv")
+    # Stratify to preserve the extreme class imbalance in both train/test
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, stratify=y, random_state=random_state
+    )
+
+    # ---- Model (simple, robust defaults) ----
+    # Notes:
+    # - class_weight='balanced' handles the 0.17% prevalence without resampling
+    # - max_iter bumped to avoid "reached limit" warnings
+    # - solver='lbfgs' is fine here; 'saga' also works if you run into convergence issues
+    model = LogisticRegression(
+        max_iter=5000,
+        class_weight="balanced",
+        solver="lbfgs",
+        n_jobs=-1  # harmless if ignored; speeds up some solvers
+    )
+
+    # ---- Fit ----
+    model.fit(X_train, y_train)
+
+    # ---- Evaluate at default 0.50 threshold (quick read) ----
+    preds = model.predict(X_test)
+    print("Baseline Logistic Regression Report (threshold=0.50):")
+    print(classification_report(y_test, preds, digits=4))
+
+    # ---- Save model artifact + which rows were held out (the score stage reuses them) ----
+    joblib.dump(model, MODEL_PATH)
+    np.save(SPLIT_PATH, X_test.index.to_numpy())
+    print(f"Saved baseline model -> {MODEL_PATH.resolve()}")
+
+    # ---- Compact copy (weights + feature order as .npz) for fast-start scoring ----
+    fast_score.export_compact(MODEL_PATH, COMPACT_MODEL_PATH)
+    print(f"Saved compact model -> {COMPACT_MODEL_PATH.resolve()}")
+    return {"rows_in": len(X_train), "rows_out": len(X_test)}
 
-    # Try Parquet first (compact, faster)
-    try:
-        scored.to_parquet(SCORED_PATH, index=False)
-        print(f"Saved scored transactions -> {SCORED_PATH.resolve()}")
-    except Exception as e:
-        print(f"Parquet export failed ({e}). Skipping to CSV fallback.")
 
-    # Always export CSV for Power BI
-    scored.to_csv(CSV_EXPORT_PATH, index=False)
+# ---- Optional: export probabilities for Power BI threshold demo ----
+
+@pipeline.stage("score", inputs=[DEDUP_PATH, MODEL_PATH, SPLIT_PATH],
+                outputs=[SCORED_PATH, CSV_EXPORT_PATH, DRIFT_REFERENCE_PATH])
+def score():
+    import batch_score
+    import drift
+
+    df = pd.read_parquet(DEDUP_PATH)
+    test_index = np.load(SPLIT_PATH)
+    X_test = df.drop(columns=["Class"], errors="ignore").iloc[test_index]
+    y_test = df["Class"].iloc[test_index]
+    model = batch_score.load_model(MODEL_PATH)
+    proba = model.predict_proba(X_test)[:, 1]
+
+    # Stream X_test + Class + proba out slice by slice (no X_test.copy()) to
+    # transactions_with_scores.parquet; the CSV for Power BI is written from the same batches.
+    batch_score.write_scored_frame(
+        X_test, {"Class": y_test.to_numpy(), "proba": proba}, SCORED_PATH, csv_path=CSV_EXPORT_PATH
+    )
+    print(f"Saved scored transactions -> {SCORED_PATH.resolve()}")
     print(f"Saved scored transactions CSV -> {CSV_EXPORT_PATH.resolve()}")
 
-except Exception as e:
-    print("Skipped probability export (predict_proba unavailable).", e)
+    # Held-out score histogram: the proba baseline for drift.py / batch_score.py --drift.
+    drift.write_reference(proba, DRIFT_REFERENCE_PATH)
+    print(f"Saved proba drift reference -> {DRIFT_REFERENCE_PATH.resolve()}")
+    return {"rows_in": len(X_test), "rows_out": len(X_test)}
 
 
 # -----------------------------------------
 # Export simple KPI metrics
 # -----------------------------------------
-import json
-from sklearn.metrics import precision_score, recall_score, f1_score
-
-# Evaluate at default 0.5 threshold
-proba = model.predict_proba(X_test)[:, 1]
-preds = (proba >= 0.5).astype(int)
-
-metrics = {
-    "precision": float(precision_score(y_test, preds)),
-    "recall": float(recall_score(y_test, preds)),
-    "f1": float(f1_score(y_test, preds)),
-    "threshold": 0.5,
-    "n_samples": len(y_test),
-    "timestamp": pd.Timestamp.now().isoformat()
-}
 
-SIGNAL_DIR = Path("../FourTwentyAnalytics/protector-model/signals/")
+@pipeline.stage("metrics", inputs=[SCORED_PATH], outputs=[SIGNAL_DIR / "baseline_metrics.json", SIGNAL_DIR.parent / "ui.json"],
+                threshold=0.5, n_resamples=2000)
+def export_metrics(threshold, n_resamples):
+    import json
+    from sklearn.metrics import precision_score, recall_score, f1_score
 
-metrics_path = SIGNAL_DIR / "baseline_metrics.json"
-with open(metrics_path, "w") as f:
-    json.dump(metrics, f, indent=2)
+    import bootstrap
+    import threshold_sweep
 
-print(f"Saved baseline metrics -> {metrics_path.resolve()}")
+    scored = pd.read_parquet(SCORED_PATH, columns=["Class", "proba"])
+    y_test, proba = scored["Class"].to_numpy(), scored["proba"].to_numpy()
+
+    # Evaluate at default 0.5 threshold
+    preds = (proba >= threshold).astype(int)
+
+    metrics = {
+        "precision": float(precision_score(y_test, preds)),
+        "recall": float(recall_score(y_test, preds)),
+        "f1": float(f1_score(y_test, preds)),
+        "threshold": threshold,
+        "n_samples": len(y_test),
+        "timestamp": pd.Timestamp.now().isoformat()
+    }
+
+    # ---- Bootstrap CIs (the test split has only ~95 frauds, so point estimates are noisy) ----
+    bootstrap.add_intervals(metrics, y_test, proba, n_resamples=n_resamples)
+    print("95% CIs:", {k: metrics["ci"][k] for k in ("precision", "recall", "f1")})
+
+    metrics_path = SIGNAL_DIR / "baseline_metrics.json"
+    with open(metrics_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+
+    print(f"Saved baseline metrics -> {metrics_path.resolve()}")
+
+    # ---- Threshold sweep for threshold_demo.html ----
+    # Scores are sorted once and cumulative sums give exact precision/recall/F1/alerts at
+    # every threshold; sampled on the slider's 0.001 grid and written to ui.json.
+    ui_path = SIGNAL_DIR.parent / "ui.json"
+    threshold_sweep.write_ui_json(y_test, proba, ui_path, baseline_threshold=threshold)
+    print(f"Saved threshold sweep -> {ui_path.resolve()}")
+    return {"rows_in": len(y_test)}
+
+
+# -----------------------------------------
+# Run
+# -----------------------------------------
+
+if __name__ == "__main__":
+    pipeline.main()
 
 
 # -----------------------------------------
 # End of Script
-# -----------------------------------------
\ No newline at end of file
+# -----------------------------------------
@@ -0,0 +1,163 @@
+"""
+Out-of-core, incremental training mode for the baseline fraud model.
+
+Section 10 of fraud.py refits LogisticRegression(lbfgs) on unscaled, fully
+in-memory features every time. This mode streams the typed Parquet cache
+from ingest.py chunk by chunk instead:
+
+1. pass over the chunks: StandardScaler.partial_fit + class counts
+2. ``--epochs`` passes: scale each chunk and SGDClassifier(log_loss).partial_fit
+
+Memory is one chunk regardless of history size. The artifact is a sklearn
+Pipeline(scaler, SGD) saved to baseline_fraud_model.joblib (and its
+compact .npz for fast_score.py), so batch_score.py and scoring_server.py
+load it unchanged.
+
+``--warm-start`` continues from the existing artifact when a new day of
+data arrives: the scaler keeps accumulating, the previous weights are
+re-expressed under the updated scaler (the decision function is unchanged
+by the re-expression), and only the new data is streamed. A plain
+LogisticRegression artifact (the one fraud.py writes) is converted the
+same way. Row and class counts carry over in a small JSON sidecar.
+
+Usage:
+    python incremental_train.py data/external/creditcard.csv [--epochs 3]
+    python incremental_train.py data/external/creditcard_2025-11-03.csv --warm-start
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import fast_score
+import ingest
+from batch_score import MODEL_PATH
+
+LABEL = "Class"
+FEATURES = [c for c in ingest.EXPECTED_COLS if c != LABEL]
+DEFAULT_EPOCHS = 3
+SGD_PARAMS = {"loss": "log_loss", "alpha": 1e-4, "learning_rate": "invscaling", "eta0": 0.01, "random_state": 42}
+
+
+def state_path(model_path: Path) -> Path:
+    return Path(model_path).with_suffix(".train_state.json")
+
+
+def _chunks(cache_paths: list[Path]):
+    for path in cache_paths:
+        yield from ingest.iter_cache_chunks(path, columns=FEATURES + [LABEL])
+
+
+def _class_weight(counts: np.ndarray) -> dict[int, float]:
+    # Same formula as class_weight="balanced", but over everything seen so far.
+    total = counts.sum()
+    return {c: float(total / (2 * n)) if n else 1.0 for c, n in enumerate(counts)}
+
+
+def _reexpress(coef: np.ndarray, intercept: float, old_mean, old_scale, new_mean, new_scale):
+    """Weights under a new scaler giving the same decision function.
+
+    ``old_mean=0, old_scale=1`` converts raw-feature weights (plain LogisticRegression).
+    """
+    new_coef = coef * new_scale / old_scale
+    new_intercept = intercept + float(np.sum(coef * (new_mean - old_mean) / old_scale))
+    return new_coef, new_intercept
+
+
+def train(csv_paths: list[Path], model_path: Path = MODEL_PATH, out_path: Path | None = None,
+          warm_start: bool = False, epochs: int = DEFAULT_EPOCHS, seed: int = 42):
+    """Stream ``csv_paths`` (via the Parquet cache) into a scaler + SGD pipeline and save it."""
+    import joblib
+    from sklearn.exceptions import InconsistentVersionWarning
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    out_path = Path(out_path or model_path)
+    caches = [ingest.ensure_cache(p) for p in csv_paths]
+    rng = np.random.default_rng(seed)
+
+    prev, prev_state = None, {"rows_seen": 0, "class_counts": [0, 0], "sources": []}
+    if warm_start and Path(model_path).exists():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", InconsistentVersionWarning)
+            prev = joblib.load(model_path)
+        if state_path(model_path).exists():
+            prev_state = json.loads(state_path(model_path).read_text())
+
+    # ---- Pass 1: streaming standardizer + class counts ----
+    if isinstance(prev, Pipeline):
+        scaler = copy.deepcopy(prev.named_steps["scaler"])
+    else:
+        scaler = StandardScaler()
+    counts = np.asarray(prev_state["class_counts"], dtype="int64")
+    new_rows = 0
+    for chunk in _chunks(caches):
+        scaler.partial_fit(chunk[FEATURES])
+        counts += np.bincount(chunk[LABEL].to_numpy(), minlength=2)[:2]
+        new_rows += len(chunk)
+    if new_rows == 0:
+        raise ValueError("No rows to train on")
+
+    # ---- Model: fresh, or carried over from the previous artifact ----
+    clf = SGDClassifier(class_weight=_class_weight(counts), **SGD_PARAMS)
+    if isinstance(prev, Pipeline):
+        old_clf, old_scaler = prev.named_steps["clf"], prev.named_steps["scaler"]
+        coef, intercept = _reexpress(old_clf.coef_[0], old_clf.intercept_[0], old_scaler.mean_,
+                                     old_scaler.scale_, scaler.mean_, scaler.scale_)
+        clf.t_ = getattr(old_clf, "t_", 1.0)  # keep the learning-rate schedule where it was
+    elif isinstance(prev, LogisticRegression):
+        coef, intercept = _reexpress(prev.coef_[0], prev.intercept_[0], 0.0, 1.0, scaler.mean_, scaler.scale_)
+        clf.t_ = float(max(prev_state["rows_seen"], new_rows))  # treat the LR as already converged
+    else:
+        coef = intercept = None
+    if coef is not None:
+        clf.coef_ = coef.reshape(1, -1).astype("float64")
+        clf.intercept_ = np.array([intercept], dtype="float64")
+
+    # ---- Passes 2..: SGD over scaled chunks (shuffled within each chunk) ----
+    for _ in range(epochs):
+        for chunk in _chunks(caches):
+            perm = rng.permutation(len(chunk))
+            X = scaler.transform(chunk[FEATURES].iloc[perm])
+            clf.partial_fit(X, chunk[LABEL].to_numpy()[perm], classes=np.array([0, 1]))
+
+    model = Pipeline([("scaler", scaler), ("clf", clf)])
+    joblib.dump(model, out_path)
+    fast_score.export_compact(out_path)  # keep the .npz next to it in step, or fast_score refuses it as stale
+    state = {
+        "rows_seen": int(prev_state["rows_seen"] + new_rows),
+        "class_counts": [int(c) for c in counts],
+        "sources": prev_state["sources"] + [p.name for p in caches],
+        "epochs": epochs,
+        "trained_at": pd.Timestamp.now().isoformat(),
+    }
+    state_path(out_path).write_text(json.dumps(state, indent=2))
+    return model, state
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Incrementally (re)train the baseline fraud model from cached chunks.")
+    ap.add_argument("csv", type=Path, nargs="+", help="creditcard CSV drop(s); cached via ingest.py")
+    ap.add_argument("--model", type=Path, default=MODEL_PATH)
+    ap.add_argument("--out", type=Path, default=None, help="defaults to --model")
+    ap.add_argument("--warm-start", action="store_true", help="continue from the existing artifact")
+    ap.add_argument("--epochs", type=int, default=DEFAULT_EPOCHS)
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    _, state = train(args.csv, args.model, args.out, args.warm_start, args.epochs)
+    print(f"Trained on {state['rows_seen']:,} rows total in {time.perf_counter() - t0:.1f}s "
+          f"-> {(args.out or args.model).resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Chunked, dtype-aware ingestion for creditcard.csv (and larger daily drops).
+
+The raw CSV is read in fixed-size chunks with an explicit schema
+(float32 for V1..V28 / Amount, int8 for Class), every chunk is checked
+against the expected columns, and the result is written to a Parquet
+cache keyed by the source file's content hash. Later runs memory-map the
+cache instead of re-parsing the CSV. pyarrow is required: the cache and
+every pipeline intermediate are Parquet, so require_pyarrow() fails fast
+with a clear message instead of part-way through a run.
+
+Usage:
+    python ingest.py path/to/creditcard.csv [--chunksize 250000] [--cache-dir DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pandas as pd
+
+# -----------------------------------------
+# Schema
+# -----------------------------------------
+
+EXPECTED_COLS = ["Time"] + [f"V{i}" for i in range(1, 29)] + ["Amount", "Class"]
+
+# Time stays float64 (seconds keep growing on multi-day drops); everything else is narrowed.
+DTYPES = {"Time": "float64", **{f"V{i}": "float32" for i in range(1, 29)}, "Amount": "float32", "Class": "int8"}
+
+DEFAULT_CHUNKSIZE = 250_000
+CACHE_DIRNAME = ".cache"
+_HASH_BLOCK = 1 << 20  # 1 MiB reads while hashing
+
+
+# -----------------------------------------
+# Content hashing
+# -----------------------------------------
+
+def file_digest(path: Path, cache_dir: Path | None = None) -> str:
+    """SHA-256 of the file contents.
+
+    When ``cache_dir`` is given, the digest is remembered next to the cache
+    together with the file's size and mtime, so an unchanged file is not
+    re-read just to find its key.
+    """
+    path = Path(path)
+    stat = path.stat()
+    memo = None
+    if cache_dir is not None:
+        memo = Path(cache_dir) / f"{path.name}.sha256.json"
+        try:
+            seen = json.loads(memo.read_text())
+            if seen["size"] == stat.st_size and seen["mtime_ns"] == stat.st_mtime_ns:
+                return seen["sha256"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    if memo is not None:
+        memo.parent.mkdir(parents=True, exist_ok=True)
+        memo.write_text(json.dumps({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}))
+    return digest
+
+
+# -----------------------------------------
+# Chunked CSV reader
+# -----------------------------------------
+
+def check_columns(columns, chunk_no: int = 0) -> None:
+    """Raise ValueError if a chunk is missing any of EXPECTED_COLS."""
+    missing = [c for c in EXPECTED_COLS if c not in columns]
+    if missing:
+        raise ValueError(f"Chunk {chunk_no}: missing expected columns {missing}")
+
+
+def iter_csv_chunks(csv_path: Path, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Yield schema-typed chunks of the raw CSV (expected columns only, in order)."""
+    reader = pd.read_csv(csv_path, dtype=DTYPES, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        check_columns(chunk.columns, i)
+        yield chunk[EXPECTED_COLS]
+
+
+# -----------------------------------------
+# Parquet cache
+# -----------------------------------------
+
+def cache_path_for(csv_path: Path, cache_dir: Path | None = None) -> Path:
+    """Location of the cache file for the current contents of ``csv_path``."""
+    csv_path = Path(csv_path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else csv_path.parent / CACHE_DIRNAME
+    digest = file_digest(csv_path, cache_dir)
+    return cache_dir / f"{csv_path.stem}.{digest[:16]}.parquet"
+
+
+def ensure_cache(csv_path: Path, cache_dir: Path | None = None, chunksize: int = DEFAULT_CHUNKSIZE,
+                 on_chunk: Callable[[pd.DataFrame], None] | None = None) -> Path:
+    """Build the Parquet cache for ``csv_path`` if it does not exist yet; return its path.
+
+    One row group is written per CSV chunk, so peak memory is a single chunk.
+    ``on_chunk`` sees every typed chunk as it is written (only when the cache
+    is actually built), so single-pass statistics can ride along.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out = cache_path_for(csv_path, cache_dir)
+    if out.exists():
+        return out
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".parquet.tmp")
+    writer = None
+    try:
+        for chunk in iter_csv_chunks(csv_path, chunksize):
+            if on_chunk is not None:
+                on_chunk(chunk)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"No rows found in {csv_path}")
+    os.replace(tmp, out)  # atomic: a half-written cache is never picked up
+    return out
+
+
+def require_pyarrow() -> None:
+    """Raise a clear ImportError up front when pyarrow is missing."""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as err:
+        raise ImportError("pyarrow is required (pip install pyarrow): the Parquet cache and the "
+                          "pipeline's intermediates are written with it") from err
+
+
+def read_cache(cache_path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """Load the cached frame through a memory map (no CSV parsing)."""
+    import pyarrow.parquet as pq
+
+    return pq.read_table(cache_path, columns=columns, memory_map=True).to_pandas()
+
+
+def iter_cache_chunks(cache_path: Path, columns: list[str] | None = None,
+                      batch_size: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Stream the cache back as DataFrames of at most ``batch_size`` rows."""
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(cache_path, memory_map=True)
+    for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Slice an in-memory frame into views for the chunked stages."""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def read_table(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """Read a CSV or Parquet table (the relational drops ship as either)."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def load_frame(csv_path: Path, cache_dir: Path | None = None, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """Typed frame for ``csv_path``, served from the Parquet cache (built on first use)."""
+    return read_cache(ensure_cache(csv_path, cache_dir, chunksize))
+
+
+# -----------------------------------------
+# CLI
+# -----------------------------------------
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Build the typed Parquet cache for a creditcard CSV drop.")
+    ap.add_argument("csv", type=Path)
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    ap.add_argument("--cache-dir", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    out = ensure_cache(args.csv, args.cache_dir, args.chunksize)
+    print(f"Cache ready -> {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
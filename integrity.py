@@ -0,0 +1,304 @@
+"""
+Referential-integrity checks for the fraud tables (integrity_report.json).
+
+Each parent key column is loaded once into a KeySet: a packed bitset when
+the keys are non-negative integers of reasonable range (one bit per
+possible id), otherwise a sorted unique array probed with searchsorted.
+Child tables are streamed a chunk at a time. Parquet children are split by
+row group, and workers read their own row group's FK column from a memory
+map; CSV children are read in blocks by the parent. Each chunk is checked
+with one vectorized membership test. Chunks from every FK pair go through
+the same process pool, so independent checks (and the row groups of one
+big table) run in parallel. Peak memory is the key sets plus one chunk
+per worker, whatever the child row counts.
+
+NULL foreign keys are not violations (same as a SQL FOREIGN KEY); they are
+counted separately in the console summary only.
+
+Tables are looked up as ``<tables-dir>/<table>.parquet`` or ``.csv``.
+Checks whose tables are not there are skipped with a note. They stay in
+the written report, marked ``"skipped": true``. The counts from the report
+being replaced are kept when it has them; otherwise the count is null.
+
+Usage:
+    python integrity.py [--tables-dir data/external] [--workers 4] [--out data/external/integrity_report.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent / "data" / "external"
+REPORT_NAME = "integrity_report.json"
+DEFAULT_EXAMPLES = 5
+DEFAULT_CHUNKSIZE = 1_000_000
+
+# (child table, FK column, parent table, parent key), in report order.
+FK_CHECKS = [
+    ("account", "customer_id", "customer", "customer_id"),
+    ("login_event", "customer_id", "customer", "customer_id"),
+    ("login_event", "device_id", "device", "device_id"),
+    ("txn", "account_id", "account", "account_id"),
+    ("txn", "customer_id", "customer", "customer_id"),
+    ("txn", "merchant_id", "merchant", "merchant_id"),
+    ("txn", "device_id", "device", "device_id"),
+    ("case_link", "txn_id", "txn", "txn_id"),
+]
+
+_KEYSETS: dict = {}  # per-worker parent key sets, set by _init_worker
+_EXAMPLES = DEFAULT_EXAMPLES
+
+
+# -----------------------------------------
+# Key sets
+# -----------------------------------------
+
+class KeySet:
+    """Membership test over a parent key column (bitset for dense ints, else sorted array)."""
+
+    def __init__(self, keys: np.ndarray):
+        keys = np.asarray(keys)
+        self.size = keys.size
+        self.bits = None
+        self.sorted = None
+        if keys.dtype.kind in "iu" and keys.size and keys.min() >= 0 and keys.max() < max(16 * keys.size, 1 << 20):
+            self.max = int(keys.max())
+            present = np.zeros(self.max + 1, dtype=bool)
+            present[keys] = True
+            self.bits = np.packbits(present, bitorder="little")
+        else:
+            self.sorted = np.unique(keys if keys.dtype.kind in "iuf" else keys.astype(str))
+
+    @property
+    def kind(self) -> str:
+        return "bitset" if self.bits is not None else "sorted"
+
+    def contains(self, values: np.ndarray) -> np.ndarray:
+        """Boolean mask: which ``values`` (no NULLs) are parent keys."""
+        values = np.asarray(values)
+        if self.bits is not None:
+            ints = _as_int_keys(values)
+            out = np.zeros(ints.size, dtype=bool)
+            ok = (ints >= 0) & (ints <= self.max)
+            idx = ints[ok]
+            out[ok] = (self.bits[idx >> 3] >> (idx & 7).astype(np.uint8)) & 1
+            return out
+        keys = self.sorted
+        if keys.dtype.kind in "iuf" and values.dtype.kind not in "iuf":
+            values = _as_int_keys(values)
+        elif keys.dtype.kind not in "iuf" and values.dtype.kind != "U":
+            values = values.astype(str)
+        if not keys.size:
+            return np.zeros(values.size, dtype=bool)
+        pos = np.searchsorted(keys, values)
+        pos[pos == keys.size] = 0
+        return keys[pos] == values
+
+
+def _as_int_keys(values: np.ndarray) -> np.ndarray:
+    """int64 view of FK values; non-integral or non-numeric values become -1 (never a key)."""
+    if values.dtype.kind in "iu":
+        return values.astype("int64", copy=False)
+    if values.dtype.kind == "f":
+        ints = np.full(values.size, -1, dtype="int64")
+        whole = np.isfinite(values) & (values == np.round(values))
+        ints[whole] = values[whole].astype("int64")
+        return ints
+    import pandas as pd
+
+    num = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")
+    return _as_int_keys(num)
+
+
+# -----------------------------------------
+# Reading
+# -----------------------------------------
+
+def find_table(tables_dir: Path, name: str) -> Path | None:
+    for suffix in (".parquet", ".csv"):
+        path = Path(tables_dir) / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def _values(column) -> tuple[np.ndarray, int]:
+    """(non-null values, null count) from a pyarrow (chunked) array."""
+    import pyarrow as pa
+
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    nulls = column.null_count
+    if nulls:
+        column = column.drop_null()
+    if pa.types.is_dictionary(column.type):
+        column = column.dictionary_decode()
+    return column.to_numpy(zero_copy_only=False), nulls
+
+
+def read_keys(path: Path, column: str) -> np.ndarray:
+    """A parent's key column in one read (only that column)."""
+    import pyarrow.csv as pcsv
+    import pyarrow.parquet as pq
+
+    if Path(path).suffix == ".parquet":
+        table = pq.read_table(path, columns=[column], memory_map=True)
+    else:
+        table = pcsv.read_csv(path, convert_options=pcsv.ConvertOptions(include_columns=[column]))
+    return _values(table.column(0))[0]
+
+
+def iter_jobs(check: str, path: Path, column: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[tuple]:
+    """Work items for one FK check: Parquet row-group references, or CSV blocks read here."""
+    import pyarrow.csv as pcsv
+    import pyarrow.parquet as pq
+
+    if Path(path).suffix == ".parquet":
+        for rg in range(pq.ParquetFile(path).num_row_groups):
+            yield check, (str(path), rg, column)
+        return
+    # ~16 bytes per row for an id column: size blocks to roughly ``chunksize`` rows.
+    reader = pcsv.open_csv(path, read_options=pcsv.ReadOptions(block_size=max(1 << 20, 16 * chunksize)),
+                           convert_options=pcsv.ConvertOptions(include_columns=[column]))
+    for batch in reader:
+        yield check, _values(batch.column(0))
+
+
+# -----------------------------------------
+# Workers
+# -----------------------------------------
+
+def _init_worker(keysets: dict, n_examples: int = DEFAULT_EXAMPLES) -> None:
+    global _KEYSETS, _EXAMPLES
+    _KEYSETS, _EXAMPLES = keysets, n_examples
+
+
+def _check_chunk(job) -> tuple[str, int, int, int, list]:
+    """(check, rows, nulls, missing, first distinct missing values) for one chunk."""
+    import pyarrow.parquet as pq
+
+    check, payload = job
+    if isinstance(payload[0], str):
+        path, rg, column = payload
+        values, nulls = _values(pq.ParquetFile(path, memory_map=True).read_row_group(rg, columns=[column]).column(0))
+    else:
+        values, nulls = payload
+    parent = check.split("->")[1]
+    bad = values[~_KEYSETS[parent].contains(values)]
+    examples = []
+    if bad.size:
+        _, first = np.unique(bad, return_index=True)
+        examples = bad[np.sort(first)[:_EXAMPLES]].tolist()
+    return check, int(values.size + nulls), int(nulls), int(bad.size), examples
+
+
+# -----------------------------------------
+# Driver
+# -----------------------------------------
+
+def check_integrity(tables_dir: Path = HERE, workers: int = 1, checks: list[tuple] = FK_CHECKS,
+                    n_examples: int = DEFAULT_EXAMPLES, chunksize: int = DEFAULT_CHUNKSIZE) -> tuple[dict, dict]:
+    """Run every FK check whose tables exist; returns (report, details).
+
+    ``report`` is {"child.column": {"count_missing_values", "examples"}};
+    ``details`` adds rows / nulls / key-set kind per check, and lists skipped checks.
+    """
+    runnable, skipped = [], []
+    for child, column, parent, key in checks:
+        child_path, parent_path = find_table(tables_dir, child), find_table(tables_dir, parent)
+        if child_path is None or parent_path is None:
+            skipped.append(f"{child}.{column}")
+        else:
+            runnable.append((child, column, parent, key, child_path, parent_path))
+
+    keysets = {}
+    for child, column, parent, key, child_path, parent_path in runnable:
+        name = f"{parent}.{key}"
+        if name not in keysets:
+            keysets[name] = KeySet(read_keys(parent_path, key))
+
+    names = {f"{child}.{column}->{parent}.{key}": f"{child}.{column}" for child, column, parent, key, *_ in runnable}
+    totals = {check: {"rows": 0, "nulls": 0, "missing": 0, "examples": []} for check in names}
+    jobs = (job for child, column, parent, key, child_path, _ in runnable
+            for job in iter_jobs(f"{child}.{column}->{parent}.{key}", child_path, column, chunksize))
+
+    def collect(result) -> None:
+        check, rows, nulls, missing, examples = result
+        t = totals[check]
+        t["rows"] += rows
+        t["nulls"] += nulls
+        t["missing"] += missing
+        t["examples"].extend(e for e in examples if e not in t["examples"])
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(keysets, n_examples)) as pool:
+            pending: deque = deque()
+            for job in jobs:
+                pending.append(pool.submit(_check_chunk, job))
+                if len(pending) >= 2 * workers:  # bounded: CSV blocks are held until a worker takes them
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+    else:
+        _init_worker(keysets, n_examples)
+        for job in jobs:
+            collect(_check_chunk(job))
+
+    report, details = {}, {"checks": {}, "skipped": skipped}
+    for check, label in names.items():
+        t = totals[check]
+        examples = [e.item() if isinstance(e, np.generic) else e for e in t["examples"][:n_examples]]
+        report[label] = {"count_missing_values": t["missing"], "examples": examples}
+        details["checks"][label] = {"rows": t["rows"], "nulls": t["nulls"], "missing": t["missing"],
+                                    "parent": check.split("->")[1], "keyset": keysets[check.split("->")[1]].kind}
+    return report, details
+
+
+def keep_skipped(report: dict, skipped: list[str], previous: dict, checks: list[tuple] = FK_CHECKS) -> dict:
+    """``report`` plus an entry for each skipped check (previous values carried over), in check order."""
+    merged = {}
+    for child, column, *_ in checks:
+        label = f"{child}.{column}"
+        if label in report:
+            merged[label] = report[label]
+        elif label in skipped:
+            old = previous.get(label) or {"count_missing_values": None, "examples": []}
+            merged[label] = {**old, "skipped": True}
+    return merged
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Check every foreign key in the fraud tables and write integrity_report.json.")
+    ap.add_argument("--tables-dir", type=Path, default=HERE, help="folder with <table>.parquet / <table>.csv")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--examples", type=int, default=DEFAULT_EXAMPLES, help="sample bad values kept per check")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="approx. rows per CSV block")
+    ap.add_argument("--out", type=Path, default=None, help=f"defaults to <tables-dir>/{REPORT_NAME}")
+    args = ap.parse_args(argv)
+
+    report, details = check_integrity(args.tables_dir, args.workers, n_examples=args.examples, chunksize=args.chunksize)
+    for label, d in details["checks"].items():
+        print(f"{label:<24} {d['rows']:>14,} rows  {d['missing']:>10,} missing  {d['nulls']:>8,} null  -> {d['parent']} ({d['keyset']})")
+    for label in details["skipped"]:
+        print(f"{label:<24} skipped (table not found in {args.tables_dir})")
+    out = args.out or args.tables_dir / REPORT_NAME
+    try:
+        previous = json.loads(out.read_text())
+    except (OSError, ValueError):
+        previous = {}
+    report = keep_skipped(report, details["skipped"], previous)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved integrity report -> {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
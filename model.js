@@ -92,6 +92,44 @@ async function loadStats() {
 }
 loadStats();
 
+// Draw the exploratory histograms straight from the precomputed bins (histograms.json);
+// the PNG stays in place if the JSON is missing (e.g. opened from disk).
+async function loadHistograms() {
+  try {
+    const res = await fetch("./data/external/histograms.json", { cache: "no-store" });
+    if (!res.ok) return;
+    const { plots } = await res.json();
+    document.querySelectorAll("figure[data-hist]").forEach(fig => {
+      const p = plots[fig.dataset.hist];
+      if (!p || !p.counts || !p.counts.length) return;
+      const W = 640, H = 360, pad = 36;
+      const max = Math.max(...p.counts, 1);
+      const bw = (W - 2 * pad) / p.counts.length;
+      const bars = p.counts.map((c, i) => {
+        const h = (H - 2 * pad) * c / max;
+        const lo = p.edges ? p.edges[i] : p.labels[i];
+        const hi = p.edges ? p.edges[i + 1] : "";
+        return `<rect x="${pad + i * bw}" y="${H - pad - h}" width="${Math.max(bw - 1, 1)}" height="${h}" fill="#1f77b4" opacity="0.9"><title>${lo}${hi !== "" ? " – " + hi : ""}: ${c.toLocaleString()}</title></rect>`;
+      }).join("");
+      const xlo = p.edges ? p.edges[0] : "", xhi = p.edges ? p.edges[p.edges.length - 1] : "";
+      const svg = `<svg viewBox="0 0 ${W} ${H}" role="img" aria-label="${p.title}" style="max-width:100%; height:auto;">
+        <text x="${W / 2}" y="20" text-anchor="middle" font-size="14">${p.title}</text>
+        ${bars}
+        <line x1="${pad}" y1="${H - pad}" x2="${W - pad}" y2="${H - pad}" stroke="#555"/>
+        <text x="${pad}" y="${H - pad + 16}" font-size="11">${Number(xlo).toLocaleString()}</text>
+        <text x="${W - pad}" y="${H - pad + 16}" font-size="11" text-anchor="end">${Number(xhi).toLocaleString()}</text>
+        <text x="${W / 2}" y="${H - 4}" text-anchor="middle" font-size="12">${p.xlabel}</text>
+        <text x="${pad - 4}" y="${pad}" font-size="11" text-anchor="end">${max.toLocaleString()}</text>
+      </svg>`;
+      const img = fig.querySelector("img");
+      if (img) img.outerHTML = svg;
+    });
+  } catch (e) {
+    console.warn("Couldn't load histogram bins:", e);
+  }
+}
+loadHistograms();
+
 // Prefetch threshold demo on hover for snappier UX (best-effort, non-blocking)
 document.addEventListener('DOMContentLoaded', () => {
   try {
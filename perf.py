@@ -0,0 +1,212 @@
+"""
+Per-stage performance measurement for the pipeline runner.
+
+StageMeter records wall time, CPU time (the stage's process plus any
+worker processes it reaped), peak RSS and row counts for one stage.
+pipeline.py writes the records to signals/pipeline_perf.json next to
+baseline_metrics.json.
+
+On Linux the RSS high-water mark is reset at stage start (writing 5 to
+/proc/self/clear_refs), so each stage reports its own peak even when
+several run one after another in the same process. Elsewhere, ru_maxrss
+(the process-lifetime peak) is reported instead.
+
+SamplingProfiler is a stdlib-only sampling profiler. A SIGPROF interval
+timer snapshots the Python stack of the stage's main thread every
+``interval`` seconds of CPU time. The collapsed stacks are written as a
+``.folded`` file (the format used by flamegraph.pl and speedscope), and the
+hottest frames are summarized in the perf signal.
+
+Usage (through fraud.py):
+    python fraud.py --profile           # profile the slowest stage of the last run
+    python fraud.py --profile train     # profile a named stage
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+DEFAULT_INTERVAL = 0.005  # seconds of CPU time between samples
+TOP_FRAMES = 15
+
+
+# -----------------------------------------
+# Resource usage
+# -----------------------------------------
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb(reset_ok: bool) -> float | None:
+    if reset_ok:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB on Linux
+
+
+class StageMeter:
+    """Context manager measuring one stage; ``record`` is filled on exit."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.record: dict = {}
+
+    def __enter__(self):
+        self._reset_ok = _reset_peak_rss()
+        self._wall = time.perf_counter()
+        self._cpu = _cpu_seconds()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self._wall
+        self.record = {
+            "status": "failed" if exc[0] is not None else "ran",
+            "wall_s": round(wall, 3),
+            "cpu_s": round(_cpu_seconds() - self._cpu, 3),
+            "peak_rss_mb": _peak_rss_mb(self._reset_ok),
+        }
+        return False
+
+    def add_rows(self, rows: dict | None) -> None:
+        """Attach ``rows_in`` / ``rows_out`` (as returned by the stage) and the derived rows/sec."""
+        rows = rows or {}
+        for k in ("rows_in", "rows_out"):
+            if rows.get(k) is not None:
+                self.record[k] = int(rows[k])
+        basis = self.record.get("rows_in", self.record.get("rows_out"))
+        if basis is not None and self.record.get("wall_s"):
+            self.record["rows_per_sec"] = round(basis / self.record["wall_s"], 1)
+
+
+# -----------------------------------------
+# Sampling profiler
+# -----------------------------------------
+
+class SamplingProfiler:
+    """SIGPROF-driven stack sampler for the calling (main) thread."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._previous = None
+
+    def _sample(self, signum, frame) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def start(self) -> "SamplingProfiler":
+        import signal
+
+        if not hasattr(signal, "setitimer"):
+            raise ValueError("Sampling profiler needs signal.setitimer (POSIX only)")
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def stop(self) -> None:
+        import signal
+
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous or signal.SIG_DFL)
+
+    def top(self, n: int = TOP_FRAMES) -> list[dict]:
+        """Hottest frames by self samples (leaf of each stack), with inclusive share."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for f in set(frames):
+                total[f] += count
+        denom = max(self.samples, 1)
+        return [{"frame": f, "self_pct": round(100 * c / denom, 1), "total_pct": round(100 * total[f] / denom, 1)}
+                for f, c in own.most_common(n)]
+
+    def write_folded(self, path: Path) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# -----------------------------------------
+# Signal
+# -----------------------------------------
+
+def slowest_stage(perf_path: Path) -> str | None:
+    """Stage with the largest wall time in a previous pipeline_perf.json (if any ran)."""
+    try:
+        stages = json.loads(Path(perf_path).read_text())["stages"]
+    except (OSError, ValueError, KeyError):
+        return None
+    timed = {name: _wall(r) for name, r in stages.items() if _wall(r) is not None}
+    return max(timed, key=timed.get) if timed else None
+
+
+def _wall(record: dict) -> float | None:
+    # Skipped stages carry their last measured run forward.
+    return record.get("wall_s", record.get("last_run", {}).get("wall_s"))
+
+
+def write_signal(perf_path: Path, stages: dict[str, dict], wall_s: float, profile: dict | None = None) -> dict:
+    """Write the per-stage records (plus run totals) as a signal JSON.
+
+    Stages that were skipped keep their previous measurements under ``last_run``.
+    """
+    import datetime as dt
+
+    try:
+        previous = json.loads(Path(perf_path).read_text()).get("stages", {})
+    except (OSError, ValueError):
+        previous = {}
+    for name, record in stages.items():
+        if record.get("status") in ("skipped", "not selected"):
+            prev = previous.get(name, {})
+            last = prev.get("last_run") if prev.get("status") in ("skipped", "not selected") else prev
+            if last and last.get("wall_s") is not None:
+                record["last_run"] = {k: v for k, v in last.items() if k != "status"}
+    timed = {n: r for n, r in stages.items() if r.get("wall_s") is not None}
+    payload = {
+        "timestamp": dt.datetime.now().isoformat(),
+        "wall_s": round(wall_s, 3),
+        "stages_run": sum(r.get("status") == "ran" for r in stages.values()),
+        "stages_skipped": sum(r.get("status") == "skipped" for r in stages.values()),
+        "slowest_stage": max(timed, key=lambda n: timed[n]["wall_s"]) if timed else None,
+        "stages": stages,
+        "profile": profile,
+    }
+    Path(perf_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(perf_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return payload
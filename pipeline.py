@@ -0,0 +1,283 @@
+"""
+Minimal stage runner for fraud.py: named stages, declared file inputs and
+outputs, content-addressed skipping, and parallel execution of independent
+stages.
+
+Each stage's cache key hashes its name, its config, the source of its
+function plus every project module it imports (followed transitively, so
+an edit to e.g. batch_score.py re-runs the stages that use it) and the
+SHA-256 of every input file. Digests are memoized on
+size + mtime via ingest.file_digest, so unchanged files are not re-read.
+After a stage runs, the key and its output digests are stamped under the
+state directory. On the next run it is skipped when the key matches and its
+outputs are still the files it wrote. A stage whose outputs come out
+byte-identical leaves its dependents' keys unchanged, so they skip too.
+
+Each stage that runs is measured by perf.StageMeter: wall time, CPU time,
+peak RSS, and the rows in/out the stage function returns. The records are
+written to ``perf_path`` (signals/pipeline_perf.json for fraud.py) after
+every run. ``--profile`` also samples the stack of one stage (the slowest
+stage of the previous run by default), and forces that stage to run.
+
+Dependencies are implied: a stage depends on whichever stages declare its
+inputs as outputs. Ready stages run in a process pool (fork), so e.g.
+describe / plots / correlation overlap.
+
+Usage (through fraud.py):
+    python fraud.py                         # run every stale stage
+    python fraud.py --only score,metrics    # just these; other stages' outputs must exist
+    python fraud.py --force --only train    # ignore the cache for the selected stages
+    python fraud.py --list                  # show stages and whether they're up to date
+    python fraud.py --profile [STAGE]       # sampled profile of STAGE (default: last run's slowest)
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import inspect
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import ingest
+import perf
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable
+    inputs: list[Path]
+    outputs: list[Path]
+    config: dict = field(default_factory=dict)
+
+
+def _call(fn: Callable, config: dict, name: str, profile_path: str | None = None) -> tuple[dict, dict | None]:
+    """Run one stage under a StageMeter (and optionally the sampler); returns (record, profile)."""
+    profiler = perf.SamplingProfiler().start() if profile_path else None
+    try:
+        with perf.StageMeter(name) as meter:
+            rows = fn(**config)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    meter.add_rows(rows if isinstance(rows, dict) else None)
+    profile = None
+    if profiler is not None:
+        profiler.write_folded(Path(profile_path))
+        profile = {"stage": name, "samples": profiler.samples, "interval_ms": profiler.interval * 1000,
+                   "folded": str(profile_path), "top": profiler.top()}
+    return meter.record, profile
+
+
+def _imported_modules(source: str) -> set[str]:
+    """Top-level names of every module imported anywhere in ``source``."""
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def code_digest(fn: Callable) -> str:
+    """SHA-256 of ``fn``'s source and of the project modules (files next to it) it imports, transitively."""
+    root = Path(inspect.getsourcefile(fn)).resolve().parent
+    source = inspect.getsource(fn)
+    seen: set[str] = set()
+    todo = list(_imported_modules(source))
+    while todo:
+        name = todo.pop()
+        path = root / f"{name}.py"
+        if name in seen or not path.is_file():
+            continue  # stdlib / third-party, or already followed
+        seen.add(name)
+        todo.extend(_imported_modules(path.read_text()))
+    h = hashlib.sha256(source.encode())
+    for name in sorted(seen):
+        h.update(f"\0{name}\0".encode())
+        h.update((root / f"{name}.py").read_bytes())
+    return h.hexdigest()
+
+
+class Pipeline:
+    """Registry + scheduler for file-based stages."""
+
+    def __init__(self, state_dir: Path, perf_path: Path | None = None):
+        self.state_dir = Path(state_dir)
+        self.perf_path = Path(perf_path) if perf_path is not None else None
+        self.stages: dict[str, Stage] = {}
+
+    def stage(self, name: str, inputs=(), outputs=(), **config) -> Callable:
+        """Decorator: register ``fn`` as stage ``name``; ``config`` is passed as keyword args."""
+        def register(fn: Callable) -> Callable:
+            if name in self.stages:
+                raise ValueError(f"Duplicate stage name: {name!r}")
+            self.stages[name] = Stage(name, fn, [Path(p) for p in inputs], [Path(p) for p in outputs], config)
+            return fn
+        return register
+
+    # ---- cache ----
+    def _digest(self, path: Path) -> str:
+        # One memo folder per source directory so equal file names never collide.
+        memo_dir = self.state_dir / "digests" / hashlib.sha1(str(path.resolve().parent).encode()).hexdigest()[:12]
+        memo_dir.mkdir(parents=True, exist_ok=True)
+        return ingest.file_digest(path, memo_dir)
+
+    def key(self, stage: Stage) -> str:
+        missing = [p for p in stage.inputs if not p.exists()]
+        if missing:
+            producer = next((s.name for s in self.stages.values() if missing[0] in s.outputs), None)
+            hint = f" (run stage {producer!r} first)" if producer else ""
+            raise ValueError(f"Stage {stage.name!r} is missing input {missing[0]}{hint}")
+        blob = json.dumps({
+            "stage": stage.name,
+            "config": stage.config,
+            "code": code_digest(stage.fn),
+            "inputs": {str(p): self._digest(p) for p in stage.inputs},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _stamp_path(self, stage: Stage) -> Path:
+        return self.state_dir / "stamps" / f"{stage.name}.json"
+
+    def up_to_date(self, stage: Stage, key: str) -> bool:
+        try:
+            stamp = json.loads(self._stamp_path(stage).read_text())
+        except (OSError, ValueError):
+            return False
+        if stamp.get("key") != key:
+            return False
+        return all(p.exists() and stamp["outputs"].get(str(p)) == self._digest(p) for p in stage.outputs)
+
+    def stamp(self, stage: Stage, key: str) -> None:
+        path = self._stamp_path(stage)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        missing = [p for p in stage.outputs if not p.exists()]
+        if missing:
+            raise ValueError(f"Stage {stage.name!r} did not write declared output {missing[0]}")
+        path.write_text(json.dumps({"key": key, "outputs": {str(p): self._digest(p) for p in stage.outputs}}, indent=2))
+
+    # ---- scheduling ----
+    def deps(self, stage: Stage) -> set[str]:
+        return {s.name for s in self.stages.values()
+                if s.name != stage.name and any(p in s.outputs for p in stage.inputs)}
+
+    def run(self, only: list[str] | None = None, force: bool = False, workers: int = 1,
+            profile: str | None = None) -> dict[str, str]:
+        """Run stale stages (all, or just ``only``); returns {stage: "ran" | "skipped" | "not selected"}.
+
+        ``profile`` names a stage to sample ("slowest" = slowest in the previous perf signal).
+        """
+        selected = set(only) if only else set(self.stages)
+        unknown = selected - set(self.stages)
+        if profile == "slowest":
+            profile = perf.slowest_stage(self.perf_path) if self.perf_path else None
+            if profile is None:
+                print("No previous perf signal to pick the slowest stage from; not profiling.")
+        if profile is not None and profile not in self.stages:
+            unknown.add(profile)
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}; have {', '.join(self.stages)}")
+        if profile is not None:
+            selected.add(profile)
+        profile_path = None
+        if profile is not None:
+            base = self.perf_path.parent if self.perf_path else self.state_dir
+            profile_path = str(base / f"pipeline_profile.{profile}.folded")
+
+        pending = list(self.stages)
+        running: dict = {}
+        status: dict[str, str] = {}
+        records: dict[str, dict] = {}
+        profile_info = None
+        t0 = time.perf_counter()
+        pool = None
+        if workers > 1 and "fork" in mp.get_all_start_methods():
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"))
+        try:
+            while pending or running:
+                blocked = {n for n in pending} | {n for n, _ in running.values()}
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if self.deps(stage) & blocked:
+                        continue
+                    pending.remove(name)
+                    blocked.discard(name)
+                    if name not in selected:
+                        status[name] = "not selected"
+                        continue
+                    key = self.key(stage)
+                    if not (force or name == profile) and self.up_to_date(stage, key):
+                        print(f"[{name}] up to date, skipped")
+                        status[name] = records[name] = "skipped"
+                        continue
+                    print(f"[{name}] running")
+                    args = (stage.fn, stage.config, name, profile_path if name == profile else None)
+                    if pool is None:
+                        status[name] = "failed"
+                        records[name], prof = _call(*args)
+                        profile_info = prof or profile_info
+                        self.stamp(stage, key)
+                        status[name] = "ran"
+                    else:
+                        running[pool.submit(_call, *args)] = (name, key)
+                        blocked.add(name)
+                if running:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        name, key = running.pop(fut)
+                        status[name] = "failed"
+                        records[name], prof = fut.result()  # re-raise the stage's error here
+                        profile_info = prof or profile_info
+                        self.stamp(self.stages[name], key)
+                        status[name] = "ran"
+                elif pending and all(self.deps(self.stages[n]) & set(pending) for n in pending):
+                    raise ValueError(f"Stage dependency cycle among: {', '.join(pending)}")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if self.perf_path is not None:
+                stages = {n: records[n] if isinstance(records.get(n), dict) else {"status": status[n]}
+                          for n in self.stages if n in status}
+                perf.write_signal(self.perf_path, stages, time.perf_counter() - t0, profile_info)
+        return status
+
+    def describe(self) -> list[tuple[str, str]]:
+        """(stage, state) without running anything."""
+        rows = []
+        for stage in self.stages.values():
+            try:
+                state = "up to date" if self.up_to_date(stage, self.key(stage)) else "stale"
+            except ValueError:
+                state = "inputs missing"
+            rows.append((stage.name, state))
+        return rows
+
+    def main(self, argv=None) -> dict[str, str]:
+        ap = argparse.ArgumentParser(description="Run the fraud pipeline stages (cached, incremental).")
+        ap.add_argument("--only", default=None, help=f"comma-separated subset of: {','.join(self.stages)}")
+        ap.add_argument("--force", action="store_true", help="re-run selected stages even if up to date")
+        ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="stages run concurrently")
+        ap.add_argument("--list", action="store_true", help="show stage status and exit")
+        ap.add_argument("--profile", nargs="?", const="slowest", default=None, metavar="STAGE",
+                        help="sample the stack of STAGE (default: slowest stage of the last run)")
+        args = ap.parse_args(argv)
+
+        if args.list:
+            for name, state in self.describe():
+                print(f"{name:<12} {state}")
+            return {}
+        only = [s.strip() for s in args.only.split(",") if s.strip()] if args.only else None
+        status = self.run(only, args.force, args.workers, args.profile)
+        if self.perf_path is not None:
+            print(f"Saved pipeline perf -> {self.perf_path.resolve()}")
+        return status
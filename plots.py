@@ -0,0 +1,238 @@
+"""
+Histogram bins for the UI plots, plus change-aware PNG rendering.
+
+Section 6 of fraud.py used to sample 100k rows and redraw every PNG at
+300 dpi in the main process on each run. Here the counts come from one
+streaming pass over all rows (fixed-width bins over each column's known
+min/max, so chunk results just add up) and are written to
+data/external/histograms.json, which model.js draws directly. Each plot's
+bins are hashed; PNGs are rendered in a process pool, and only for plots
+whose hash changed since the last run (or whose PNG is missing).
+matplotlib is imported inside the render workers only.
+
+Usage:
+    python plots.py data/external/creditcard.csv [--out-dir data/external] [--workers 3] [--force]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+HIST_NAME = "histograms.json"
+RENDER_VERSION = 1  # bump when the figure styling changes so every PNG re-renders
+PLOTS = {
+    "amount_distribution": {
+        "column": "Amount", "kind": "hist", "bins": 50, "figsize": [8, 5],
+        "title": "Transaction Amount — Distribution", "xlabel": "Amount", "ylabel": "Frequency",
+    },
+    "time_distribution": {
+        "column": "Time", "kind": "hist", "bins": 50, "figsize": [8, 5],
+        "title": "Transaction Time — Distribution", "xlabel": "Time (seconds since first tx)", "ylabel": "Frequency",
+    },
+    "class_distribution": {
+        "column": "Class", "kind": "bar", "figsize": [6, 4],
+        "title": "Transaction Class — Distribution", "xlabel": "Class", "ylabel": "Count",
+    },
+}
+
+
+# -----------------------------------------
+# Ranges
+# -----------------------------------------
+
+def ranges_from_describe(desc) -> dict[str, tuple[float, float]]:
+    """(min, max) per column from a describe()-layout frame (descriptives.py)."""
+    return {c: (float(desc.loc[c, "min"]), float(desc.loc[c, "max"])) for c in desc.index}
+
+
+def ranges_from_parquet(path: Path, columns: Iterable[str]) -> dict[str, tuple[float, float]]:
+    """(min, max) per column from Parquet row-group statistics (no data read)."""
+    import pyarrow.parquet as pq
+
+    meta = pq.ParquetFile(path).metadata
+    names = [meta.schema.column(i).name for i in range(meta.num_columns)]
+    out = {}
+    for col in columns:
+        if col not in names:
+            continue
+        i = names.index(col)
+        stats = [meta.row_group(rg).column(i).statistics for rg in range(meta.num_row_groups)]
+        if any(s is None or not s.has_min_max for s in stats):
+            raise ValueError(f"No min/max statistics for column {col!r} in {path}")
+        out[col] = (float(min(s.min for s in stats)), float(max(s.max for s in stats)))
+    return out
+
+
+# -----------------------------------------
+# Streaming counts
+# -----------------------------------------
+
+class StreamingHistograms:
+    """Fixed-edge histograms (and category counts) accumulated chunk by chunk."""
+
+    def __init__(self, ranges: dict[str, tuple[float, float]], plots: dict = PLOTS):
+        self.plots = {name: spec for name, spec in plots.items()
+                      if spec["kind"] == "bar" or spec["column"] in ranges}
+        self.edges = {}
+        self.counts = {}
+        for name, spec in self.plots.items():
+            if spec["kind"] == "hist":
+                lo, hi = ranges[spec["column"]]
+                if hi <= lo:
+                    hi = lo + 1.0  # constant column: one populated bin
+                self.edges[name] = np.linspace(lo, hi, spec["bins"] + 1)
+                self.counts[name] = np.zeros(spec["bins"], dtype="int64")
+            else:
+                self.counts[name] = {}
+        self.rows = 0
+
+    def update(self, chunk) -> None:
+        for name, spec in self.plots.items():
+            col = spec["column"]
+            if col not in chunk.columns:
+                continue
+            values = chunk[col].to_numpy()
+            if spec["kind"] == "hist":
+                edges = self.edges[name]
+                self.counts[name] += np.histogram(values, bins=len(edges) - 1, range=(edges[0], edges[-1]))[0]
+            else:
+                keys, n = np.unique(values, return_counts=True)
+                for k, c in zip(keys.tolist(), n.tolist()):
+                    self.counts[name][k] = self.counts[name].get(k, 0) + c
+        self.rows += len(chunk)
+
+    def merge(self, other: "StreamingHistograms") -> "StreamingHistograms":
+        for name, counts in other.counts.items():
+            if isinstance(counts, dict):
+                for k, c in counts.items():
+                    self.counts[name][k] = self.counts[name].get(k, 0) + c
+            else:
+                self.counts[name] += counts
+        self.rows += other.rows
+        return self
+
+    def result(self) -> dict:
+        """JSON-ready payload: per plot, its spec, bins and a content hash."""
+        plots = {}
+        for name, spec in self.plots.items():
+            counts = self.counts[name]
+            if spec["kind"] == "hist":
+                data = {"edges": [round(float(e), 6) for e in self.edges[name]],
+                        "counts": [int(c) for c in counts]}
+            else:
+                if not counts:
+                    continue
+                keys = sorted(counts)
+                data = {"labels": [str(k) for k in keys], "counts": [int(counts[k]) for k in keys]}
+            entry = {**spec, **data}
+            entry["hash"] = _digest(entry)
+            plots[name] = entry
+        return {"n_rows": int(self.rows), "render_version": RENDER_VERSION, "plots": plots}
+
+
+def _digest(entry: dict) -> str:
+    blob = json.dumps({"v": RENDER_VERSION, **entry}, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def histogram_chunks(chunks: Iterable, ranges: dict[str, tuple[float, float]], plots: dict = PLOTS) -> dict:
+    hist = StreamingHistograms(ranges, plots)
+    for chunk in chunks:
+        hist.update(chunk)
+    return hist.result()
+
+
+# -----------------------------------------
+# Rendering
+# -----------------------------------------
+
+def _render(job) -> str:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    name, entry, out_dir = job
+    fig, ax = plt.subplots(figsize=tuple(entry["figsize"]))
+    if entry["kind"] == "hist":
+        edges = np.asarray(entry["edges"])
+        ax.hist(edges[:-1], bins=edges, weights=entry["counts"], alpha=0.9)
+        ax.grid(True, alpha=0.25)
+    else:
+        heights = entry["counts"]
+        ax.bar(entry["labels"], heights, alpha=0.9)
+        for i, v in enumerate(heights):
+            ax.text(i, v, f"{v:,}", ha="center", va="bottom", fontsize=9)
+        ax.grid(True, axis="y", alpha=0.25)
+    ax.set_title(entry["title"])
+    ax.set_xlabel(entry["xlabel"])
+    ax.set_ylabel(entry["ylabel"])
+    out = Path(out_dir) / f"{name}.png"
+    # crisp text in UI, trimmed margins, solid background (no alpha)
+    fig.savefig(out, dpi=300, bbox_inches="tight", facecolor="white", edgecolor="none")
+    plt.close(fig)
+    return str(out)
+
+
+def write_and_render(payload: dict, out_dir: Path, workers: int | None = None, force: bool = False) -> list[Path]:
+    """Render PNGs whose bins changed since the last histograms.json, then write the new JSON.
+
+    Returns the PNG paths that were (re)rendered.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    json_path = out_dir / HIST_NAME
+    previous = {}
+    if json_path.exists():
+        try:
+            previous = {n: p.get("hash") for n, p in json.loads(json_path.read_text())["plots"].items()}
+        except (ValueError, KeyError):
+            previous = {}
+
+    jobs = [(name, entry, str(out_dir)) for name, entry in payload["plots"].items()
+            if force or previous.get(name) != entry["hash"] or not (out_dir / f"{name}.png").exists()]
+    rendered = []
+    if jobs:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = [Path(p) for p in pool.map(_render, jobs)]
+
+    # Written after rendering so a failed render is retried on the next run.
+    with open(json_path, "w") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    return rendered
+
+
+def main(argv=None) -> None:
+    import ingest
+
+    ap = argparse.ArgumentParser(description="Stream histogram bins to JSON and re-render changed plot PNGs.")
+    ap.add_argument("csv", type=Path, help="creditcard.csv (cached as Parquet via ingest.py)")
+    ap.add_argument("--out-dir", type=Path, default=None, help="defaults to the CSV's folder")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--force", action="store_true", help="re-render every PNG")
+    args = ap.parse_args(argv)
+
+    cache = ingest.ensure_cache(args.csv)
+    columns = sorted({spec["column"] for spec in PLOTS.values()})
+    ranges = ranges_from_parquet(cache, [c for c in columns if c != "Class"])
+    payload = histogram_chunks(ingest.iter_cache_chunks(cache, columns=columns), ranges)
+    out_dir = args.out_dir or args.csv.parent
+    rendered = write_and_render(payload, out_dir, args.workers, args.force)
+    print(f"Saved histogram bins ({payload['n_rows']:,} rows) -> {(out_dir / HIST_NAME).resolve()}")
+    for path in rendered:
+        print(f"Saved plot -> {path.resolve()}")
+    if not rendered:
+        print("Plots unchanged; no PNGs re-rendered.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Config-driven rule scorer for v_risk_event / fact_risk.
+
+Rules (column, op, value, weight) are read from seeds/risk_rules.yml and
+compiled once into vectorized NumPy predicates. A batch is scored in a
+single pass: each rule yields a boolean column, rule_score is the weighted
+sum. fact_risk rows (txn_id, customer_id, account_id, date_key, rule_score)
+come straight out of the scorer, so weights change without touching SQL.
+
+NULL handling follows the CASE WHEN ... ELSE 0 in the view: a predicate on
+a NULL value never fires.
+
+Usage:
+    python rules_engine.py txn.parquet --features txn_features.parquet --out fact_risk.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import operator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+RULES_PATH = Path(__file__).resolve().parent / "seeds" / "risk_rules.yml"
+FACT_RISK_COLS = ["txn_id", "customer_id", "account_id", "date_key", "rule_score"]
+
+_COMPARE = {
+    "==": operator.eq, "!=": operator.ne,
+    ">": operator.gt, ">=": operator.ge,
+    "<": operator.lt, "<=": operator.le,
+}
+_OPS = set(_COMPARE) | {"in", "not_in", "is_true", "is_false"}
+
+
+# -----------------------------------------
+# Compilation
+# -----------------------------------------
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    column: str
+    op: str
+    value: object
+    weight: int
+    description: str = ""
+
+    def compile(self) -> Callable[[Mapping[str, np.ndarray]], np.ndarray]:
+        """Vectorized predicate over a column mapping; NULLs never fire."""
+        col, value = self.column, self.value
+        if self.op in _COMPARE:
+            cmp = _COMPARE[self.op]
+
+            numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+
+            def pred(cols):
+                arr = np.asarray(cols[col])
+                if numeric and arr.dtype == object:  # e.g. JSON payloads with nulls
+                    arr = pd.to_numeric(pd.Series(arr), errors="coerce").to_numpy(dtype="float64")
+                if arr.dtype.kind in "fc":
+                    with np.errstate(invalid="ignore"):
+                        return cmp(arr, value) & ~np.isnan(arr)
+                if arr.dtype == object:
+                    return np.asarray(cmp(arr, value), dtype=bool) & ~pd.isna(arr)
+                return np.asarray(cmp(arr, value), dtype=bool)
+        elif self.op in ("in", "not_in"):
+            members = list(value)
+            negate = self.op == "not_in"
+
+            def pred(cols):
+                arr = np.asarray(cols[col])
+                hit = np.isin(arr, members)
+                return (~hit if negate else hit) & ~pd.isna(arr)
+        else:
+            want = self.op == "is_true"
+
+            def pred(cols):
+                arr = np.asarray(cols[col])
+                if arr.dtype == bool:
+                    return arr if want else ~arr
+                known = ~pd.isna(arr)
+                truthy = np.zeros(arr.shape, dtype=bool)
+                truthy[known] = arr[known].astype(bool)
+                return known & (truthy if want else ~truthy)
+        return pred
+
+
+class RuleSet:
+    """A compiled list of weighted rules."""
+
+    def __init__(self, rules: list[Rule], score_column: str = "rule_score"):
+        self.rules = rules
+        self.score_column = score_column
+        self.weights = np.array([r.weight for r in rules], dtype="int32")
+        self._preds = [r.compile() for r in rules]
+
+    @classmethod
+    def from_yaml(cls, path: Path = RULES_PATH) -> "RuleSet":
+        import yaml
+
+        with open(path) as f:
+            spec = yaml.safe_load(f) or {}
+        rules = []
+        for i, raw in enumerate(spec.get("rules") or []):
+            missing = [k for k in ("id", "column", "op", "weight") if k not in raw]
+            if missing:
+                raise ValueError(f"{path}: rule #{i} is missing {missing}")
+            if raw["op"] not in _OPS:
+                raise ValueError(f"{path}: rule '{raw['id']}' has unknown op '{raw['op']}'")
+            if raw.get("enabled", True):
+                rules.append(Rule(raw["id"], raw["column"], raw["op"], raw.get("value"), int(raw["weight"]),
+                                  raw.get("description", "")))
+        if not rules:
+            raise ValueError(f"{path}: no enabled rules")
+        return cls(rules, spec.get("score_column", "rule_score"))
+
+    @property
+    def columns(self) -> list[str]:
+        """Input columns the rules read."""
+        return sorted({r.column for r in self.rules})
+
+    def fired(self, cols: Mapping[str, np.ndarray]) -> np.ndarray:
+        """(n_rows, n_rules) boolean matrix of which rules fire."""
+        return np.column_stack([pred(cols) for pred in self._preds])
+
+    def score(self, cols: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Weighted rule score per row (int32)."""
+        score = None
+        for pred, w in zip(self._preds, self.weights):
+            part = pred(cols).astype("int32") * w
+            score = part if score is None else score + part
+        return score
+
+    def components(self, cols: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Per-rule contributions (weight where the rule fired, else 0)."""
+        return {r.id: pred(cols).astype("int32") * r.weight for r, pred in zip(self.rules, self._preds)}
+
+
+# -----------------------------------------
+# fact_risk
+# -----------------------------------------
+
+def fact_risk(batch: pd.DataFrame, ruleset: RuleSet) -> pd.DataFrame:
+    """fact_risk rows for a batch of Txn rows already joined with their features."""
+    from features import to_epoch_us
+
+    cols = {c: batch[c].to_numpy() for c in ruleset.columns}
+    days = to_epoch_us(batch["txn_ts"]) // 86_400_000_000  # txn_ts::date (UTC)
+    out = batch[["txn_id", "customer_id", "account_id"]].reset_index(drop=True)
+    out["date_key"] = days.astype("datetime64[D]")
+    out[ruleset.score_column] = ruleset.score(cols)
+    return out
+
+
+def iter_joined_batches(txn_path: Path, features_path: Path | None, columns: list[str],
+                        batch_size: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """Txn row batches with the features.py output columns attached side by side.
+
+    features.py writes one row per transaction in input order, so the two files
+    are read in lockstep instead of joined.
+    """
+    import pyarrow.parquet as pq
+
+    txn_cols = [c for c in columns if c in pq.ParquetFile(txn_path).schema_arrow.names]
+    txn_iter = pq.ParquetFile(txn_path, memory_map=True).iter_batches(batch_size=batch_size, columns=txn_cols)
+    if features_path is None:
+        for batch in txn_iter:
+            yield batch.to_pandas()
+        return
+
+    txn_rows, feat_rows = pq.ParquetFile(txn_path).metadata.num_rows, pq.ParquetFile(features_path).metadata.num_rows
+    if txn_rows != feat_rows:
+        raise ValueError(f"Feature file has {feat_rows:,} rows but the Txn file has {txn_rows:,} — "
+                         "regenerate it with features.py")
+    feat_cols = ["txn_id"] + [c for c in columns if c not in txn_cols]
+    feat_iter = pq.ParquetFile(features_path, memory_map=True).iter_batches(batch_size=batch_size, columns=feat_cols)
+    for txn_batch, feat_batch in zip(txn_iter, feat_iter, strict=True):
+        txn_df, feat_df = txn_batch.to_pandas(), feat_batch.to_pandas()
+        if not np.array_equal(txn_df["txn_id"].to_numpy(), feat_df["txn_id"].to_numpy()):
+            raise ValueError("Feature file is not row-aligned with the Txn file — regenerate it with features.py")
+        yield pd.concat([txn_df, feat_df.drop(columns="txn_id")], axis=1)
+
+
+def score_parquet(txn_path: Path, out_path: Path, features_path: Path | None = None,
+                  ruleset: RuleSet | None = None, batch_size: int = 1_000_000) -> int:
+    """Stream fact_risk rows for a Txn Parquet file; returns the number of rows written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    ruleset = ruleset or RuleSet.from_yaml()
+    needed = list(dict.fromkeys(["txn_id", "customer_id", "account_id", "txn_ts"] + ruleset.columns))
+    writer, rows = None, 0
+    try:
+        for batch in iter_joined_batches(txn_path, features_path, needed, batch_size):
+            table = pa.Table.from_pandas(fact_risk(batch, ruleset), preserve_index=False)
+            i = table.schema.get_field_index("date_key")
+            table = table.set_column(i, "date_key", table.column(i).cast(pa.date32()))
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Score Txn rows with the weighted rules and write fact_risk.")
+    ap.add_argument("txn", type=Path, help="Txn table (.parquet)")
+    ap.add_argument("--features", type=Path, default=None, help="row-aligned output of features.py")
+    ap.add_argument("--rules", type=Path, default=RULES_PATH)
+    ap.add_argument("--batch-size", type=int, default=1_000_000)
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    out = args.out or args.txn.with_name("fact_risk.parquet")
+    rows = score_parquet(args.txn, out, args.features, RuleSet.from_yaml(args.rules), args.batch_size)
+    print(f"Saved fact_risk ({rows:,} rows) -> {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
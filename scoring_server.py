@@ -0,0 +1,368 @@
+"""
+Low-latency online scoring for the authorization path.
+
+The logistic regression in baseline_fraud_model.joblib is flattened into a
+plain NumPy weight vector once at startup (fast_score.LinearModel, read from
+the compact .npz export when there is one); sklearn is not touched per call.
+Concurrent requests are queued and scored together in micro-batches: the
+batcher waits at most ``--max-delay-ms`` for a batch to fill (or until
+``--max-batch`` requests are waiting), then runs one matrix-vector product
+plus the vectorized rule scorer from rules_engine.py for the whole batch.
+With ``--dims`` (dimstore.py), a request may send ``device_id`` instead of
+``device_low_rep``; the flag is read from a dense array indexed by id.
+
+Served over plain asyncio (stdlib only) on TCP or a Unix socket:
+    POST /score   body: {"features": {...}, "rule_inputs": {...}}  (or a list of them)
+                  every model feature is required (400 naming the missing ones)
+                  reply: {"proba": ..., "rule_score": ..., "rule_components": {...}}
+    GET  /health
+
+A built-in load generator reports throughput and p50/p95/p99 latency.
+
+Usage:
+    python scoring_server.py serve --port 8765 [--unix /tmp/protector.sock] [--max-batch 256] [--max-delay-ms 1]
+    python scoring_server.py loadgen --port 8765 --requests 20000 --concurrency 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from fast_score import MODEL_PATH, LinearModel
+from rules_engine import RULES_PATH, RuleSet
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_DELAY_MS = 1.0
+
+
+# -----------------------------------------
+# Micro-batching
+# -----------------------------------------
+
+class MicroBatcher:
+    """Collects concurrent requests and scores them together."""
+
+    def __init__(self, model: LinearModel, ruleset: RuleSet | None = None,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_delay_ms: float = DEFAULT_MAX_DELAY_MS,
+                 device_lookup: np.ndarray | None = None):
+        self.model = model
+        self.ruleset = ruleset
+        self.device_lookup = device_lookup  # dense bool by device_id (dimstore), fills device_low_rep
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.batches = 0
+        self.scored = 0
+        self.model_seconds = 0.0
+        self.rule_seconds = 0.0
+
+    async def submit(self, payload: dict) -> dict:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((payload, fut))
+        return await fut
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._score(batch)
+
+    def _score(self, batch: list) -> None:
+        """Score a micro-batch; a bad payload fails only its own request."""
+        rows, futs = [], []
+        for payload, fut in batch:
+            try:
+                rows.append(self.prepare(payload))
+                futs.append(fut)
+            except Exception as err:
+                _settle(fut, error=err)
+        if not rows:
+            return
+        try:
+            results = self.score_rows(rows)
+        except Exception:  # something prepare() let through: retry one by one to isolate it
+            for row, fut in zip(rows, futs):
+                try:
+                    _settle(fut, self.score_rows([row])[0])
+                    self.scored += 1
+                except Exception as err:
+                    _settle(fut, error=err)
+            return
+        self.batches += 1
+        self.scored += len(rows)
+        for fut, res in zip(futs, results):
+            _settle(fut, res)
+
+    def prepare(self, payload: dict) -> tuple[np.ndarray, dict]:
+        """(feature row, rule inputs) for one request; raises on malformed input."""
+        if not isinstance(payload, dict):
+            raise TypeError("each request must be a JSON object")
+        features = payload.get("features") or {}
+        inputs = payload.get("rule_inputs") or {}
+        if not isinstance(features, dict) or not isinstance(inputs, dict):
+            raise TypeError("'features' and 'rule_inputs' must be JSON objects")
+        row = self.model.matrix([features])[0]  # every model feature is required: no zero-fill here
+        if self.ruleset is not None:
+            names = self.ruleset.columns + (["device_id"] if self.device_lookup is not None else [])
+            bad = [c for c in names if not isinstance(inputs.get(c), (type(None), bool, int, float, str))]
+            if bad:
+                raise ValueError(f"rule_inputs {', '.join(bad)} must be JSON scalars")
+        return row, inputs
+
+    def score_payloads(self, payloads: list[dict]) -> list[dict]:
+        return self.score_rows([self.prepare(p) for p in payloads])
+
+    def score_rows(self, rows: list[tuple[np.ndarray, dict]]) -> list[dict]:
+        t0 = time.perf_counter()
+        proba = self.model.predict_proba(np.vstack([row for row, _ in rows]))
+        t1 = time.perf_counter()
+        self.model_seconds += t1 - t0
+        out = [{"proba": float(x)} for x in proba]
+        if self.ruleset is not None:
+            inputs = [row_inputs for _, row_inputs in rows]
+            cols = {c: _column([row.get(c) for row in inputs]) for c in self.ruleset.columns}
+            if self.device_lookup is not None and "device_low_rep" in cols:
+                cols["device_low_rep"] = self._device_low_rep(inputs, cols["device_low_rep"])
+            parts = self.ruleset.components(cols)
+            total = sum(parts.values())
+            for i, res in enumerate(out):
+                res["rule_score"] = int(total[i])
+                res["rule_components"] = {rule_id: int(v[i]) for rule_id, v in parts.items()}
+            self.rule_seconds += time.perf_counter() - t1
+        return out
+
+    def _device_low_rep(self, inputs: list[dict], given: np.ndarray) -> np.ndarray:
+        """device_low_rep as sent, else looked up by device_id (unknown ids -> False)."""
+        if given.dtype != "float64":
+            return given
+        ids = _column([row.get("device_id") for row in inputs])
+        looked_up = np.zeros(len(inputs))
+        if ids.dtype == "float64":
+            ok = ~np.isnan(ids) & (ids >= 0) & (ids < self.device_lookup.size)
+            looked_up[ok] = self.device_lookup[ids[ok].astype("int64")]
+        return np.where(np.isnan(given), looked_up, given)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "scored": self.scored,
+            "mean_batch": self.scored / self.batches if self.batches else 0.0,
+            "model_us_per_batch": 1e6 * self.model_seconds / self.batches if self.batches else 0.0,
+            "rules_us_per_batch": 1e6 * self.rule_seconds / self.batches if self.batches else 0.0,
+        }
+
+
+def _settle(fut: asyncio.Future, result: dict | None = None, error: Exception | None = None) -> None:
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+def _column(values: list) -> np.ndarray:
+    """Typed column from JSON values: float64 (null -> NaN) when numeric/bool, else object."""
+    if all(v is None or isinstance(v, (int, float)) for v in values):  # bool is an int
+        return np.array([np.nan if v is None else v for v in values], dtype="float64")
+    return np.array(values, dtype=object)
+
+
+# -----------------------------------------
+# HTTP (minimal HTTP/1.1 with keep-alive)
+# -----------------------------------------
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+def _response(status: int, body: dict, keep_alive: bool) -> bytes:
+    data = json.dumps(body).encode()
+    head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + data
+
+
+def make_handler(batcher: MicroBatcher):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, _ = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(_response(400, {"error": "malformed request line"}, keep_alive=False))
+                    await writer.drain()
+                    break
+                headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    # The body's extent is unknown, so the connection can't be reused.
+                    writer.write(_response(400, {"error": "invalid Content-Length"}, keep_alive=False))
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length)
+
+                if method == "GET" and path == "/health":
+                    status, reply = 200, {"ok": True, **batcher.stats()}
+                elif method == "POST" and path == "/score":
+                    try:
+                        payload = json.loads(body)
+                        if isinstance(payload, list):
+                            reply = list(await asyncio.gather(*(batcher.submit(p) for p in payload)))
+                        else:
+                            reply = await batcher.submit(payload)
+                        status = 200
+                    except (ValueError, TypeError, AttributeError) as err:
+                        status, reply = 400, {"error": str(err)}
+                else:
+                    status, reply = 404, {"error": f"no route for {method} {path}"}
+
+                writer.write(_response(status, reply, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(host: str, port: int, unix: str | None, model: LinearModel, ruleset: RuleSet | None,
+                max_batch: int, max_delay_ms: float, device_lookup: np.ndarray | None = None) -> None:
+    batcher = MicroBatcher(model, ruleset, max_batch, max_delay_ms, device_lookup)
+    batch_task = asyncio.create_task(batcher.run())
+    handler = make_handler(batcher)
+    if unix:
+        server = await asyncio.start_unix_server(handler, path=unix)
+        where = unix
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        where = f"http://{host}:{port}"
+    print(f"Scoring server listening on {where} (max_batch={max_batch}, max_delay_ms={max_delay_ms})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+# -----------------------------------------
+# Load generator
+# -----------------------------------------
+
+async def loadgen(host: str, port: int, unix: str | None, requests: int, concurrency: int,
+                  features: list[str], seed: int = 42) -> dict:
+    """Fire ``requests`` single-transaction calls over ``concurrency`` keep-alive connections."""
+    rng = np.random.default_rng(seed)
+    latencies = np.zeros(requests)
+    counter = iter(range(requests))
+
+    def _payload() -> bytes:
+        feats = {f: float(v) for f, v in zip(features, rng.normal(size=len(features)))}
+        rule_inputs = {"tx_30m_cnt": int(rng.integers(1, 8)), "geo_mismatch": bool(rng.random() < 0.05),
+                       "device_low_rep": bool(rng.random() < 0.04), "channel": "ecommerce",
+                       "amount_cents": int(rng.integers(100, 900_000))}
+        body = json.dumps({"features": feats, "rule_inputs": rule_inputs}).encode()
+        return (f"POST /score HTTP/1.1\r\nHost: protector\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+    async def client() -> None:
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in counter:
+                req = _payload()
+                t0 = time.perf_counter()
+                writer.write(req)
+                await writer.drain()
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(next(l.split(b":")[1] for l in head.split(b"\r\n") if l.lower().startswith(b"content-length")))
+                await reader.readexactly(length)
+                latencies[i] = time.perf_counter() - t0
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    ms = latencies * 1000
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Micro-batching online scoring server for the Protector model.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("serve", "loadgen"):
+        p = sub.add_parser(name)
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8765)
+        p.add_argument("--unix", default=None, help="Unix socket path instead of TCP")
+        p.add_argument("--model", type=Path, default=MODEL_PATH)
+    serve_p = sub.choices["serve"]
+    serve_p.add_argument("--rules", type=Path, default=RULES_PATH)
+    serve_p.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    serve_p.add_argument("--max-delay-ms", type=float, default=DEFAULT_MAX_DELAY_MS)
+    serve_p.add_argument("--dims", type=Path, default=None,
+                         help="dimension store (dimstore.py): look up device_low_rep from device_id")
+    load_p = sub.choices["loadgen"]
+    load_p.add_argument("--requests", type=int, default=20_000)
+    load_p.add_argument("--concurrency", type=int, default=64)
+    args = ap.parse_args(argv)
+
+    model = LinearModel.load(args.model)
+    if args.cmd == "serve":
+        ruleset = RuleSet.from_yaml(args.rules) if args.rules and Path(args.rules).exists() else None
+        device_lookup = None
+        if args.dims:
+            from dimstore import DimensionTable, device_low_rep_lookup
+
+            device_lookup = device_low_rep_lookup(DimensionTable.open(args.dims / "device"))
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, model, ruleset, args.max_batch, args.max_delay_ms,
+                              device_lookup))
+        except KeyboardInterrupt:
+            pass
+    else:
+        report = asyncio.run(loadgen(args.host, args.port, args.unix, args.requests, args.concurrency, model.features))
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Incremental tx_30m_cnt / geo_mismatch for transactions arriving one at a time
+(or in micro-batches) — the streaming counterpart of features.py.
+
+Per customer we keep a ring buffer of transaction timestamps from the last
+30 minutes and the country/time of their latest login. Each event is O(1)
+amortised: expired timestamps fall off the front of the buffer, and
+customers with no activity inside the 2-hour login window are evicted from
+an activity-ordered map, so memory is bounded by active customers.
+
+The state snapshots to a single .npz and loads back, so a restart does not
+have to replay login_event.csv.
+
+Semantics match features.py with ``asof=True`` (the latest login *at or
+before* each transaction), which is the only version a live feed can know.
+Same-timestamp transactions count only the peers that have already arrived.
+
+Usage:
+    python streaming_features.py txn.parquet --logins data/external/login_event.csv \\
+        --state stream_state.npz --out txn_stream_features.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+from bisect import insort
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from features import LOGIN_WINDOW_US, VELOCITY_WINDOW_US, to_epoch_us
+
+
+class StreamingFeatureState:
+    """Per-customer rolling state for the velocity and geo features."""
+
+    def __init__(self, velocity_window_us: int = VELOCITY_WINDOW_US, login_window_us: int = LOGIN_WINDOW_US):
+        self.velocity_window_us = int(velocity_window_us)
+        self.login_window_us = int(login_window_us)
+        self.horizon_us = max(self.velocity_window_us, self.login_window_us)
+        self.watermark = np.iinfo("int64").min
+        self._txn_ts: dict[object, deque] = {}
+        self._login: dict[object, tuple[int, object]] = {}
+        self._active: OrderedDict[object, int] = OrderedDict()  # customer -> last activity, oldest first
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    # ---- events ----
+
+    def observe_login(self, customer_id, login_ts_us: int, country) -> None:
+        login_ts_us = int(login_ts_us)
+        prev = self._login.get(customer_id)
+        if prev is None or login_ts_us >= prev[0]:
+            self._login[customer_id] = (login_ts_us, country)
+        self._touch(customer_id, login_ts_us)
+
+    def observe_txn(self, customer_id, txn_ts_us: int, country) -> tuple[int, bool]:
+        """Record a transaction and return (tx_30m_cnt, geo_mismatch) for it."""
+        txn_ts_us = int(txn_ts_us)
+        buf = self._txn_ts.get(customer_id)
+        if buf is None:
+            buf = self._txn_ts[customer_id] = deque()
+        if not buf or txn_ts_us >= buf[-1]:
+            buf.append(txn_ts_us)
+        else:
+            insort(buf, txn_ts_us)  # late arrival: keep the buffer sorted
+
+        lo = txn_ts_us - self.velocity_window_us
+        while buf[0] < lo:
+            buf.popleft()
+        count = _bisect_right(buf, txn_ts_us)  # everything left is >= lo
+
+        login = self._login.get(customer_id)
+        login_country = None
+        if login is not None and login[0] <= txn_ts_us <= login[0] + self.login_window_us:
+            login_country = login[1]
+        self._touch(customer_id, txn_ts_us)
+        return count, _distinct(login_country, country)
+
+    def process_batch(self, txns: pd.DataFrame, logins: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Apply a micro-batch in time order (logins before transactions on ties).
+
+        Returns txn_id, tx_30m_cnt, geo_mismatch in the input order of ``txns``.
+        """
+        t_ts = to_epoch_us(txns["txn_ts"])
+        t_cust = txns["customer_id"].to_numpy()
+        t_ctry = txns["country"].to_numpy()
+        counts = np.zeros(len(txns), dtype="int64")
+        mismatch = np.zeros(len(txns), dtype=bool)
+
+        if logins is not None and len(logins):
+            l_ts = to_epoch_us(logins["login_ts"])
+            ts = np.concatenate([l_ts, t_ts])
+            kind = np.concatenate([np.zeros(len(l_ts), dtype="int8"), np.ones(len(t_ts), dtype="int8")])
+            l_cust, l_ctry = logins["customer_id"].to_numpy(), logins["country"].to_numpy()
+        else:
+            ts, kind = t_ts, np.ones(len(t_ts), dtype="int8")
+            l_cust = l_ctry = None
+        n_logins = len(ts) - len(t_ts)
+
+        for i in np.lexsort((kind, ts)):
+            if i < n_logins:
+                self.observe_login(l_cust[i], ts[i], l_ctry[i])
+            else:
+                j = i - n_logins
+                counts[j], mismatch[j] = self.observe_txn(t_cust[j], ts[i], t_ctry[j])
+
+        out = txns[["txn_id"]].copy()
+        out["tx_30m_cnt"] = counts
+        out["geo_mismatch"] = mismatch
+        return out
+
+    # ---- expiry ----
+
+    def _touch(self, customer_id, ts_us: int) -> None:
+        last = self._active.get(customer_id)
+        if last is None or ts_us >= last:
+            self._active[customer_id] = ts_us
+            self._active.move_to_end(customer_id)
+        if ts_us > self.watermark:
+            self.watermark = ts_us
+            self._expire()
+
+    def _expire(self) -> None:
+        cutoff = self.watermark - self.horizon_us
+        while self._active:
+            customer_id, last = next(iter(self._active.items()))
+            if last >= cutoff:
+                break
+            self._active.popitem(last=False)
+            self._txn_ts.pop(customer_id, None)
+            self._login.pop(customer_id, None)
+
+    # ---- snapshots ----
+
+    def save(self, path: Path) -> None:
+        """Write the full state to one compressed .npz."""
+        customers = list(self._active)
+        bufs = [self._txn_ts.get(c, ()) for c in customers]
+        logins = [self._login.get(c) for c in customers]
+        np.savez_compressed(
+            path,
+            windows=np.array([self.velocity_window_us, self.login_window_us, self.watermark], dtype="int64"),
+            customers=np.asarray(customers),
+            last_activity=np.array([self._active[c] for c in customers], dtype="int64"),
+            txn_offsets=np.cumsum([0] + [len(b) for b in bufs]).astype("int64"),
+            txn_ts=np.fromiter((t for b in bufs for t in b), dtype="int64"),
+            login_ts=np.array([l[0] if l else np.iinfo("int64").min for l in logins], dtype="int64"),
+            login_country=np.array(["" if not l or pd.isna(l[1]) else str(l[1]) for l in logins]),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "StreamingFeatureState":
+        with np.load(path, allow_pickle=False) as z:
+            vel, login, watermark = (int(x) for x in z["windows"])
+            state = cls(vel, login)
+            state.watermark = watermark
+            offsets, txn_ts = z["txn_offsets"], z["txn_ts"]
+            no_login = np.iinfo("int64").min
+            for i, (c, last, l_ts, l_ctry) in enumerate(zip(z["customers"].tolist(), z["last_activity"].tolist(),
+                                                            z["login_ts"].tolist(), z["login_country"].tolist())):
+                state._active[c] = last
+                if offsets[i + 1] > offsets[i]:
+                    state._txn_ts[c] = deque(txn_ts[offsets[i]:offsets[i + 1]].tolist())
+                if l_ts != no_login:
+                    state._login[c] = (l_ts, l_ctry or None)
+        return state
+
+
+def _bisect_right(buf, x) -> int:
+    # deque has no bisect_right fast path; the buffer is short (30 minutes of one customer).
+    i = len(buf)
+    while i and buf[i - 1] > x:
+        i -= 1
+    return i
+
+
+def _distinct(a, b) -> bool:
+    """SQL ``a IS DISTINCT FROM b`` with None/NaN as NULL."""
+    a_null, b_null = pd.isna(a), pd.isna(b)
+    if a_null or b_null:
+        return a_null != b_null
+    return a != b
+
+
+def main(argv=None) -> None:
+    import ingest
+
+    here = Path(__file__).resolve().parent / "data" / "external"
+    ap = argparse.ArgumentParser(description="Run a micro-batch through the streaming feature state.")
+    ap.add_argument("txn", type=Path, help="Txn micro-batch (.parquet or .csv)")
+    ap.add_argument("--logins", type=Path, default=None, help=f"login events to apply first (e.g. {here / 'login_event.csv'})")
+    ap.add_argument("--state", type=Path, default=here / "stream_state.npz")
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    state = StreamingFeatureState.load(args.state) if args.state.exists() else StreamingFeatureState()
+    logins = ingest.read_table(args.logins, columns=["customer_id", "login_ts", "country"]) if args.logins else None
+    feats = state.process_batch(ingest.read_table(args.txn, columns=["txn_id", "customer_id", "txn_ts", "country"]), logins)
+    state.save(args.state)
+
+    out = args.out or args.txn.with_name(args.txn.stem + "_stream_features.parquet")
+    feats.to_parquet(out, index=False)
+    print(f"Saved streaming features ({len(feats):,} rows, {len(state):,} active customers) -> {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
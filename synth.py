@@ -0,0 +1,564 @@
+"""
+Seeded, vectorized synthetic world from data/external/fraud.specs.json.
+
+Builds every table behind data/external/fraud.ddl.sql — customer, account,
+device, login_event, merchant, txn, case_alert, case_link — at a scale
+multiplier (customers, merchants and daily volume all grow by ``--scale``;
+the 60-day window stays fixed), plus a creditcard.csv-shaped table (Time,
+V1..V28, Amount, Class) drawn from the same transactions so the model side
+can be exercised at the same volume.
+
+Everything is generated in NumPy arrays and written straight to Parquet
+with pyarrow. Transactions are produced a block of days at a time (about
+DEFAULT_BLOCK_ROWS rows per block, one row group each), so 100x runs stay
+within a bounded amount of memory.
+
+The spec's rates are injected as follows:
+- fraud_rate: fraud arrives as account-takeover bursts (a few ecommerce
+  transactions within 20 minutes, usually from a foreign country and a
+  low-reputation device, often right after a foreign login), so the
+  velocity / geo / device rules have something to find.
+- geo_mismatch_rate: share of legitimate transactions made outside the
+  customer's home country.
+- low_rep_device_rate: share of devices with risk_reputation <= 20.
+- high_amount_rate: share of legitimate transactions above 500000 cents.
+
+Same spec + scale + seed gives byte-identical tables.
+
+Usage:
+    python synth.py [--scale 10] [--seed 42] [--spec data/external/fraud.specs.json] [--out-dir data/synthetic/x10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+SPEC_PATH = HERE / "data" / "external" / "fraud.specs.json"
+OUT_ROOT = HERE / "data" / "synthetic"
+MANIFEST_NAME = "manifest.json"
+
+TABLES = ["customer", "account", "device", "login_event", "merchant", "txn", "case_alert", "case_link", "creditcard"]
+REQUIRED_KEYS = ["n_customers", "n_accounts_per_customer_mean", "n_devices_per_customer_mean", "txn_days",
+                 "txns_per_day_mean", "fraud_rate", "geo_mismatch_rate", "low_rep_device_rate",
+                 "high_amount_rate", "channels", "countries"]
+
+US_PER_DAY = 86_400 * 1_000_000
+START_US = 1_753_056_000 * 1_000_000   # 2025-07-21T00:00:00Z, the start of the shipped login_event.csv
+DEFAULT_SEED = 42
+DEFAULT_BLOCK_ROWS = 1_000_000
+
+MERCHANTS_PER_CUSTOMER = 0.6
+LOGINS_PER_TXN = 0.3                   # legit logins, each shortly before one of the customer's transactions
+BURST_MEAN = 4                         # fraud transactions per takeover episode
+BURST_SPAN_US = 20 * 60 * 1_000_000
+HIGH_AMOUNT_CENTS = 500_000
+CASE_RATE_FRAUD = 0.85                 # episodes that become a case
+CASE_RATE_FALSE_POSITIVE = 0.0005      # legit transactions that get a case anyway
+
+CURRENCY = {"US": "USD", "CA": "CAD", "GB": "GBP", "DE": "EUR", "IN": "INR"}
+LEGIT_CHANNEL_WEIGHTS = {"card_present": 0.5, "ecommerce": 0.35, "ach": 0.1, "wire": 0.05}
+FRAUD_CHANNEL_WEIGHTS = {"card_present": 0.1, "ecommerce": 0.7, "ach": 0.1, "wire": 0.1}
+MCCS = [5311, 5411, 5812, 5999, 6011]
+KYC_STATUS = ["passed", "pending", "failed"]
+PRODUCT_TYPES = ["checking", "savings", "credit", "loan"]
+ACCOUNT_STATUS = ["open", "dormant", "closed"]
+RISK_TAGS = ["low", "medium", "high"]
+CASE_STATUS = ["open", "investigating", "closed"]
+ASSIGNEES = ["auto", "analyst_1", "analyst_2"]
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+
+# -----------------------------------------
+# Spec
+# -----------------------------------------
+
+def load_spec(path: Path = SPEC_PATH) -> dict:
+    with open(path) as f:
+        spec = json.load(f)
+    missing = [k for k in REQUIRED_KEYS if k not in spec]
+    if missing:
+        raise ValueError(f"{path}: spec is missing {missing}")
+    for k in ("fraud_rate", "geo_mismatch_rate", "low_rep_device_rate", "high_amount_rate"):
+        if not 0 <= spec[k] < 1:
+            raise ValueError(f"{path}: {k} must be in [0, 1), got {spec[k]}")
+    if spec["n_accounts_per_customer_mean"] < 1 or spec["n_devices_per_customer_mean"] < 1:
+        raise ValueError(f"{path}: per-customer account/device means must be >= 1")
+    if not spec["channels"] or not spec["countries"]:
+        raise ValueError(f"{path}: channels and countries must be non-empty")
+    return spec
+
+
+def scaled_counts(spec: dict, scale: float) -> dict:
+    """Row-count drivers at ``scale`` (the day count is not scaled)."""
+    if scale <= 0:
+        raise ValueError(f"scale must be positive, got {scale}")
+    n_customers = max(1, int(round(spec["n_customers"] * scale)))
+    return {
+        "customers": n_customers,
+        "merchants": max(1, int(round(n_customers * MERCHANTS_PER_CUSTOMER))),
+        "days": int(spec["txn_days"]),
+        "txns_per_day": spec["txns_per_day_mean"] * scale,
+    }
+
+
+def out_dir_for(scale: float) -> Path:
+    return OUT_ROOT / f"x{scale:g}"
+
+
+# -----------------------------------------
+# Vectorized column helpers
+# -----------------------------------------
+
+def _hex_chars(rng: np.random.Generator, n: int, nbytes: int) -> np.ndarray:
+    raw = rng.integers(0, 256, size=(n, nbytes), dtype=np.uint8)
+    chars = np.empty((n, 2 * nbytes), dtype=np.uint8)
+    chars[:, 0::2] = _HEX[raw >> 4]
+    chars[:, 1::2] = _HEX[raw & 15]
+    return chars
+
+
+def _fixed_strings(chars: np.ndarray):
+    """(n, width) uint8 ASCII matrix -> pyarrow string array."""
+    import pyarrow as pa
+
+    width = chars.shape[1]
+    return pa.array(np.ascontiguousarray(chars).view(f"S{width}").ravel()).cast(pa.string())
+
+
+def _sha256_like(rng, n):
+    return _fixed_strings(_hex_chars(rng, n, 32))
+
+
+def _uuid4_like(rng, n):
+    chars = _hex_chars(rng, n, 16)
+    chars[:, 12] = ord("4")
+    out = np.full((n, 36), ord("-"), dtype=np.uint8)
+    out[:, [i for i in range(36) if i not in (8, 13, 18, 23)]] = chars
+    return _fixed_strings(out)
+
+
+def _ipv4(rng, n):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    octets = rng.integers([1, 0, 0, 1], [224, 256, 256, 255], size=(n, 4))
+    return pc.binary_join_element_wise(*[pa.array(octets[:, i]).cast(pa.string()) for i in range(4)], ".")
+
+
+def _categorical(codes: np.ndarray, values: list):
+    """Codes into ``values`` -> plain string column (built through a dictionary, no Python loop)."""
+    import pyarrow as pa
+
+    return pa.DictionaryArray.from_arrays(pa.array(codes.astype("int32")), pa.array(values)).cast(pa.string())
+
+
+def _choice(rng, n: int, weights) -> np.ndarray:
+    p = np.asarray(weights, dtype="float64")
+    return rng.choice(p.size, size=n, p=p / p.sum())
+
+
+def _ts(us: np.ndarray):
+    import pyarrow as pa
+
+    return pa.array(us.astype("int64"), type=pa.timestamp("us", tz="UTC"))
+
+
+def _date(us: np.ndarray):
+    import pyarrow as pa
+
+    return pa.array((us // US_PER_DAY).astype("int32"), type=pa.date32())
+
+
+def _channel_weights(channels: list[str], table: dict) -> np.ndarray:
+    return np.array([table.get(c, 0.1) for c in channels])
+
+
+# -----------------------------------------
+# Dimensions
+# -----------------------------------------
+
+class World:
+    """Dimension tables plus the lookups the transaction generator samples from."""
+
+    def __init__(self, spec: dict, scale: float, rng: np.random.Generator):
+        import pyarrow as pa
+
+        counts = scaled_counts(spec, scale)
+        self.spec, self.counts = spec, counts
+        countries = list(spec["countries"])
+        n_c, n_m = counts["customers"], counts["merchants"]
+
+        # customer
+        self.home = rng.integers(0, len(countries), n_c)
+        first_seen = START_US - rng.integers(US_PER_DAY, 3 * 365 * US_PER_DAY, n_c)
+        self.customer = pa.table({
+            "customer_id": pa.array(np.arange(1, n_c + 1)),
+            "person_hash": _sha256_like(rng, n_c),
+            "first_seen_ts": _ts(first_seen),
+            "kyc_status": _categorical(_choice(rng, n_c, [0.8, 0.15, 0.05]), KYC_STATUS),
+            "pep_flag": _categorical((rng.random(n_c) < 0.02).astype(int), ["N", "Y"]),
+            "sanctions_hit": pa.array(np.where(rng.random(n_c) < 0.005, "OFAC", None)),
+            "record_src": _categorical(rng.integers(0, 2, n_c), ["import", "sim"]),
+            "created_at": _ts(first_seen),
+        })
+
+        # account / device: 1 + Poisson(mean - 1) per customer, laid out customer by customer
+        self.acct_count, self.acct_start, acct_owner = self._per_customer(rng, n_c, spec["n_accounts_per_customer_mean"])
+        n_a = acct_owner.size
+        opened = first_seen[acct_owner] + (rng.random(n_a) * (START_US - first_seen[acct_owner])).astype("int64")
+        self.account = pa.table({
+            "account_id": pa.array(np.arange(1, n_a + 1)),
+            "customer_id": pa.array(acct_owner + 1),
+            "product_type": _categorical(rng.integers(0, len(PRODUCT_TYPES), n_a), PRODUCT_TYPES),
+            "open_dt": _date(opened),
+            "status": _categorical(_choice(rng, n_a, [0.85, 0.1, 0.05]), ACCOUNT_STATUS),
+            "created_at": _ts(opened),
+        })
+
+        self.dev_count, self.dev_start, dev_owner = self._per_customer(rng, n_c, spec["n_devices_per_customer_mean"])
+        n_d = dev_owner.size
+        low = rng.random(n_d) < spec["low_rep_device_rate"]
+        reputation = np.where(low, rng.integers(0, 21, n_d), rng.integers(21, 101, n_d))
+        self.low_rep_devices = np.flatnonzero(low)
+        dev_seen = START_US - rng.integers(0, 2 * 365 * US_PER_DAY, n_d)
+        self.device = pa.table({
+            "device_id": pa.array(np.arange(1, n_d + 1)),
+            "device_fingerprint": _uuid4_like(rng, n_d),
+            "first_seen_ts": _ts(dev_seen),
+            "risk_reputation": pa.array(reputation.astype("int16")),
+            "last_ip": _ipv4(rng, n_d),
+            "last_country": _categorical(self.home[dev_owner], countries),
+            "created_at": _ts(dev_seen),
+        })
+
+        # merchant
+        import pyarrow.compute as pc
+
+        m_ids = np.arange(1, n_m + 1)
+        m_seen = START_US - rng.integers(0, 5 * 365 * US_PER_DAY, n_m)
+        self.merchant = pa.table({
+            "merchant_id": pa.array(m_ids),
+            "mcc": pa.array(np.asarray(MCCS, dtype="int16")[rng.integers(0, len(MCCS), n_m)]),
+            "name": pc.binary_join_element_wise("Merchant", pa.array(m_ids).cast(pa.string()), " "),
+            "country": _categorical(rng.integers(0, len(countries), n_m), countries),
+            "risk_tag": _categorical(_choice(rng, n_m, [0.6, 0.3, 0.1]), RISK_TAGS),
+            "created_at": _ts(m_seen),
+        })
+
+    @staticmethod
+    def _per_customer(rng, n_c: int, mean: float):
+        count = 1 + rng.poisson(mean - 1, n_c)
+        start = np.concatenate([[0], np.cumsum(count)[:-1]])
+        owner = np.repeat(np.arange(n_c), count)
+        return count, start, owner
+
+    def pick(self, rng, customers: np.ndarray, start: np.ndarray, count: np.ndarray) -> np.ndarray:
+        """0-based row of a random account/device owned by each customer."""
+        return start[customers] + (rng.random(customers.size) * count[customers]).astype("int64")
+
+
+# -----------------------------------------
+# Transactions (+ logins, cases, creditcard rows)
+# -----------------------------------------
+
+def _amounts(rng, n: int, high_rate: float, median_cents: float) -> np.ndarray:
+    normal = np.clip(rng.lognormal(np.log(median_cents), 1.0, n), 100, HIGH_AMOUNT_CENTS)
+    high = rng.integers(HIGH_AMOUNT_CENTS + 1, 10 * HIGH_AMOUNT_CENTS, n)
+    return np.where(rng.random(n) < high_rate, high, normal).astype("int64")
+
+
+def _foreign(rng, home: np.ndarray, n_countries: int) -> np.ndarray:
+    if n_countries < 2:
+        return home
+    return (home + rng.integers(1, n_countries, home.size)) % n_countries
+
+
+def txn_block(world: World, rng: np.random.Generator, t0: int, t1: int, n_legit: int) -> dict[str, np.ndarray]:
+    """Raw arrays for the transactions in [t0, t1) (unsorted, without ids).
+
+    ``episode`` is -1 for legitimate rows and a block-local burst id for fraud.
+    """
+    spec = world.spec
+    n_countries = len(spec["countries"])
+    n_c, n_m = world.counts["customers"], world.counts["merchants"]
+
+    # Legitimate traffic
+    cust = rng.integers(0, n_c, n_legit)
+    country = world.home[cust].copy()
+    away = rng.random(n_legit) < spec["geo_mismatch_rate"]
+    country[away] = _foreign(rng, country[away], n_countries)
+    legit = {
+        "cust": cust,
+        "acct": world.pick(rng, cust, world.acct_start, world.acct_count),
+        "dev": world.pick(rng, cust, world.dev_start, world.dev_count),
+        "merchant": (n_m * rng.random(n_legit) ** 2).astype("int64"),  # a few merchants take most volume
+        "ts": rng.integers(t0, t1, n_legit),
+        "amount": _amounts(rng, n_legit, spec["high_amount_rate"], 4_000),
+        "channel": _choice(rng, n_legit, _channel_weights(spec["channels"], LEGIT_CHANNEL_WEIGHTS)),
+        "country": country,
+        "episode": np.full(n_legit, -1),
+    }
+
+    # Fraud bursts sized so fraud rows ~= fraud_rate of the block
+    fraud_rate = spec["fraud_rate"]
+    n_ep = rng.poisson(n_legit * fraud_rate / (1 - fraud_rate) / BURST_MEAN) if fraud_rate > 0 else 0
+    size = 1 + rng.poisson(BURST_MEAN - 1, n_ep)
+    ep_cust = rng.integers(0, n_c, n_ep)
+    ep_start = rng.integers(t0, max(t1 - BURST_SPAN_US, t0 + 1), n_ep)
+    ep_country = np.where(rng.random(n_ep) < 0.7, _foreign(rng, world.home[ep_cust], n_countries), world.home[ep_cust])
+    ep_dev = world.pick(rng, ep_cust, world.dev_start, world.dev_count)
+    if world.low_rep_devices.size:
+        swap = rng.random(n_ep) < 0.6
+        ep_dev[swap] = world.low_rep_devices[rng.integers(0, world.low_rep_devices.size, int(swap.sum()))]
+    ep_acct = world.pick(rng, ep_cust, world.acct_start, world.acct_count)
+    rows = np.repeat(np.arange(n_ep), size)
+    n_fraud = rows.size
+    fraud = {
+        "cust": ep_cust[rows],
+        "acct": ep_acct[rows],
+        "dev": ep_dev[rows],
+        "merchant": rng.integers(0, n_m, n_fraud),
+        "ts": ep_start[rows] + rng.integers(0, BURST_SPAN_US, n_fraud),
+        "amount": _amounts(rng, n_fraud, 0.3, 15_000),
+        "channel": _choice(rng, n_fraud, _channel_weights(spec["channels"], FRAUD_CHANNEL_WEIGHTS)),
+        "country": ep_country[rows],
+        "episode": rows,
+    }
+    block = {k: np.concatenate([legit[k], fraud[k]]) for k in legit}
+    order = np.argsort(block["ts"], kind="stable")
+    block = {k: v[order] for k, v in block.items()}
+    block["fraud"] = block["episode"] >= 0
+    n = block["ts"].size
+    block["chargeback"] = np.where(block["fraud"], rng.random(n) < 0.6, rng.random(n) < 0.0005)
+
+    # Logins: legit ones shortly before some transactions, takeover ones right before a burst
+    with_login = ~block["fraud"] & (rng.random(n) < LOGINS_PER_TXN)
+    takeover = rng.random(n_ep) < 0.8
+    home_login = np.where(rng.random(int(with_login.sum())) < 0.98, world.home[block["cust"][with_login]],
+                          block["country"][with_login])
+    block["logins"] = {
+        "cust": np.concatenate([block["cust"][with_login], ep_cust[takeover]]),
+        "dev": np.concatenate([block["dev"][with_login], ep_dev[takeover]]),
+        "ts": np.concatenate([block["ts"][with_login] - rng.integers(0, 2 * 3600 * 1_000_000, int(with_login.sum())),
+                              ep_start[takeover] - rng.integers(1, 30 * 60 * 1_000_000, int(takeover.sum()))]),
+        "country": np.concatenate([home_login, ep_country[takeover]]),
+    }
+    return block
+
+
+def _txn_table(world: World, block: dict, first_id: int):
+    import pyarrow as pa
+
+    countries = list(world.spec["countries"])
+    currencies = [CURRENCY.get(c, "USD") for c in countries]
+    n = block["ts"].size
+    return pa.table({
+        "txn_id": pa.array(np.arange(first_id, first_id + n)),
+        "customer_id": pa.array(block["cust"] + 1),
+        "account_id": pa.array(block["acct"] + 1),
+        "merchant_id": pa.array(block["merchant"] + 1),
+        "device_id": pa.array(block["dev"] + 1),
+        "txn_ts": _ts(block["ts"]),
+        "amount_cents": pa.array(block["amount"]),
+        "currency": _categorical(block["country"], currencies),
+        "channel": _categorical(block["channel"], list(world.spec["channels"])),
+        "country": _categorical(block["country"], countries),
+        "label_fraud": pa.array(block["fraud"]),
+        "chargeback_flag": pa.array(block["chargeback"]),
+    })
+
+
+def _login_table(world: World, rng, logins: dict, first_id: int):
+    import pyarrow as pa
+
+    order = np.argsort(logins["ts"], kind="stable")
+    logins = {k: v[order] for k, v in logins.items()}
+    n = logins["ts"].size
+    success = rng.random(n) < 0.92
+    return pa.table({
+        "login_id": pa.array(np.arange(first_id, first_id + n)),
+        "customer_id": pa.array(logins["cust"] + 1),
+        "device_id": pa.array(logins["dev"] + 1),
+        "login_ts": _ts(logins["ts"]),
+        "ip": _ipv4(rng, n),
+        "country": _categorical(logins["country"], list(world.spec["countries"])),
+        "success": pa.array(success),
+        "mfa_passed": pa.array(success & (rng.random(n) < 0.75)),
+        "created_at": _ts(logins["ts"]),
+    })
+
+
+def _creditcard_table(rng, block: dict, fraud_shift: np.ndarray):
+    """creditcard.csv layout (ingest.DTYPES) for the same transactions."""
+    import pyarrow as pa
+
+    n = block["ts"].size
+    V = rng.standard_normal((n, fraud_shift.size), dtype=np.float32)
+    V[block["fraud"]] += fraud_shift
+    cols = {"Time": pa.array((block["ts"] - START_US) / 1e6)}
+    cols.update({f"V{i + 1}": pa.array(V[:, i]) for i in range(fraud_shift.size)})
+    cols["Amount"] = pa.array((block["amount"] / 100).astype("float32"))
+    cols["Class"] = pa.array(block["fraud"].astype("int8"))
+    return pa.table(cols)
+
+
+def _cases(rng, txn_ids: np.ndarray, ts: np.ndarray, episode: np.ndarray) -> tuple[dict, dict]:
+    """Case rows (block-local) and their (case, txn) links: most bursts plus a trickle of false positives."""
+    fraud = episode >= 0
+    ep_ids, first = np.unique(episode[fraud], return_index=True)
+    opened_ep = rng.random(ep_ids.size) < CASE_RATE_FRAUD
+    fp_rows = np.flatnonzero(~fraud & (rng.random(episode.size) < CASE_RATE_FALSE_POSITIVE))
+
+    n_ep_cases = int(opened_ep.sum())
+    case_of_episode = np.full(ep_ids.size, -1)
+    case_of_episode[opened_ep] = np.arange(n_ep_cases)
+    fraud_rows = np.flatnonzero(fraud)
+    fraud_case = case_of_episode[np.searchsorted(ep_ids, episode[fraud_rows])]
+    linked = fraud_case >= 0
+
+    last_ts = np.zeros(ep_ids.size, dtype="int64")
+    np.maximum.at(last_ts, np.searchsorted(ep_ids, episode[fraud_rows]), ts[fraud_rows])
+    anchor = np.concatenate([last_ts[opened_ep], ts[fp_rows]])
+    n_cases = anchor.size
+    is_fraud_case = np.arange(n_cases) < n_ep_cases
+    cases = {
+        "opened": anchor + rng.integers(3600 * 1_000_000, 3 * US_PER_DAY, n_cases),
+        "status": _choice(rng, n_cases, [0.3, 0.2, 0.5]),
+        "priority": np.where(is_fraud_case, _choice(rng, n_cases, [0.1, 0.3, 0.6]), _choice(rng, n_cases, [0.5, 0.4, 0.1])),
+        "reason": np.where(is_fraud_case, _choice(rng, n_cases, [0, 0.6, 0.4]), _choice(rng, n_cases, [0.7, 0.3, 0])),
+        "risk_score": np.where(is_fraud_case, rng.integers(60, 99, n_cases), rng.integers(10, 61, n_cases)),
+        "assigned": _choice(rng, n_cases, [0.4, 0.3, 0.3]),
+    }
+    links = {
+        "case": np.concatenate([fraud_case[linked], n_ep_cases + np.arange(fp_rows.size)]),
+        "txn": np.concatenate([txn_ids[fraud_rows[linked]], txn_ids[fp_rows]]),
+    }
+    return cases, links
+
+
+# -----------------------------------------
+# Driver
+# -----------------------------------------
+
+class _Writers:
+    """One lazily opened ParquetWriter per table."""
+
+    def __init__(self, out_dir: Path):
+        self.out_dir = out_dir
+        self.writers = {}
+        self.rows: dict[str, int] = {}
+
+    def write(self, name: str, table) -> None:
+        import pyarrow.parquet as pq
+
+        if name not in self.writers:
+            self.writers[name] = pq.ParquetWriter(self.out_dir / f"{name}.parquet", table.schema)
+            self.rows[name] = 0
+        self.writers[name].write_table(table)
+        self.rows[name] += table.num_rows
+
+    def close(self) -> None:
+        for w in self.writers.values():
+            w.close()
+
+
+def generate(spec: dict, scale: float = 1, seed: int = DEFAULT_SEED, out_dir: Path | None = None,
+             block_rows: int = DEFAULT_BLOCK_ROWS) -> dict:
+    """Write every table as ``<out_dir>/<table>.parquet``; returns the manifest (also saved as manifest.json)."""
+    import pyarrow as pa
+
+    out_dir = Path(out_dir) if out_dir is not None else out_dir_for(scale)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    t_start = time.perf_counter()
+
+    world = World(spec, scale, rng)
+    out = _Writers(out_dir)
+    try:
+        for name in ("customer", "account", "device", "merchant"):
+            out.write(name, getattr(world, name))
+
+        counts = world.counts
+        fraud_shift = rng.normal(0, 1.5, 28).astype("float32")
+        days_per_block = max(1, int(block_rows // max(counts["txns_per_day"], 1)))
+        next_txn, next_login, next_case = 1, 1, 1
+        for day in range(0, counts["days"], days_per_block):
+            n_days = min(days_per_block, counts["days"] - day)
+            t0 = START_US + day * US_PER_DAY
+            block = txn_block(world, rng, t0, t0 + n_days * US_PER_DAY, rng.poisson(counts["txns_per_day"] * n_days))
+            txn = _txn_table(world, block, next_txn)
+            out.write("txn", txn)
+            out.write("creditcard", _creditcard_table(rng, block, fraud_shift))
+            logins = _login_table(world, rng, block.pop("logins"), next_login)
+            out.write("login_event", logins)
+
+            txn_ids = np.arange(next_txn, next_txn + txn.num_rows)
+            cases, links = _cases(rng, txn_ids, block["ts"], block["episode"])
+            n_cases = cases["opened"].size
+            case_ids = np.arange(next_case, next_case + n_cases)
+            out.write("case_alert", pa.table({
+                "case_id": pa.array(case_ids),
+                "opened_ts": _ts(cases["opened"]),
+                "status": _categorical(cases["status"], CASE_STATUS),
+                "priority": _categorical(cases["priority"], RISK_TAGS),
+                "reason_code": _categorical(cases["reason"], ["kyc", "fraud", "chargeback"]),
+                "risk_score": pa.array(cases["risk_score"].astype("int16")),
+                "assigned_to": _categorical(cases["assigned"], ASSIGNEES),
+                "created_at": _ts(cases["opened"]),
+            }))
+            out.write("case_link", pa.table({"case_id": pa.array(next_case + links["case"]),
+                                             "txn_id": pa.array(links["txn"])}))
+            next_txn += txn.num_rows
+            next_login += logins.num_rows
+            next_case += n_cases
+    finally:
+        out.close()
+
+    manifest = {
+        "spec": spec, "scale": scale, "seed": seed,
+        "elapsed_s": round(time.perf_counter() - t_start, 3),
+        "rows": {name: out.rows.get(name, 0) for name in TABLES},
+        "paths": {name: str(out_dir / f"{name}.parquet") for name in TABLES},
+    }
+    with open(out_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def ensure_generated(spec: dict, scale: float = 1, seed: int = DEFAULT_SEED, out_dir: Path | None = None) -> dict:
+    """Reuse ``out_dir`` when its manifest matches spec/scale/seed and every table is present."""
+    out_dir = Path(out_dir) if out_dir is not None else out_dir_for(scale)
+    try:
+        manifest = json.loads((out_dir / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        manifest = None
+    if (manifest and (manifest.get("spec"), manifest.get("scale"), manifest.get("seed")) == (spec, scale, seed)
+            and all(Path(p).exists() for p in manifest["paths"].values())):
+        return manifest
+    return generate(spec, scale, seed, out_dir)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Generate the synthetic fraud tables from fraud.specs.json as Parquet.")
+    ap.add_argument("--spec", type=Path, default=SPEC_PATH)
+    ap.add_argument("--scale", type=float, default=1, help="multiplier on customers, merchants and daily volume")
+    ap.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    ap.add_argument("--out-dir", type=Path, default=None, help="defaults to data/synthetic/x<scale>")
+    ap.add_argument("--block-rows", type=int, default=DEFAULT_BLOCK_ROWS, help="approx. transactions per block")
+    args = ap.parse_args(argv)
+
+    manifest = generate(load_spec(args.spec), args.scale, args.seed, args.out_dir, args.block_rows)
+    for name in TABLES:
+        print(f"Saved {name} ({manifest['rows'][name]:,} rows) -> {Path(manifest['paths'][name]).resolve()}")
+    print(f"Generated in {manifest['elapsed_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
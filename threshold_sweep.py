@@ -0,0 +1,140 @@
+"""
+Exact threshold sweep for the threshold tuner (ui.json -> threshold_demo.html).
+
+Scores are sorted once; cumulative sums of the labels then give TP/FP at
+every distinct threshold, so precision / recall / F1 / alert volume for all
+operating points cost O(n log n) total instead of one precision_score /
+recall_score call per threshold. The full curve is then sampled on a fixed
+threshold grid (default: every 0.001, the slider's step), each grid point
+still exact, and written to ui.json sorted by threshold so the page can
+binary-search it.
+
+A row is flagged when ``proba >= threshold`` (same rule as fraud.py).
+
+Usage:
+    python threshold_sweep.py data/external/transactions_with_scores.parquet [--points 1001] [--out ui.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+UI_PATH = Path(__file__).resolve().parent / "ui.json"
+DEFAULT_POINTS = 1001  # 0.000, 0.001, ..., 1.000
+BASELINE_THRESHOLD = 0.5
+
+
+def sweep(y_true, scores) -> dict[str, np.ndarray]:
+    """Confusion counts at every distinct score, highest threshold first.
+
+    Entry ``i`` describes the rule ``score >= thresholds[i]``.
+    """
+    y = np.asarray(y_true).astype(bool)
+    s = np.asarray(scores, dtype="float64")
+    if not s.size:
+        raise ValueError("No scored rows to sweep — is the scored file empty?")
+    if y.size != s.size:
+        raise ValueError(f"Got {y.size:,} labels but {s.size:,} scores")
+    order = np.argsort(-s, kind="stable")
+    s, y = s[order], y[order]
+
+    # Last index of each run of equal scores: everything up to it is flagged.
+    last = np.flatnonzero(np.r_[s[1:] != s[:-1], True])
+    tp = np.cumsum(y)[last]
+    alerts = last + 1
+    fp = alerts - tp
+    pos = int(y.sum())
+    return {
+        "thresholds": s[last],
+        "tp": tp.astype("int64"),
+        "fp": fp.astype("int64"),
+        "fn": (pos - tp).astype("int64"),
+        "tn": (y.size - pos - fp).astype("int64"),
+    }
+
+
+def at_thresholds(curve: dict[str, np.ndarray], thresholds) -> dict[str, np.ndarray]:
+    """Exact counts for arbitrary thresholds, looked up on the full curve."""
+    thresholds = np.asarray(thresholds, dtype="float64")
+    desc = curve["thresholds"]
+    # Number of distinct scores >= t  ->  index of the last flagged run (or none).
+    n_runs = np.searchsorted(-desc, -thresholds, side="right")
+    idx = n_runs - 1
+    flagged = idx >= 0
+    total_pos = curve["tp"][-1] + curve["fn"][-1]
+    total_neg = curve["fp"][-1] + curve["tn"][-1]
+    safe = np.maximum(idx, 0)
+    tp = np.where(flagged, curve["tp"][safe], 0)
+    fp = np.where(flagged, curve["fp"][safe], 0)
+    return {"thresholds": thresholds, "tp": tp, "fp": fp, "fn": total_pos - tp, "tn": total_neg - fp}
+
+
+def metrics(counts: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """precision / recall / F1 / alert volume from confusion counts (0 where undefined)."""
+    tp, fp, fn = (counts[k].astype("float64") for k in ("tp", "fp", "fn"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return {**counts, "precision": precision, "recall": recall, "f1": f1, "alerts": counts["tp"] + counts["fp"]}
+
+
+def ui_points(y_true, scores, n_points: int = DEFAULT_POINTS) -> list[dict]:
+    """Exact operating points on an even 0..1 threshold grid, ascending."""
+    grid = np.round(np.linspace(0.0, 1.0, n_points), 6)
+    m = metrics(at_thresholds(sweep(y_true, scores), grid))
+    return [
+        {
+            "threshold": float(t),
+            "precision": round(float(p), 6),
+            "recall": round(float(r), 6),
+            "f1": round(float(f), 6),
+            "tp": int(tp), "fp": int(fp), "tn": int(tn), "fn": int(fn),
+            "alerts": int(a),
+        }
+        for t, p, r, f, tp, fp, tn, fn, a in zip(m["thresholds"], m["precision"], m["recall"], m["f1"],
+                                                   m["tp"], m["fp"], m["tn"], m["fn"], m["alerts"])
+    ]
+
+
+def write_ui_json(y_true, scores, out_path: Path = UI_PATH, n_points: int = DEFAULT_POINTS,
+                  baseline_threshold: float = BASELINE_THRESHOLD) -> dict:
+    """Write {"baseline": ..., "points": [...]} for threshold_demo.html and return it."""
+    points = ui_points(y_true, scores, n_points)
+    base = metrics(at_thresholds(sweep(y_true, scores), [baseline_threshold]))
+    payload = {
+        "baseline": {
+            "precision": round(float(base["precision"][0]), 6),
+            "recall": round(float(base["recall"][0]), 6),
+            "f1": round(float(base["f1"][0]), 6),
+            "threshold": baseline_threshold,
+            "n_samples": int(np.asarray(y_true).size),
+        },
+        "points": points,
+    }
+    with open(out_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return payload
+
+
+def main(argv=None) -> None:
+    import pandas as pd
+
+    ap = argparse.ArgumentParser(description="Write the exact threshold sweep to ui.json.")
+    ap.add_argument("scored", type=Path, help="scored transactions (.parquet/.csv) with Class and proba")
+    ap.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    ap.add_argument("--out", type=Path, default=UI_PATH)
+    args = ap.parse_args(argv)
+
+    cols = ["Class", "proba"]
+    df = pd.read_parquet(args.scored, columns=cols) if args.scored.suffix == ".parquet" else pd.read_csv(args.scored, usecols=cols)
+    write_ui_json(df["Class"].to_numpy(), df["proba"].to_numpy(), args.out, args.points)
+    print(f"Saved threshold sweep ({args.points} points) -> {args.out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()